@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import argparse
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import config
+from shared.pid import PID
+from shared.control import HoldController
+from simulator import Simulator, closed_loop
+
+'''
+Hold PID tuning on the simulator (simulator.py) instead of in the pool.
+Each candidate (KP, KI, KD) runs a step response through the base station's HoldController in closed loop with the
+model, and is scored on settling time, overshoot and thruster effort. Candidates are spread over a process pool,
+one simulation per task, so a sweep uses every core.
+
+The first round is a log-spaced grid (--grid) or random log-uniform samples (--samples) within --spread times the
+current gains, each later round samples around the best so far with the spread narrowed. Depth is tuned first,
+the attitude steps then run with depth held at the new depth gains.
+The best gains are written to config_overlay.json (--write), which shared/vehicle.py loads over its own values:
+    python autotune.py depth --grid 5
+    python autotune.py roll pitch yaw --samples 64 --rounds 3 --write
+As good as the model is: check the result against a logged dive with replay.py --set before the pool.
+'''
+
+OVERLAY_PATH = config.CONFIG_OVERLAY
+TUNE_DT = 0.005 # s, physics step: depth and attitude responses match the 1 kHz model to a few mm / 0.1 deg
+
+# start: depth (m) the step starts from, step: m or deg, band: settled once within it
+SCENARIOS = {
+    "depth": {"start": 0.5, "step": 1.0, "duration": 20.0, "band": 0.05},
+    "roll": {"start": 1.0, "step": 15.0, "duration": 15.0, "band": 1.0},
+    "pitch": {"start": 1.0, "step": 15.0, "duration": 15.0, "band": 1.0},
+    "yaw": {"start": 1.0, "step": 45.0, "duration": 15.0, "band": 2.0},
+}
+ANGLE_INDEX = {"roll": 0, "pitch": 1, "yaw": 2}
+
+# Score = settling time / duration + OVERSHOOT_WEIGHT * overshoot / step + EFFORT_WEIGHT * mean PWM effort
+OVERSHOOT_WEIGHT = 1.0
+EFFORT_WEIGHT = 0.5
+UNSETTLED_PENALTY = 1.0
+SETTLED_TAIL = 0.1 # Settled only if the response then stays in the band for at least this fraction of the run
+
+# A zero gain (KI = 0 disables the I term) can't be scaled, it's searched from 0 and log-spaced around these instead
+ZERO_GAIN_SCALE = {
+    "depth": (1.0, 0.1, 0.4),
+    "roll": (0.04, 0.005, 0.03),
+    "pitch": (0.04, 0.005, 0.03),
+    "yaw": (0.04, 0.0005, 0.03),
+}
+ZERO_GAIN_CHANCE = 0.25 # Fraction of random candidates that keep a zero gain at 0
+
+
+def current_gains(axis):
+    prefix = axis.upper()
+    return tuple(getattr(config, f"{prefix}_{gain}") for gain in ("KP", "KI", "KD"))
+
+
+def step_response(axis, gains, depth_gains=None, dt=TUNE_DT):
+    """Closed-loop step on one axis with these gains. Returns (times, response, target, pwms)."""
+    scenario = SCENARIOS[axis]
+    hold = HoldController()
+    # Only the tuned axis and depth are held, the rest get no input
+    hold.hold = {name: name in (axis, "depth") for name in hold.hold}
+    setattr(hold, f"{axis}_pid", PID(*gains, 1, -1, is_angle=axis != "depth"))
+    if axis != "depth" and depth_gains is not None:
+        hold.depth_pid = PID(*depth_gains, 1, -1)
+
+    sim = Simulator(dt=dt, depth=scenario["start"])
+    # The KF starts from the surface, a second of readings first so the step starts from rest
+    for i in range(50):
+        sim.step(int(round(0.02 / dt)))
+        hold.add_pressure(sim.t, sim.pressure()[0] - config.PRESSURE_OFFSET)
+
+    if axis == "depth":
+        target = scenario["start"] + scenario["step"]
+        trace = closed_loop(scenario["duration"], hold=hold, sim=sim, target_depth=target)
+        response = trace["depth"]
+    else:
+        target = scenario["step"]
+        setattr(hold, f"target_{axis}", target)
+        trace = closed_loop(scenario["duration"], hold=hold, sim=sim, target_depth=scenario["start"])
+        response = trace["angles"][:, ANGLE_INDEX[axis]]
+    return trace["t"] - trace["t"][0], response, target, trace["pwms"]
+
+
+def score(axis, times, response, target, pwms):
+    """(score, settling time s or None, overshoot as a fraction of the step, effort 0..1)."""
+    scenario = SCENARIOS[axis]
+    step = scenario["step"]
+    error = np.abs(target - response)
+    outside = np.flatnonzero(error > scenario["band"])
+    if not len(outside):
+        settling = 0.0
+    elif outside[-1] == len(error) - 1:
+        settling = None
+    else:
+        settling = times[outside[-1] + 1]
+    # Entering the band just before the end isn't settling
+    if settling is not None and settling > times[-1] * (1 - SETTLED_TAIL):
+        settling = None
+    overshoot = max(0.0, float(np.max((response - target) * np.sign(step)))) / abs(step)
+    effort = float(np.mean(np.abs(pwms - config.PWM_NEUTRAL))) / 400 # 400 us is full thrust either way
+    total = OVERSHOOT_WEIGHT * overshoot + EFFORT_WEIGHT * effort
+    total += (settling / scenario["duration"]) if settling is not None else 1 + UNSETTLED_PENALTY
+    return total, settling, overshoot, effort
+
+
+def evaluate(task):
+    """One candidate, run in a pool worker. task: (axis, gains, depth_gains)."""
+    axis, gains, depth_gains = task
+    return (gains,) + score(axis, *step_response(axis, gains, depth_gains))
+
+
+def grid(axis, center, spread, points):
+    """Log-spaced within spread times each gain, a zero gain gets 0 and points - 1 values around ZERO_GAIN_SCALE."""
+    axes = []
+    for gain, scale in zip(center, ZERO_GAIN_SCALE[axis]):
+        if gain:
+            axes.append(np.geomspace(gain / spread, gain * spread, points))
+        else:
+            axes.append(np.concatenate([[0.0], np.geomspace(scale / spread, scale * spread, points - 1)]))
+    return [tuple(gains) for gains in itertools.product(*axes)]
+
+
+def samples(axis, center, spread, n, rng):
+    """Log-uniform within spread times each gain, a zero gain around ZERO_GAIN_SCALE or left at 0."""
+    center = np.asarray(center, dtype=float)
+    zero = center == 0
+    gains = np.where(zero, ZERO_GAIN_SCALE[axis], center) * spread ** rng.uniform(-1, 1, (n, len(center)))
+    gains[(rng.random((n, len(center))) < ZERO_GAIN_CHANCE) & zero] = 0.0
+    return [tuple(row) for row in gains]
+
+
+def tune(axis, executor, workers, first_round, rounds, spread, n_samples, depth_gains=None, seed=0):
+    """Best (score, settling, overshoot, effort) row first, the config's own gains scored as the baseline."""
+    rng = np.random.default_rng(seed)
+    baseline = current_gains(axis)
+    results = []
+    candidates = [baseline] + first_round
+    for round_number in range(rounds):
+        tasks = [(axis, tuple(float(g) for g in gains), depth_gains) for gains in candidates]
+        started = time.perf_counter()
+        results += executor.map(evaluate, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+        results.sort(key=lambda result: result[1])
+        best = results[0]
+        print(f"[{axis}] round {round_number + 1}: {len(tasks)} candidates in {time.perf_counter() - started:.1f} s, "
+              f"best {format_result(best)}")
+        spread = spread ** 0.5
+        candidates = samples(axis, best[0], spread, n_samples, rng)
+    return results, next(result for result in results if result[0] == tuple(float(g) for g in baseline))
+
+
+def format_result(result):
+    gains, total, settling, overshoot, effort = result
+    settled = f"{settling:5.2f} s" if settling is not None else "   never"
+    return (f"KP {gains[0]:.4g} KI {gains[1]:.4g} KD {gains[2]:.4g} | score {total:.3f}, settles {settled}, "
+            f"overshoot {overshoot * 100:.0f}%, effort {effort * 100:.0f}%")
+
+
+def write_overlay(tuned, path=OVERLAY_PATH):
+    """Merges {axis: (KP, KI, KD)} into the overlay file, other axes' entries are kept."""
+    overlay = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            overlay = json.load(f)
+    for axis, gains in tuned.items():
+        for name, value in zip(("KP", "KI", "KD"), gains):
+            overlay[f"{axis.upper()}_{name}"] = float(f"{value:.4g}")
+    with open(path, "w") as f:
+        json.dump(overlay, f, indent=4)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the hold PIDs on the simulator, in parallel")
+    parser.add_argument("axes", nargs="*", default=["depth"], choices=list(SCENARIOS))
+    parser.add_argument("--grid", type=int, metavar="POINTS", help="first round: POINTS^3 log-spaced gains")
+    parser.add_argument("--samples", type=int, default=32, help="random candidates per round")
+    parser.add_argument("--rounds", type=int, default=2, help="later rounds sample around the best so far")
+    parser.add_argument("--spread", type=float, default=10.0, help="first round covers gain / spread .. gain * spread")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--write", action="store_true", help=f"save the best gains to {os.path.basename(OVERLAY_PATH)}")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    tuned = {}
+    depth_gains = current_gains("depth")
+    # Depth first, the attitude steps hold depth with its result
+    axes = sorted(set(args.axes), key=list(SCENARIOS).index)
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for axis in axes:
+            center = current_gains(axis)
+            first_round = (grid(axis, center, args.spread, args.grid) if args.grid
+                           else samples(axis, center, args.spread, args.samples, rng))
+            results, baseline = tune(axis, executor, args.workers, first_round, args.rounds, args.spread, args.samples,
+                                     None if axis == "depth" else depth_gains, args.seed)
+            best = results[0]
+            print(f"[{axis}] config  {format_result(baseline)}")
+            print(f"[{axis}] tuned   {format_result(best)}")
+            tuned[axis] = best[0]
+            if axis == "depth":
+                depth_gains = best[0]
+
+    if args.write:
+        write_overlay(tuned)
+        print(f"Wrote {', '.join(tuned)} gains to {OVERLAY_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,122 +1,67 @@
-import math
-import socket
-import numpy as np
+import os
+import sys
 
-'''
-        ---------------------------width----------------------------
-    |    T1 (CW)                                         T2 (CW)
-    |
-    |                      
-    |           T5 (CCW)                          T6 (CW)
-    |                               x
-    |                               |  
-  length                            o ----- y 
-    |                                \
-    |                                 z (inwards)
-    |
-    |           T7 (CW)                            T8 (CCW)
-    |
-    |
-    |   T3 (CCW)                                           T4 (CCW)
+# The vehicle model, calibration and hold gains are shared with the Pi (shared/vehicle.py), the repo root makes
+# shared/ importable when running from this directory. The thruster layout is drawn there.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.vehicle import *
 
-    Force exerted by a thruster is taken +ve in the sense of pointing to x-axis for the lateral thrusters, and downwards for the vertical thrusters
-    Irrespective of CW/CCW propeller
-    SI units are used: m, s
-
-'''
-
-PI_IP = "192.168.137.2"
+PI_IP = os.environ.get("ROV_PI_IP", "192.168.137.2") # ROV_PI_IP=127.0.0.1 for simulator.py
 # PI_IP = socket.gethostbyname("auv.local")
 UDP_PORT_DATA = 5005
 UDP_PORT_CMD = 5006
-
-ROV_WIDTH_MM = 262.629
-ROV_LENGTH_MM = 195.311
-
-# "V" Configuration: T1(45), T2(-45), T3(135), T4(-135)
-THRUSTER_ANGLES_DEG = [45, -45, 135, -135] # From +ve x-axis (Force exerted to the vehicle)
-
-SIN_45 = math.sin(math.radians(45))
-
-# MAX thrust offered by an individual thruster
-# This change was made due to problems in cancelling moments: from fixing PWM ranges to thrust ranges
-MAX_THRUST = 2.35 
-
-PWM_NEUTRAL = 1500
+VIDEO_PORT = 5555
+# True: the Pi waits for our reply after every frame (imagezmq REQ/REP)
+# False: the Pi publishes and we subscribe, frames are dropped instead of slowing the Pi down (PUB/SUB)
+# Must match VIDEO_REQ_REP in pi/main.py
+VIDEO_REQ_REP = True
+# False: no video receiver, so cv2 and imagezmq are never imported (footage recording and vision need it)
+VIDEO = True
+# No pygame or cv2 windows: the sticks stay centred (NullController) and frames are received but not shown.
+# For automated tests and a companion computer, also `python main.py --headless`
+HEADLESS = False
+# KF, hold PIDs and allocation run in their own thread at a fixed rate, 50-200 Hz, whatever the dashboard and
+# video windows are doing. The joystick, dashboard and cv2 windows refresh at UI_RATE_HZ with the latest state
+CONTROL_RATE_HZ = 50
+UI_RATE_HZ = 30
 
 XBOX = "XBOX"
 PS = "PS"
 KEYBAORD = "KEYBOARD"
 CONTROLLER_TYPE = KEYBAORD
 
-# Found mechanical team messing up the connections, as exchanging 2 would invert the direction of thrust
-# Also 4 propellers must in be in one sense and the other 4 in opp sense for cancelling counter rotor torque
-I1 = True
-I2 = False
-I3 = False
-I4 = True 
-I5 = True
-I6 = True
-I7 = True
-I8 = True
-
-def invert_pwm(PWM, invert=True):
-    if invert == True:
-        return PWM_NEUTRAL - (PWM - PWM_NEUTRAL)
-    return PWM
-
+# Onboard control: the Pi runs the depth KF, the hold PIDs and allocation (shared/control.py) at pressure sensor rate,
+# we only send it the pilot's inputs and which axes to hold (*_PID in shared/vehicle.py). It keeps holding if the link drops.
+# The gains, offsets and thruster inversions are read from the Pi's copy of shared/vehicle.py.
+ONBOARD_CONTROL = False
 
-# Due to unreliable electronics some thrusters tend to fail, only 6 thrusters with 3 lateral and 3 vertical are reuqired to attain 6 DOFs
-# However cacelling the counter rotor torque with one less thruster is impossible and hence unaccounted in such a failure
-W1 = True
-W2 = True
-W3 = True
-W4 = True
-W5 = True
-W6 = True
-W7 = True
-W8 = True
-
-WORKING_THRUSTERS = np.array([W1, W2, W3, W4, W5, W6, W7, W8])
-
-# Need to find these again for the working thrusters otherwise they will max out before the joystick reaches extrema
-MAX_AXIAL_FORCE = 4 * SIN_45 * MAX_THRUST
-MAX_YAW_TORQUE = 2 * SIN_45 * (ROV_LENGTH_MM + ROV_WIDTH_MM) * MAX_THRUST
-MAX_HEAVE_FORCE = 4 * MAX_THRUST
-MAX_ROLL_TORQUE = 4 * (ROV_WIDTH_MM / 2) * MAX_THRUST
-MAX_PITCH_TORQUE = 4 * (ROV_LENGTH_MM / 2) * MAX_THRUST
-
-# To be implemented
+# Every telemetry packet, Bar30 reading, command and control loop step is logged to columnar files (sensor_log.py),
+# one per producer in SENSOR_LOG_DIR/<start time>/, open them with sensor_log.open_log()
 RECORD_SENSORS = False
-RECORD_FOOTAGE = False
-
-# Things to Calibrate:
+SENSOR_LOG_DIR = "sensor_logs"
+SENSOR_LOG_CHUNK_ROWS = 1024 # Most rows per chunk and channel
+SENSOR_LOG_FLUSH_SECONDS = 5 # Partly filled chunks are written at least this often, what a crash can lose
+# Rows per second of each producer: a chunk holds SENSOR_LOG_FLUSH_SECONDS of them, not SENSOR_LOG_CHUNK_ROWS of padding
+SENSOR_LOG_RATES = {"telemetry": 10, "pressure": 50, "commands": 20, "control": CONTROL_RATE_HZ}
 
-PRESSURE_OFFSET = 988 - 1013.25 # mbar # Diff for location and whether
-ROLL_OFFSET = 0
-PITCH_OFFSET = 0
-YAW_OFFSET = 50 # Make this in the direction of the gate
+# Every telemetry datagram received and command sent, raw and timestamped (shared/udp_capture.py), for pi/udp_replay.py
+RECORD_UDP = False
+UDP_CAPTURE_DIR = "udp_captures"
 
-# meter to -1 to 1
-DEPTH_PID = True
-DEPTH_KP = 1.2
-DEPTH_KI = 0.1
-DEPTH_KD = 0.4
-
-# Angle in degrees to -1 to 1
-PITCH_PID = False
-PITCH_KP = 0.04
-PITCH_KI = 0.005
-PITCH_KD = 0.03
-
-# Angle in degrees to -1 to 1
-ROLL_PID = False
-ROLL_KP = 0.04
-ROLL_KI = 0.005
-ROLL_KD = 0.03
-
-# Angle in degrees to -1 to 1
-YAW_PID = False
-YAW_KP = 0.04
-YAW_KI = 0.0005
-YAW_KD = 0.03
+# Camera footage is queued to a background writer process and saved as time-indexed segments per camera
+RECORD_FOOTAGE = False
+FOOTAGE_DIR = "footage"
+FOOTAGE_SEGMENT_SECONDS = 60
+FOOTAGE_QUEUE_SIZE = 64 # Frames buffered while the disk catches up
+FOOTAGE_DROP_POLICY = "oldest" # "oldest" or "newest": which frame to drop once the queue is full
+FOOTAGE_JPEG_QUALITY = 90 # Only used for streams that arrive uncompressed
+
+# Vision: processors from vision.PROCESSORS run in a process pool on the newest color frame of each camera
+# Frames are skipped while the pool is busy, so vision never holds up video receiving or control
+VISION = False
+VISION_WORKERS = 2
+VISION_PROCESSORS = ["gate"]
+CAMERA_HFOV_DEG = 69 # Horizontal field of view (RealSense D435 color), turns pixel offsets into bearings
+GATE_HSV_LOW = (0, 120, 70) # OpenCV HSV range of the gate markers
+GATE_HSV_HIGH = (15, 255, 255)
+GATE_MIN_AREA = 400 # px, smaller blobs are ignored
@@ -0,0 +1,71 @@
+import json
+import time
+import zlib
+import numpy as np
+import cv2
+import imagezmq
+from shared.frame_format import RAW, JPEG, PNG16, ZLIB16, StreamStats
+
+'''
+Counterpart of pi/frame_encoder.py: frames arrive through imagezmq's recv_jpg as (header, payload),
+where header is JSON text with the stream name ("cam"), encoding ("enc"), "shape" and "dtype",
+plus the Pi's capture time ("t_cap"), driver read time ("t_read"), sequence number ("seq") and encode time ("t_enc").
+FrameReceiver adds the local receive time ("t_recv") and decode time ("t_dec") to the header it returns.
+Depth streams (PNG16 / ZLIB16) decode back into the original uint16 array, bit for bit.
+The encodings and StreamStats come from shared/frame_format.py, the same module the encoder uses.
+'''
+
+
+def decode_frame(header, payload):
+    """Returns the image array for a received payload."""
+    encoding = header["enc"]
+    shape = header["shape"]
+    dtype = np.dtype(header["dtype"])
+
+    if encoding == RAW:
+        return np.frombuffer(payload, dtype=dtype).reshape(shape)
+    if encoding == JPEG:
+        return cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if encoding == PNG16:
+        return cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    if encoding == ZLIB16:
+        delta = np.frombuffer(zlib.decompress(payload), dtype=dtype).reshape(shape)
+        # Undo the horizontal delta, uint16 accumulation wraps exactly like the encoder did
+        return np.cumsum(delta, axis=1, dtype=dtype)
+    raise ValueError(f"Unknown encoding: {encoding}")
+
+
+class FrameReceiver:
+    """
+    Receives frames from the Pi's FrameSender and decodes them.
+    With req_rep=False open_port is the Pi's PUB address (tcp://<pi>:5555) and no reply is sent.
+    """
+    def __init__(self, open_port="tcp://*:5555", req_rep=True):
+        self.image_hub = imagezmq.ImageHub(open_port=open_port, REQ_REP=req_rep)
+        self.req_rep = req_rep
+        self.stats = {}
+
+    def recv(self):
+        """Blocks for the next frame. Returns (cam_id, frame, header, payload)."""
+        msg, payload = self.image_hub.recv_jpg()
+        recv_time = time.time()
+        # Acknowledge receipt to the sender straight away (required by imagezmq), decoding doesn't need the Pi
+        if self.req_rep:
+            self.image_hub.send_reply(b'OK')
+
+        header = json.loads(msg)
+        start_cpu = time.thread_time()
+        start = time.perf_counter()
+        frame = decode_frame(header, payload)
+        header["t_dec"] = time.perf_counter() - start
+        header["t_recv"] = recv_time
+        cpu_time = time.thread_time() - start_cpu
+
+        cam_id = header["cam"]
+        if cam_id not in self.stats:
+            self.stats[cam_id] = StreamStats("decode")
+        self.stats[cam_id].add(len(payload), cpu_time)
+        return cam_id, frame, header, payload
+
+    def close(self):
+        self.image_hub.close()
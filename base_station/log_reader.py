@@ -0,0 +1,158 @@
+import os
+import sys
+import glob
+import argparse
+import numpy as np
+from sensor_log import open_log, EXTENSION
+
+'''
+Random access into sensor logs (sensor_log.py) without reading them in.
+Opening a log maps it and reads only the first and last time of every chunk, that sparse index finds the chunk
+holding any timestamp, then a binary search inside that chunk's time column finds the row.
+
+window() returns views straight into the memmap, one per chunk the window touches (like SampleRing.read()),
+so only the pages actually looked at are read from disk. overview() reduces a time range of any length
+to per-bucket min/max one chunk at a time, for plotting an hour of data at screen resolution.
+Times are assumed non-decreasing within a log, which holds for every producer in main.py.
+
+    python log_reader.py sensor_logs/<dive>                      # What's in each log
+    python log_reader.py sensor_logs/<dive>/control.rovlog kf_depth --start 600 --end 900 --buckets 20
+'''
+
+
+class LogReader:
+    def __init__(self, path):
+        self.path = path
+        self.header, self.chunks = open_log(path)
+        self.channels = self.header["channels"]
+        self.index = {name: i for i, name in enumerate(self.channels)}
+        self.producer = self.header["producer"]
+
+        self.rows = np.asarray(self.chunks["rows"], dtype=np.int64)
+        self.data = self.chunks["data"] # (chunks, channels, chunk_rows), still the memmap
+        # Sparse time index, two values per chunk
+        n = len(self.rows)
+        self.starts = np.asarray(self.data[:, 0, 0]) if n else np.zeros(0)
+        self.ends = np.asarray(self.data[np.arange(n), 0, np.maximum(self.rows - 1, 0)]) if n else np.zeros(0)
+        self.offsets = np.concatenate([[0], np.cumsum(self.rows)]) # Global row number of each chunk's first row
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    @property
+    def start(self):
+        return float(self.starts[0]) if len(self.starts) else None
+
+    @property
+    def end(self):
+        return float(self.ends[-1]) if len(self.ends) else None
+
+    def chunk(self, i, channel):
+        """View of one channel of chunk i, only its filled rows."""
+        return self.data[i, self.index[channel], :self.rows[i]]
+
+    def seek(self, t):
+        """(chunk, row) of the first sample at or after t, (n_chunks, 0) if there is none."""
+        i = int(np.searchsorted(self.ends, t, side="left"))
+        if i >= len(self.rows):
+            return len(self.rows), 0
+        return i, int(np.searchsorted(self.chunk(i, "t"), t, side="left"))
+
+    def _spans(self, t0, t1):
+        """(chunk, first row, end row) for every chunk with samples in [t0, t1)."""
+        i, row = self.seek(t0 if t0 is not None else -np.inf)
+        spans = []
+        while i < len(self.rows) and (t1 is None or self.starts[i] < t1):
+            end = self.rows[i] if t1 is None or self.ends[i] < t1 else \
+                int(np.searchsorted(self.chunk(i, "t"), t1, side="left"))
+            if end > row:
+                spans.append((i, row, end))
+            i += 1
+            row = 0
+        return spans
+
+    def window(self, channel, t0=None, t1=None):
+        """Views of `channel` for t0 <= t < t1, one per chunk, oldest first. np.concatenate() them for a copy."""
+        c = self.index[channel]
+        return [self.data[i, c, start:end] for i, start, end in self._spans(t0, t1)]
+
+    def window_rows(self, t0=None, t1=None):
+        """Views of every channel for t0 <= t < t1, each (channels, rows), one per chunk."""
+        return [self.data[i, :, start:end] for i, start, end in self._spans(t0, t1)]
+
+    def at(self, channel, t):
+        """The last value of `channel` at or before t, None before the first sample."""
+        i, row = self.seek(t)
+        if i < len(self.rows) and row < self.rows[i] and self.chunk(i, "t")[row] == t:
+            return float(self.chunk(i, channel)[row])
+        # Step back one sample, possibly into the previous chunk
+        if row == 0:
+            i -= 1
+            if i < 0:
+                return None
+            row = self.rows[i]
+        return float(self.chunk(i, channel)[row - 1])
+
+    def overview(self, channel, t0=None, t1=None, buckets=1000):
+        """(bucket start times, min, max) of `channel` over [t0, t1) in equal time buckets. Empty buckets are NaN."""
+        t0 = self.start if t0 is None else t0
+        t1 = self.end if t1 is None else t1
+        mins = np.full(buckets, np.nan)
+        maxs = np.full(buckets, np.nan)
+        if t0 is None or t1 <= t0:
+            return np.full(buckets, np.nan), mins, maxs
+        edges = np.linspace(t0, t1, buckets + 1)
+        c = self.index[channel]
+        # t1 itself is included, so the last sample of the log lands in the last bucket
+        for i, start, end in self._spans(t0, np.nextafter(t1, np.inf)):
+            times = self.data[i, 0, start:end]
+            values = self.data[i, c, start:end]
+            bucket = np.minimum(((times - t0) / (t1 - t0) * buckets).astype(np.int64), buckets - 1)
+            # Times are sorted, so each bucket is a contiguous run of the chunk
+            first = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+            b = bucket[first]
+            chunk_min = np.minimum.reduceat(values, first)
+            chunk_max = np.maximum.reduceat(values, first)
+            mins[b] = np.fmin(mins[b], chunk_min)
+            maxs[b] = np.fmax(maxs[b], chunk_max)
+        return edges[:-1], mins, maxs
+
+
+def open_dive(directory):
+    """{producer: LogReader} for every log in a dive directory."""
+    readers = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*" + EXTENSION))):
+        reader = LogReader(path)
+        readers[reader.producer] = reader
+    return readers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise a dive's sensor logs, or show a channel's min/max over time")
+    parser.add_argument("path", help="dive directory or a .rovlog file")
+    parser.add_argument("channel", nargs="?")
+    parser.add_argument("--start", type=float, default=0.0, help="s from the start of the log")
+    parser.add_argument("--end", type=float, help="s from the start of the log")
+    parser.add_argument("--buckets", type=int, default=20)
+    args = parser.parse_args()
+
+    if os.path.isdir(args.path):
+        for producer, reader in open_dive(args.path).items():
+            duration = reader.end - reader.start if len(reader) else 0.0
+            print(f"{producer:<10} {len(reader):>9} rows {len(reader.rows):>6} chunks {duration:>9.1f} s | "
+                  f"{' '.join(reader.channels)}")
+        return
+
+    reader = LogReader(args.path)
+    if args.channel is None or args.channel not in reader.index:
+        sys.exit(f"Channels: {' '.join(reader.channels)}")
+    if not len(reader):
+        sys.exit("Empty log")
+    t1 = reader.start + args.end if args.end is not None else reader.end
+    times, mins, maxs = reader.overview(args.channel, reader.start + args.start, t1, args.buckets)
+    for t, low, high in zip(times, mins, maxs):
+        print(f"{t - reader.start:>9.2f} s  {low:>12.4f} .. {high:<12.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,19 @@
-import pygame
-import numpy as np
 import time
+STARTED = time.monotonic()
+import numpy as np
+import os
 import json
 import socket
+import argparse
 import threading
+from collections import deque
 from config import *
-from input_handler import JoystickController
-from rov_kinematics import compute_thruster_forces, map_force_to_pwm
-from pid import PID
-from kf import DepthKalmanFilter
-import cv2
-import imagezmq
+from shared.control import HoldController, pwm_commands
+from video_latency import ClockOffset, VideoLatency
+from shared.udp_capture import UdpCapture, capture_path
+from sensor_log import DiveLog, TELEMETRY_CHANNELS, PRESSURE_CHANNELS, COMMAND_CHANNELS, CONTROL_CHANNELS
+# pygame (input_handler), cv2 and imagezmq (frame_decoder, vision, recorder) are imported only when they're used:
+# the GUI unless --headless, video unless VIDEO is off, so control and telemetry come up in a fraction of a second
 
 shared_data = {
     # Shared from base station to pi
@@ -25,34 +28,78 @@ shared_data = {
     "roll": 0,
     "pitch": 0,   
     "yaw": 0,     
-    "last_frames": {}
+    "pressure_samples": deque(maxlen=500), # (Pi time.time(), mbar) for every Bar30 reading, drained by the depth KF
+    "applied_pwms": None, # What the Pi is actually sending the ESCs, after ramping
+    "pilot_inputs": [0.0] * 6, # Read by the UI loop, sent instead of PWMs with ONBOARD_CONTROL
+    # Published by the control thread every step, replaced whole so readers never see half an update
+    "control": {"pwms": [1500] * 8, "forces": [0.0] * 8, "targets": [0.0] * 4, "measured_depth": 0.0},
+    "onboard": None, # Hold loop state reported by the Pi in onboard mode
+    "loops": {}, # Pi loop period/execution summaries, [mean, p50, p99, max] ms per loop
+    "last_frames": {},
+    "last_headers": {},
+    "video_stats": {},
+    # Published by the vision stage
+    "detections": {},
+    "gate_bearing": None, # Degrees from the heading, +ve to the right
+    "gate_seen": 0, # time.time() of the last gate detection
 }
 
+recorder = None
+vision = None
+# RECORD_SENSORS: one SensorLogger per producer, each only written from its own thread
+dive_log = None
+telemetry_log = None
+pressure_log = None
+command_log = None
+control_log = None
+udp_capture = None # RECORD_UDP
+clock_offset = ClockOffset()
+video_latency = VideoLatency(clock_offset)
+
 def video_receiver():
     """Listens for video streams and displays them in separate windows."""
-    image_hub = imagezmq.ImageHub()
+    from frame_decoder import FrameReceiver, RAW, JPEG
+    if VIDEO_REQ_REP:
+        receiver = FrameReceiver(f"tcp://*:{VIDEO_PORT}")
+    else:
+        receiver = FrameReceiver(f"tcp://{PI_IP}:{VIDEO_PORT}", req_rep=False)
+    shared_data['video_stats'] = receiver.stats
     print("[Thread] Video Receiver started. Waiting for frames...")
     
     while shared_data["running"]:
         try:
-            # recv_image returns the name of the stream (e.g., 'auv_realsense') 
-            # and the image itself
-            cam_id, frame = image_hub.recv_image()
+            # The name of the stream (e.g., 'auv_realsense'), the decoded image,
+            # and the header and payload as they came over the wire
+            cam_id, frame, header, payload = receiver.recv()
             
             # Display based on which camera sent it
+            shared_data['last_headers'][cam_id] = header
             shared_data['last_frames'][cam_id] = frame
+            video_latency.received(cam_id, header)
             # cv2.imshow(cam_id, frame) # Can't do this in demon thread
             # if cv2.waitKey(1) & 0xFF == ord('q'):
             #     break
-                
-            # Acknowledge receipt to the sender (required by imagezmq)
-            image_hub.send_reply(b'OK')
+
+            if vision is not None and header["enc"] in (RAW, JPEG):
+                vision.submit(cam_id, frame, header)
+
+            # Depth (uint16) isn't recorded, JPEG streams are stored without re-encoding
+            if recorder is not None and header["enc"] in (RAW, JPEG):
+                if header["enc"] == JPEG:
+                    recorder.record(cam_id, bytes(payload), is_jpeg=True)
+                else:
+                    recorder.record(cam_id, frame)
             
         except Exception as e:
             print(f"Video Receiver Error: {e}")
             time.sleep(1)
 
-    cv2.destroyAllWindows()
+def publish_detections(cam_id, detections, header):
+    """Vision results go into the shared state alongside telemetry."""
+    shared_data['detections'][cam_id] = detections
+    if detections.get("gate_bearing") is not None:
+        shared_data['gate_bearing'] = detections["gate_bearing"]
+        shared_data['gate_seen'] = header.get("t_cap", time.time())
 
 def command_sender():
     """Sends PWM commands at a steady frequency."""
@@ -63,14 +110,22 @@ def command_sender():
     print("[Thread] Command Sender started.")
     while shared_data["running"]:
         try:
-            pwms = shared_data["pwms"]
-            pwm_commands = {
-                "t1": invert_pwm(pwms[0], I1), "t2": invert_pwm(pwms[1], I2), 
-                "t3": invert_pwm(pwms[2], I3), "t4": invert_pwm(pwms[3], I4),
-                "t5": invert_pwm(pwms[4], I5), "t6": invert_pwm(pwms[5], I6),
-                "t7": invert_pwm(pwms[6], I7), "t8": invert_pwm(pwms[7], I8),
-            }
-            sock.sendto(json.dumps(pwm_commands).encode(), (PI_IP, UDP_PORT_CMD))
+            if ONBOARD_CONTROL:
+                # Setpoints and mode flags only, the Pi closes the loop itself
+                command = {
+                    "mode": "onboard",
+                    "inputs": shared_data["pilot_inputs"],
+                    "hold": {"depth": DEPTH_PID, "roll": ROLL_PID, "pitch": PITCH_PID, "yaw": YAW_PID},
+                }
+            else:
+                command = pwm_commands(shared_data["pwms"])
+            message = json.dumps(command).encode()
+            sock.sendto(message, (PI_IP, UDP_PORT_CMD))
+            if udp_capture is not None:
+                udp_capture.record(UDP_PORT_CMD, message)
+            if command_log is not None:
+                sent = [np.nan] * 8 if ONBOARD_CONTROL else list(command.values())
+                command_log.log([time.time(), float(ONBOARD_CONTROL)] + sent + list(shared_data["pilot_inputs"]))
             time.sleep(0.05)  # 20Hz
         except Exception as e:
             print(f"Sender Error: {e}")
@@ -91,16 +146,34 @@ def telemetry_listener():
     print("[Thread] Telemetry Listener started.")
     while shared_data["running"]:
         try:
-            data, addr = sock.recvfrom(1024)
+            data, addr = sock.recvfrom(4096)
+            received = time.time() # Before the samples are queued, so replay.py never has them arrive late
+            if udp_capture is not None:
+                udp_capture.record(UDP_PORT_DATA, data)
             telemetry = json.loads(data.decode())
+            clock_offset.add(telemetry['timestamp'])
             shared_data['cpu_temp'] = telemetry['cpu_temp']
             shared_data['timestamp'] = telemetry['timestamp']
             shared_data['pressure'] = telemetry['pressure'] - PRESSURE_OFFSET
+            # Older Pi code sends one reading per packet
+            for t, pressure in telemetry.get('pressure_samples', [(telemetry['timestamp'], telemetry['pressure'])]):
+                shared_data['pressure_samples'].append((t, pressure - PRESSURE_OFFSET))
+                if pressure_log is not None:
+                    pressure_log.log((t, pressure - PRESSURE_OFFSET))
             # shared_data['depth'] = telemetry['depth']
             shared_data['water_temp'] = telemetry['water_temp']
             shared_data['roll'] = telemetry['roll'] - ROLL_OFFSET
             shared_data['pitch'] = telemetry['pitch'] - PITCH_OFFSET
             shared_data['yaw'] = telemetry['yaw'] - YAW_OFFSET
+            shared_data['applied_pwms'] = telemetry.get('thrusters')
+            shared_data['onboard'] = telemetry.get('onboard')
+            if 'loops' in telemetry:
+                shared_data['loops'] = telemetry['loops']
+            if telemetry_log is not None:
+                applied = shared_data['applied_pwms'] or [np.nan] * 8
+                telemetry_log.log([received, telemetry['timestamp'], shared_data['pressure'], telemetry.get('depth', np.nan),
+                                   telemetry['water_temp'], telemetry['cpu_temp'], shared_data['roll'],
+                                   shared_data['pitch'], shared_data['yaw']] + list(applied))
             # In a real app, you'd save this to a global for the HUD to draw
         except socket.timeout:
             continue
@@ -108,127 +181,310 @@ def telemetry_listener():
             print(f"Listener Error: {e}")
 
 
+class NullController:
+    """Headless stand-in for the joystick: sticks centred, the hold loop still runs."""
+    def get_input_vector(self):
+        return np.zeros(6)
+
+
+class LoopClock:
+    """pygame.time.Clock without pygame, for headless mode."""
+    def __init__(self):
+        self.last = time.monotonic()
+        self.periods = deque(maxlen=10)
+
+    def tick(self, framerate):
+        """Sleeps out the rest of the frame, returns ms since the last tick."""
+        delay = self.last + 1 / framerate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        now = time.monotonic()
+        period = now - self.last
+        self.last = now
+        self.periods.append(period)
+        return period * 1000
+
+    def get_fps(self):
+        return len(self.periods) / sum(self.periods) if self.periods else 0.0
+
+
+CONTROL_RATE_LIMITS = (50, 200) # Hz, CONTROL_RATE_HZ: at least the Bar30 rate, at most what a step reliably fits in
+CONTROL_ERROR_INTERVAL = 1.0    # s, a step that keeps failing prints at most this often, ControlTiming counts them all
+
+
+class ControlTiming:
+    """Deadline accounting for the control thread: a step misses when it ends after the next tick was due."""
+    def __init__(self, rate):
+        low, high = CONTROL_RATE_LIMITS
+        if not low <= rate <= high:
+            raise ValueError(f"CONTROL_RATE_HZ must be {low}-{high} Hz, not {rate}")
+        self.rate = rate
+        self.period = 1 / rate
+        self.steps = 0
+        self.missed = 0
+        self.skipped = 0 # Ticks dropped after a miss instead of being run back to back
+        self.failed = 0  # Steps that raised
+        self.lateness = deque(maxlen=1000) # s from the tick to the thread waking up
+        self.execution = deque(maxlen=1000) # s per step
+
+    def record(self, late, execution, missed, skipped, failed):
+        self.steps += 1
+        self.lateness.append(late)
+        self.execution.append(execution)
+        self.missed += missed
+        self.skipped += skipped
+        self.failed += failed
+
+    def summary(self):
+        if not self.steps:
+            return f"{self.rate} Hz | not started"
+        late, execution = np.percentile(self.lateness, 99) * 1000, np.percentile(self.execution, 99) * 1000
+        return (f"{self.rate} Hz | {self.steps} steps | {self.missed} missed deadlines "
+                f"({self.missed / self.steps:.2%}), {self.skipped} ticks skipped, {self.failed} failed | "
+                f"wake-up p99 {late:.2f} ms | step p99 {execution:.2f} ms")
+
+
+def control_step(hold, dt):
+    """KF, hold PIDs, allocation and PWM mapping on the latest telemetry and pilot inputs."""
+    t = time.time()
+    # One KF update per Bar30 reading (~50 Hz), with the time between readings rather than between steps
+    samples = shared_data["pressure_samples"]
+    while samples:
+        hold.add_pressure(*samples.popleft())
+
+    raw_inputs = shared_data['pilot_inputs']
+    roll, pitch, yaw = shared_data['roll'], shared_data['pitch'], shared_data['yaw']
+    if ONBOARD_CONTROL:
+        # The Pi runs the hold loop, we only send it the sticks and show what it reports back
+        onboard = shared_data['onboard'] or {}
+        forces = onboard.get('forces', [0.0] * 8)
+        targets = onboard.get('targets', [0.0] * 4)
+        measured_depth = onboard.get('depth', 0.0)
+        pwms = onboard.get('pwms', [PWM_NEUTRAL] * 8)
+    else:
+        pwms = hold.step(raw_inputs, roll, pitch, yaw, dt)
+        forces = list(hold.forces)
+        targets = hold.targets()
+        measured_depth = hold.measured_depth
+    shared_data['pwms'] = pwms
+    shared_data['control'] = {"pwms": pwms, "forces": forces, "targets": targets, "measured_depth": measured_depth}
+    if control_log is not None:
+        control_log.log([t, dt] + [float(v) for v in raw_inputs] + [roll, pitch, yaw, hold.raw_depth,
+                         measured_depth] + list(targets) + list(hold.commands) + list(forces) + list(pwms))
+
+
+def control_loop(hold, timing):
+    """Runs control_step() every timing.period on a fixed schedule, the UI loop never holds it up."""
+    period = timing.period
+    print(f"[Thread] Control loop started at {timing.rate} Hz.")
+    next_tick = time.monotonic()
+    ticks = 1
+    last_error = -np.inf
+    while shared_data["running"]:
+        woke = time.monotonic()
+        failed = False
+        try:
+            # Fixed timestep: the PIDs see whole periods, including any ticks skipped after a miss
+            control_step(hold, ticks * period)
+        except Exception as e:
+            failed = True
+            if woke - last_error > CONTROL_ERROR_INTERVAL:
+                print(f"Control Error: {e} ({timing.failed + 1} failed steps so far)")
+                last_error = woke
+        done = time.monotonic()
+        late = woke - next_tick
+        next_tick += period
+        missed = done > next_tick
+        # A late tick still runs, straight away; ticks whose whole period has already gone are dropped, not burst
+        skipped = int((done - next_tick) / period) if missed else 0
+        next_tick += skipped * period
+        timing.record(late, done - woke, missed, skipped, failed)
+        ticks = 1 + skipped
+        delay = next_tick - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
 def main():
-    pygame.init()
-    screen = pygame.display.set_mode((400, 300))
-    clock = pygame.time.Clock()
+    global recorder, vision, udp_capture, dive_log, telemetry_log, pressure_log, command_log, control_log
+    parser = argparse.ArgumentParser(description="ROV base station")
+    parser.add_argument("--headless", action="store_true", default=HEADLESS,
+                        help="no pygame or cv2 windows, the sticks stay centred (see HEADLESS)")
+    parser.add_argument("--no-video", dest="video", action="store_false", default=VIDEO,
+                        help="don't receive video, cv2 and imagezmq are never imported (see VIDEO)")
+    parser.add_argument("--duration", type=float, help="exit after this many seconds")
+    args = parser.parse_args()
+    if overlay_summary():
+        print(f"[Config] {overlay_summary()}")
 
-    try:
-        controller = JoystickController(deadzone=0.1)
-    except RuntimeError as e:
-        print(e)
-        pygame.quit()
-        return
+    if args.headless:
+        clock = LoopClock()
+        controller = NullController()
+    else:
+        import pygame
+        from input_handler import JoystickController
+        pygame.init()
+        screen = pygame.display.set_mode((400, 300))
+        clock = pygame.time.Clock()
 
-    kf = DepthKalmanFilter()
+        try:
+            controller = JoystickController(deadzone=0.1)
+        except RuntimeError as e:
+            print(e)
+            pygame.quit()
+            return
+    show_video = args.video and not args.headless
+    if show_video:
+        import cv2
+
+    hold = HoldController()
 
-    target_depth = 0
-    depth_pid = PID(DEPTH_KP, DEPTH_KI, DEPTH_KD, 1, -1)
+    if args.video and RECORD_FOOTAGE:
+        from recorder import FootageRecorder
+        recorder = FootageRecorder(FOOTAGE_DIR, FOOTAGE_SEGMENT_SECONDS, FOOTAGE_QUEUE_SIZE,
+                                   FOOTAGE_DROP_POLICY, FOOTAGE_JPEG_QUALITY)
+        recorder.start()
 
-    target_roll = 0
-    roll_pid = PID(ROLL_KP, ROLL_KI, ROLL_KD, 1, -1, is_angle=True)
+    if args.video and VISION:
+        from vision import VisionStage
+        vision = VisionStage(VISION_PROCESSORS, publish_detections, VISION_WORKERS)
 
-    target_pitch = 0
-    pitch_pid = PID(PITCH_KP, PITCH_KI, PITCH_KD, 1, -1, is_angle=True)
+    if RECORD_SENSORS:
+        dive_log = DiveLog(SENSOR_LOG_DIR, SENSOR_LOG_CHUNK_ROWS, SENSOR_LOG_FLUSH_SECONDS)
+        telemetry_log = dive_log.logger("telemetry", TELEMETRY_CHANNELS, SENSOR_LOG_RATES["telemetry"])
+        pressure_log = dive_log.logger("pressure", PRESSURE_CHANNELS, SENSOR_LOG_RATES["pressure"])
+        command_log = dive_log.logger("commands", COMMAND_CHANNELS, SENSOR_LOG_RATES["commands"])
+        control_log = dive_log.logger("control", CONTROL_CHANNELS, SENSOR_LOG_RATES["control"])
+        print(f"[Logger] Writing sensor logs to {os.path.abspath(dive_log.directory)}")
 
-    target_yaw = 0
-    yaw_pid = PID(YAW_KP, YAW_KI, YAW_KD, 1, -1, is_angle=True)
+    if RECORD_UDP:
+        udp_capture = UdpCapture(capture_path(UDP_CAPTURE_DIR)).start()
 
     thread1 = threading.Thread(target=telemetry_listener, daemon=True)
     thread2 = threading.Thread(target=command_sender, daemon=True)
-    thread3 = threading.Thread(target=video_receiver, daemon=True)
-
+    control_timing = ControlTiming(CONTROL_RATE_HZ)
+    control_thread = threading.Thread(target=control_loop, args=(hold, control_timing), daemon=True)
     thread1.start()
     thread2.start()
-    thread3.start()
+    control_thread.start()
+    if args.video:
+        thread3 = threading.Thread(target=video_receiver, daemon=True)
+        thread3.start()
+    print(f"[Startup] Control and telemetry up {time.monotonic() - STARTED:.3f}s after start")
 
     running = True
-    while running:
-        dt = clock.tick(30)/1000
-
-        # Handle quit event
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
+    try:
+        while running:
+            clock.tick(UI_RATE_HZ)
+            if args.duration is not None and time.monotonic() - STARTED > args.duration:
                 running = False
 
-        p_curr = shared_data["pressure"]
-        raw_depth = max(0, (p_curr - 1013.25) * 100 / (1025 * 9.81))
-        measured_depth = kf.update(raw_depth, dt)
-
-        # Read joystick input
-        raw_inputs = controller.get_input_vector()
-        raw_surge, raw_sway, raw_heave, raw_roll, raw_pitch, raw_yaw = raw_inputs
-
-        if DEPTH_PID:
-            target_depth += raw_heave * 0.5 * dt
-            heave_command = depth_pid.compute(measured_depth, target_depth, dt)
-        else:
-            heave_command = raw_heave
-
-        if PITCH_PID:
-            target_pitch += raw_pitch * 20 * dt
-            pitch_command = pitch_pid.compute(shared_data['pitch'], target_pitch, dt)
-        else:
-            pitch_command = raw_pitch
-
-        if ROLL_PID:
-            target_roll += raw_roll * 20 * dt
-            roll_command = roll_pid.compute(shared_data['roll'], target_roll, dt)
-        else:
-            roll_command = raw_roll
-
-        if YAW_PID:
-            target_yaw += raw_yaw * 20 * dt
-            yaw_command = yaw_pid.compute(shared_data['yaw'], target_yaw, dt)
-        else:
-            yaw_command = raw_yaw
-
-        # Get thruster force distribution
-        thruster_forces = compute_thruster_forces(raw_surge, raw_sway, heave_command, roll_command, pitch_command, yaw_command)
-
-        # Convert forces to PWM
-        thruster_pwms = [map_force_to_pwm(f) for f in thruster_forces]
-        shared_data['pwms'] = thruster_pwms
-
-        p = shared_data["pwms"]
-        pi_temp = shared_data["water_temp"]
-        f = thruster_forces
-        
-        dashboard = (
-            f"\033[H" +  # Move cursor to top-left (Home)
-            f"\n"*20 +
-            f"--- ROV_SEA-6.0 DASHBOARD ---\n"
-            f"SYSTEM: Pressure: {p_curr:>7.2f} mb | Pi Temp: {pi_temp:>4.1f}°C\n"
-            f"{'-'*60}\n"
-            f"THRUSTERS (Forces & PWMs):\n"
-            f"  Horizontal: T1:{f[0]:>6.2f}({p[0]}) T2:{f[1]:>6.2f}({p[1]}) T3:{f[2]:>6.2f}({p[2]}) T4:{f[3]:>6.2f}({p[3]})\n"
-            f"  Vertical:   T5:{f[4]:>6.2f}({p[4]}) T6:{f[5]:>6.2f}({p[5]}) T7:{f[6]:>6.2f}({p[6]}) T8:{f[7]:>6.2f}({p[7]})\n"
-            f"{'-'*60}\n"
-            f"NAVIGATION:      {'[SETPOINT]':<15} {'[MEASURED]':<15}\n"
-            f"  Depth (m):     {target_depth:>15.2f} {measured_depth:>15.2f}\n"
-            f"  Roll  (°):     {target_roll:>15.2f} {shared_data['roll']:>15.2f}\n"
-            f"  Pitch (°):     {target_pitch:>15.2f} {shared_data['pitch']:>15.2f}\n"
-            f"  Yaw   (°):     {target_yaw:>15.2f} {shared_data['yaw']:>15.2f}\n"
-            f"{'-'*60}\n"
-            f"Status: RUNNING | Frequency: {clock.get_fps():.1f} FPS"
-        )
-
-        # Clear screen once at start or just use the Home cursor trick
-        print(dashboard, end='', flush=False)
-
-        cam_ids = list(shared_data['last_frames'].keys())
-        for cam_id in cam_ids:
-            frame = shared_data['last_frames'][cam_id]
-            if frame is not None:
-                cv2.imshow(cam_id, frame)
-            
-        # waitKey(1) is required to actually render the window
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            running = False
+            # Handle quit event
+            if not args.headless:
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        running = False
+
+            p_curr = shared_data["pressure"]
+            # The sticks are read here, pygame's events belong to this thread, the control thread takes the latest
+            shared_data['pilot_inputs'] = [float(v) for v in controller.get_input_vector()] # Sent in onboard mode, logged in both
+
+            control = shared_data['control']
+            thruster_forces = control['forces']
+            target_depth, target_roll, target_pitch, target_yaw = control['targets']
+            measured_depth = control['measured_depth']
+
+            p = control["pwms"]
+            applied = shared_data["applied_pwms"]
+            applied = " ".join(f"{pwm:>4}" for pwm in applied) if applied else "no telemetry"
+            pi_temp = shared_data["water_temp"]
+            f = thruster_forces
+
+            dashboard = (
+                f"\033[H" +  # Move cursor to top-left (Home)
+                f"\n"*20 +
+                f"--- ROV_SEA-6.0 DASHBOARD ---\n"
+                f"SYSTEM: Pressure: {p_curr:>7.2f} mb | Pi Temp: {pi_temp:>4.1f}°C\n"
+                f"{'-'*60}\n"
+                f"THRUSTERS (Forces & PWMs):\n"
+                f"  Horizontal: T1:{f[0]:>6.2f}({p[0]}) T2:{f[1]:>6.2f}({p[1]}) T3:{f[2]:>6.2f}({p[2]}) T4:{f[3]:>6.2f}({p[3]})\n"
+                f"  Vertical:   T5:{f[4]:>6.2f}({p[4]}) T6:{f[5]:>6.2f}({p[5]}) T7:{f[6]:>6.2f}({p[6]}) T8:{f[7]:>6.2f}({p[7]})\n"
+                f"  Applied:    {applied}\n"
+                f"{'-'*60}\n"
+                f"NAVIGATION:      {'[SETPOINT]':<15} {'[MEASURED]':<15}\n"
+                f"  Depth (m):     {target_depth:>15.2f} {measured_depth:>15.2f}\n"
+                f"  Roll  (°):     {target_roll:>15.2f} {shared_data['roll']:>15.2f}\n"
+                f"  Pitch (°):     {target_pitch:>15.2f} {shared_data['pitch']:>15.2f}\n"
+                f"  Yaw   (°):     {target_yaw:>15.2f} {shared_data['yaw']:>15.2f}\n"
+                f"{'-'*60}\n"
+                f"Status: RUNNING | Frequency: {clock.get_fps():.1f} FPS\n"
+                f"CONTROL: {control_timing.summary()}"
+            )
+            if ONBOARD_CONTROL:
+                onboard = shared_data['onboard']
+                if onboard is None:
+                    dashboard += "\nONBOARD: waiting for the Pi"
+                else:
+                    dashboard += (f"\nONBOARD: {onboard['state']} | hold loop {onboard['rate']:.0f} Hz | "
+                                  f"sample to thrust {onboard['latency_ms']:.1f} ms")
+            if shared_data['loops']:
+                # Worst-case period per Pi loop, p99/max ms
+                dashboard += "\nPI LOOPS: " + " | ".join(
+                    f"{name} {s['period_ms'][2]:.1f}/{s['period_ms'][3]:.1f}" for name, s in shared_data['loops'].items())
+            if dive_log is not None:
+                dashboard += f"\nLOG: {dive_log.stats()}"
+            if recorder is not None:
+                dashboard += f"\nREC: {recorder.frames_written.value} frames written | {recorder.frames_dropped} dropped"
+            if vision is not None:
+                gate = shared_data['gate_bearing']
+                gate = f"{gate:>6.1f}° ({time.time() - shared_data['gate_seen']:.1f}s ago)" if gate is not None else "not seen"
+                dashboard += (f"\nVISION: Gate: {gate} | {vision.processed} processed | {vision.skipped} skipped | "
+                              f"{vision.last_duration * 1000:.0f} ms")
+
+            for cam_id, stats in list(shared_data['video_stats'].items()):
+                dashboard += f"\nVIDEO: {cam_id:<24} {stats.summary()}"
+                dashboard += f"\n       {'':<24} {video_latency.summary(cam_id)}"
+
+            # Clear screen once at start or just use the Home cursor trick
+            print(dashboard, end='', flush=False)
+
+            if show_video:
+                cam_ids = list(shared_data['last_frames'].keys())
+                for cam_id in cam_ids:
+                    frame = shared_data['last_frames'][cam_id]
+                    if frame is not None:
+                        if frame.dtype == np.uint16:
+                            # Depth in mm, ~8.5 m full scale
+                            frame = cv2.applyColorMap(cv2.convertScaleAbs(frame, alpha=0.03), cv2.COLORMAP_JET)
+                        cv2.imshow(cam_id, frame)
+                        video_latency.displayed(cam_id, shared_data['last_headers'][cam_id])
+
+                # waitKey(1) is required to actually render the window
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    running = False
+    except KeyboardInterrupt:
+        pass
 
     # On exit: stop thrusters safely
-    pygame.quit()
+    if show_video:
+        cv2.destroyAllWindows()
+    if not args.headless:
+        pygame.quit()
     shared_data["running"] = False
+    control_thread.join(timeout=2.0)
+    print(f"\n[Control] {control_timing.summary()}")
+    if dive_log is not None:
+        # The loggers have one writer each, let the threads finish their last row first
+        thread1.join(timeout=2.0)
+        thread2.join(timeout=2.0)
+        dive_log.stop()
+        print(f"\n[Logger] {dive_log.stats()}")
+    if udp_capture is not None:
+        udp_capture.stop()
+    if recorder is not None:
+        recorder.stop()
+    if vision is not None:
+        vision.close()
     print("\nSimulation exited.")
 
 if __name__ == "__main__":
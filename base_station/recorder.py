@@ -0,0 +1,146 @@
+import os
+import time
+import queue
+import struct
+import multiprocessing as mp
+
+'''
+Footage is written as segments, one directory per camera:
+    <out_dir>/<cam_id>/<cam_id>_<segment start, epoch ms>.mjpg
+Every record in a segment is a RECORD_HEADER (capture time in s, payload length) followed by the JPEG bytes,
+so a segment can be seeked by time without decoding any frame.
+'''
+
+RECORD_HEADER = struct.Struct("<dI")
+
+DROP_OLDEST = "oldest"
+DROP_NEWEST = "newest"
+
+
+def _segment_path(out_dir, cam_id, start_time):
+    cam_dir = os.path.join(out_dir, cam_id)
+    os.makedirs(cam_dir, exist_ok=True)
+    return os.path.join(cam_dir, f"{cam_id}_{int(start_time * 1000)}.mjpg")
+
+
+def _writer_main(frame_queue, out_dir, segment_seconds, jpeg_quality, frames_written):
+    """Runs in the writer process: encodes raw frames if needed and appends them to the current segment."""
+    segments = {} # cam_id -> (file, segment start time)
+    cv2 = None
+
+    while True:
+        item = frame_queue.get()
+        if item is None:
+            break
+        cam_id, timestamp, payload, is_jpeg = item
+
+        if not is_jpeg:
+            # Raw frames are only encoded here, never on the receiving side
+            if cv2 is None:
+                import cv2
+            ok, buffer = cv2.imencode(".jpg", payload, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+            if not ok:
+                continue
+            payload = buffer.tobytes()
+
+        segment = segments.get(cam_id)
+        if segment is None or timestamp - segment[1] >= segment_seconds:
+            if segment is not None:
+                segment[0].close()
+            segment = (open(_segment_path(out_dir, cam_id, timestamp), "wb"), timestamp)
+            segments[cam_id] = segment
+
+        segment[0].write(RECORD_HEADER.pack(timestamp, len(payload)))
+        segment[0].write(payload)
+        frames_written.value += 1
+
+    for f, _ in segments.values():
+        f.close()
+
+
+def read_segment(path):
+    """Yields (timestamp, jpeg_bytes) for every record in a segment file."""
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            timestamp, length = RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                return # Truncated by a crash mid-write
+            yield timestamp, payload
+
+
+class FootageRecorder:
+    """
+    Hands frames to a background writer process without ever blocking the caller.
+    When the disk falls behind and the queue is full, frames are dropped by drop_policy:
+    DROP_OLDEST keeps the footage current, DROP_NEWEST keeps it contiguous.
+    """
+    def __init__(self, out_dir, segment_seconds=60, queue_size=64, drop_policy=DROP_OLDEST, jpeg_quality=90):
+        if drop_policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.out_dir = out_dir
+        self.segment_seconds = segment_seconds
+        self.drop_policy = drop_policy
+        self.jpeg_quality = jpeg_quality
+
+        self.queue = mp.Queue(maxsize=queue_size)
+        self.frames_written = mp.Value("L", 0, lock=False)
+        self.process = None
+
+        self.frames_queued = 0
+        self.frames_dropped = 0
+
+    def start(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.process = mp.Process(
+            target=_writer_main,
+            args=(self.queue, self.out_dir, self.segment_seconds, self.jpeg_quality, self.frames_written),
+            daemon=True,
+        )
+        self.process.start()
+        print(f"[Recorder] Writing footage to {os.path.abspath(self.out_dir)}")
+
+    def record(self, cam_id, frame, timestamp=None, is_jpeg=False):
+        """Queues a frame (BGR array, or JPEG bytes with is_jpeg=True). Returns False if a frame was dropped."""
+        if timestamp is None:
+            timestamp = time.time()
+        item = (cam_id, timestamp, frame, is_jpeg)
+
+        try:
+            self.queue.put_nowait(item)
+            self.frames_queued += 1
+            return True
+        except queue.Full:
+            pass
+
+        self.frames_dropped += 1
+        if self.drop_policy == DROP_NEWEST:
+            return False
+
+        # Make room by discarding the oldest queued frame
+        try:
+            self.queue.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            self.queue.put_nowait(item)
+            self.frames_queued += 1
+        except queue.Full:
+            pass
+        return False
+
+    def stop(self, timeout=5.0):
+        """Flushes queued frames and closes the open segments."""
+        if self.process is None:
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process = None
@@ -0,0 +1,199 @@
+import json
+import time
+import argparse
+import numpy as np
+import config # Puts the repo root on sys.path for shared/
+from shared import vehicle, control, rov_kinematics
+from shared.control import HoldController
+from log_reader import open_dive
+from sensor_log import SensorLogger, CONTROL_CHANNELS, THRUSTERS, AXES, EXTENSION
+
+'''
+Replays a dive's sensor logs (RECORD_SENSORS) through control.HoldController, the same KF, PIDs and allocation
+main.py runs, as fast as the CPU allows: no pygame clock, no sockets, no sleeping.
+
+Each control log row is one control thread step: before it, every Bar30 reading that had arrived by then goes into the
+KF, then the step runs on the recorded pilot inputs, angles and dt. A reading arrived with the first telemetry
+packet sent after it was taken, so its arrival time comes from the telemetry log (t_pi -> t).
+With unchanged config the replayed PWMs match the recorded ones to a few us (a reading that arrived while a step
+ran can land on either side of it), so any bigger difference after changing a gain or the allocator is that change:
+    python replay.py sensor_logs/<dive>
+    python replay.py sensor_logs/<dive> --set DEPTH_KP=2.0 --set DEPTH_KD=0.6 --out replayed.rovlog
+'''
+
+
+def apply_overrides(overrides):
+    """
+    Vehicle config values (gains, *_PID flags, MAX_THRUST, geometry, W1-W8, ...) as seen by shared/control.py and
+    rov_kinematics.py, which copied them from vehicle.py on import. The values vehicle.derive() computes from them
+    (the allocator limits, WORKING_THRUSTERS, INVERTED) are recomputed, they can't be overridden themselves.
+    """
+    values = dict(vars(vehicle))
+    derived = vehicle.derive(values)
+    for name, value in overrides.items():
+        if name in derived:
+            raise ValueError(f"{name} is computed from other config values (see vehicle.derive()), override those")
+        if not name.isupper() or name not in values:
+            raise ValueError(f"{name} isn't a config value used by the control stack")
+        if isinstance(values[name], np.ndarray):
+            value = np.array(value)
+        values[name] = value
+    derived = vehicle.derive(values)
+    for name, value in {**overrides, **derived}.items():
+        for module in (vehicle, control, rov_kinematics):
+            if hasattr(module, name):
+                setattr(module, name, value)
+
+
+def parse_override(text):
+    """NAME=VALUE, VALUE a number, True/False or a JSON list such as [45, -45, 135, -135]."""
+    name, equals, value = text.partition("=")
+    value = value.strip()
+    if not equals or not name.strip():
+        raise ValueError(f"--set {text}: expected NAME=VALUE")
+    if value in ("True", "False"):
+        return name.strip(), value == "True"
+    try:
+        return name.strip(), json.loads(value)
+    except json.JSONDecodeError:
+        raise ValueError(f"--set {text}: VALUE must be a number, True/False or a JSON list") from None
+
+
+def arrival_times(pressure_times, telemetry):
+    """Base station time each Bar30 reading (Pi clock) arrived: the receive time of the first packet sent after it."""
+    sent, received = telemetry
+    i = np.searchsorted(sent, pressure_times, side="left")
+    arrived = np.full(len(pressure_times), np.inf)
+    known = i < len(sent)
+    arrived[known] = received[i[known]]
+    return arrived
+
+
+class ReplayLog:
+    """The columns replay() needs from a dive directory, copied out of the logs. start/end: s into the control log."""
+    def __init__(self, directory, start=None, end=None):
+        readers = open_dive(directory)
+        for producer in ("control", "pressure", "telemetry"):
+            if producer not in readers:
+                raise FileNotFoundError(f"No {producer}{EXTENSION} in {directory}")
+        control_log, pressure_log, telemetry_log = readers["control"], readers["pressure"], readers["telemetry"]
+
+        def columns(reader, names, start=None, end=None):
+            return {name: np.concatenate(reader.window(name, start, end) or [np.zeros(0)]) for name in names}
+
+        t0 = control_log.start + start if start is not None and len(control_log) else None
+        t1 = control_log.start + end if end is not None and len(control_log) else None
+        self.control = columns(control_log, CONTROL_CHANNELS, t0, t1)
+        telemetry = columns(telemetry_log, ["t", "t_pi"])
+        pressure = columns(pressure_log, ["t", "pressure"])
+        self.pressure = pressure["pressure"]
+        self.pressure_times = pressure["t"]
+        self.arrivals = arrival_times(pressure["t"], (telemetry["t_pi"], telemetry["t"]))
+
+    def __len__(self):
+        return len(self.control["t"])
+
+
+def replay(log, hold=None):
+    """Runs every control step of a ReplayLog, returns {channel: array} laid out like the control log."""
+    hold = hold if hold is not None else HoldController()
+    c = log.control
+    n = len(log)
+    inputs = np.stack([c[f"input_{axis}"] for axis in AXES], axis=1)
+    out = {name: np.zeros(n) for name in CONTROL_CHANNELS}
+    forces = np.zeros((n, 8))
+    pwms = np.zeros((n, 8))
+    targets = np.zeros((n, 4))
+    commands = np.zeros((n, 4))
+    raw_depth = np.zeros(n)
+    kf_depth = np.zeros(n)
+
+    # Readings that arrived before the log starts still warm the KF up, as they did live
+    sample = 0
+    n_samples = len(log.arrivals)
+    for k in range(n):
+        t = c["t"][k]
+        while sample < n_samples and log.arrivals[sample] <= t:
+            hold.add_pressure(log.pressure_times[sample], log.pressure[sample])
+            sample += 1
+        pwms[k] = hold.step(inputs[k], c["roll"][k], c["pitch"][k], c["yaw"][k], c["dt"][k])
+        forces[k] = hold.forces
+        targets[k] = hold.targets()
+        commands[k] = hold.commands
+        raw_depth[k] = hold.raw_depth
+        kf_depth[k] = hold.measured_depth
+
+    for name in ("t", "dt", "roll", "pitch", "yaw") + tuple(f"input_{axis}" for axis in AXES):
+        out[name] = c[name]
+    out["raw_depth"], out["kf_depth"] = raw_depth, kf_depth
+    for i, name in enumerate(["target_depth", "target_roll", "target_pitch", "target_yaw"]):
+        out[name] = targets[:, i]
+    for i, name in enumerate(["heave_cmd", "roll_cmd", "pitch_cmd", "yaw_cmd"]):
+        out[name] = commands[:, i]
+    for i, thruster in enumerate(THRUSTERS):
+        out[f"force_{thruster}"] = forces[:, i]
+        out[f"pwm_{thruster}"] = pwms[:, i]
+    return out
+
+
+def compare(recorded, replayed):
+    """Per thruster: (steps that differ, max |difference| in us, RMS difference in us)."""
+    result = {}
+    for thruster in THRUSTERS:
+        diff = replayed[f"pwm_{thruster}"] - recorded[f"pwm_{thruster}"]
+        result[thruster] = (int(np.count_nonzero(diff)), float(np.max(np.abs(diff), initial=0)),
+                            float(np.sqrt(np.mean(diff ** 2))) if len(diff) else 0.0)
+    return result
+
+
+def save(replayed, path, chunk_rows=1024):
+    """Writes the replay as a control log, so log_reader and the dive tools read it like a real one."""
+    logger = SensorLogger(path, "replay", CONTROL_CHANNELS, chunk_rows, n_buffers=2, max_chunk_seconds=np.inf).start()
+    rows = np.stack([replayed[name] for name in CONTROL_CHANNELS], axis=1)
+    for row in rows:
+        while logger.sealed - logger.flushed >= len(logger.buffers):
+            time.sleep(0.001) # Offline, so wait for the flusher instead of dropping
+        logger.log(row)
+    logger.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a dive's logs through the base station control stack")
+    parser.add_argument("dive", help="sensor log directory of one run (SENSOR_LOG_DIR/<start time>)")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="override a config value, e.g. DEPTH_KP=1.5, DEPTH_PID=True, W3=False or "
+                             "THRUSTER_ANGLES_DEG=[45,-45,135,-135]")
+    parser.add_argument("--start", type=float, help="s from the start of the control log")
+    parser.add_argument("--end", type=float, help="s from the start of the control log")
+    parser.add_argument("--out", help="write the replayed control log here")
+    args = parser.parse_args()
+
+    try:
+        overrides = dict(parse_override(text) for text in args.set)
+        apply_overrides(overrides)
+    except ValueError as e:
+        parser.error(str(e))
+
+    log = ReplayLog(args.dive, args.start, args.end)
+    if not len(log):
+        raise SystemExit("No control steps to replay")
+
+    started = time.perf_counter()
+    replayed = replay(log)
+    elapsed = time.perf_counter() - started
+    duration = log.control["t"][-1] - log.control["t"][0]
+    print(f"Replayed {len(log)} steps ({duration:.1f} s of dive) in {elapsed:.2f} s, "
+          f"{duration / max(elapsed, 1e-9):.0f}x real time" + (f", with {overrides}" if overrides else ""))
+
+    print(f"{'':<4} {'differ':>8} {'max us':>8} {'rms us':>8}")
+    for thruster, (differ, max_diff, rms) in compare(log.control, replayed).items():
+        print(f"{thruster:<4} {differ:>8} {max_diff:>8.0f} {rms:>8.1f}")
+    print(f"Depth: recorded KF {log.control['kf_depth'][-1]:.3f} m, replayed {replayed['kf_depth'][-1]:.3f} m at the end")
+
+    if args.out:
+        save(replayed, args.out)
+        print(f"Saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import os
+import json
+import math
+import time
+import queue
+import threading
+import numpy as np
+
+'''
+Columnar binary sensor logs (RECORD_SENSORS), one file per producer (telemetry, pressure, commands, control)
+so every logger has a single writer thread:
+    <log dir>/<dive start, epoch ms>/<producer>.rovlog
+
+A file is a HEADER_BYTES header (MAGIC, then JSON: producer, channels, chunk_rows, created) followed by chunks.
+Every chunk is the same size: its row count (int64), then each channel's chunk_rows float64 values in turn.
+Only the last chunk of a file, and chunks sealed early by max_chunk_seconds, are partly filled.
+DiveLog sizes chunk_rows per producer from its rate, so a chunk sealed on time is nearly full, not mostly padding.
+open_log() maps the whole file as a NumPy structured array, so opening an hour of data costs nothing.
+
+Writing: log() stores one row into a preallocated chunk buffer and bumps the row index, that's all the caller pays
+(plus an uncontended lock, shared with the flusher's timed seal). A full chunk is sealed and handed to the flusher
+thread, which appends it to the file. The flusher also seals a partly filled chunk once it's max_chunk_seconds old,
+so a producer that goes quiet (telemetry during link loss) still gets its rows to disk.
+If the flusher falls n_buffers chunks behind, new rows are dropped (and counted) rather than blocking the caller.
+'''
+
+MAGIC = b"ROVLOG1\n"
+HEADER_BYTES = 4096
+EXTENSION = ".rovlog"
+
+# Channels written by base_station/main.py, times are time.time() on the base station unless noted
+THRUSTERS = [f"t{i}" for i in range(1, 9)]
+AXES = ["surge", "sway", "heave", "roll", "pitch", "yaw"]
+TELEMETRY_CHANNELS = (["t", "t_pi", "pressure", "depth", "water_temp", "cpu_temp", "roll", "pitch", "yaw"]
+                      + [f"applied_{t}" for t in THRUSTERS]) # What the Pi sends the ESCs, NaN if it didn't say
+PRESSURE_CHANNELS = ["t", "pressure"] # t on the Pi's clock (t_pi in telemetry), every Bar30 reading, offset removed
+COMMAND_CHANNELS = (["t", "onboard"] + [f"cmd_{t}" for t in THRUSTERS] # As sent, inverted, NaN in onboard mode
+                    + [f"input_{axis}" for axis in AXES])
+CONTROL_CHANNELS = (["t", "dt"] + [f"input_{axis}" for axis in AXES] + ["roll", "pitch", "yaw", "raw_depth", "kf_depth"]
+                    + ["target_depth", "target_roll", "target_pitch", "target_yaw"]
+                    + ["heave_cmd", "roll_cmd", "pitch_cmd", "yaw_cmd"] # PID outputs on held axes, else the inputs
+                    + [f"force_{t}" for t in THRUSTERS] + [f"pwm_{t}" for t in THRUSTERS])
+
+
+CHUNK_HEADROOM = 1.25 # Chunk rows = rate x max_chunk_seconds x this, a producer running a little fast still fits
+
+
+def chunk_rows_for(rate, max_chunk_seconds, max_rows=1024):
+    """Rows per chunk for a producer logging `rate` rows/s, so a chunk fills in about max_chunk_seconds."""
+    if rate is None or not math.isfinite(max_chunk_seconds):
+        return max_rows
+    return max(1, min(max_rows, math.ceil(rate * max_chunk_seconds * CHUNK_HEADROOM)))
+
+
+def chunk_dtype(n_channels, chunk_rows):
+    return np.dtype([("rows", "<i8"), ("data", "<f8", (n_channels, chunk_rows))])
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        raw = f.read(HEADER_BYTES)
+    if not raw.startswith(MAGIC):
+        raise ValueError(f"{path} is not a sensor log")
+    return json.loads(raw[len(MAGIC):].rstrip(b"\0"))
+
+
+def open_log(path):
+    """(header, chunks): chunks is a read-only memmap, chunks["data"][i, channel, :chunks["rows"][i]] is chunk i."""
+    header = read_header(path)
+    dtype = chunk_dtype(len(header["channels"]), header["chunk_rows"])
+    # A chunk cut short by a crash mid-write is left out
+    n_chunks = (os.path.getsize(path) - HEADER_BYTES) // dtype.itemsize
+    if n_chunks <= 0:
+        return header, np.zeros(0, dtype)
+    return header, np.memmap(path, dtype=dtype, mode="r", offset=HEADER_BYTES, shape=(n_chunks,))
+
+
+class SensorLogger:
+    """Single writer: only the producer's thread calls log(), the flusher only seals on max_chunk_seconds."""
+    def __init__(self, path, producer, channels, chunk_rows=1024, n_buffers=8, max_chunk_seconds=10.0):
+        self.path = path
+        self.producer = producer
+        self.channels = list(channels)
+        self.index = {name: i for i, name in enumerate(self.channels)}
+        self.chunk_rows = chunk_rows
+        self.max_chunk_seconds = max_chunk_seconds # Seal partly filled chunks this often, bounds what a crash loses
+        # log() against the flusher's timed seal, which swaps block and resets row from the flusher thread.
+        # Without it a row written mid-seal lands in a chunk already queued for the file, or row += 1 undoes the reset.
+        # Only the seal makes the flusher take it, every max_chunk_seconds at most, so log() almost never waits,
+        # and an uncontended acquire is a few hundred ns on a per-row cost that's already about a microsecond.
+        self.lock = threading.Lock()
+
+        self.buffers = np.zeros(n_buffers, chunk_dtype(len(self.channels), chunk_rows))
+        self.sealed = 0  # Chunks handed to the flusher, writer only
+        self.flushed = 0 # Chunks written to the file, flusher only
+        self.block = self.buffers["data"][0] # (channels, chunk_rows) view of the chunk being filled
+        self.row = 0
+        self.chunk_started = None # time.monotonic() of the chunk's first row
+        self.rows_logged = 0
+        self.rows_dropped = 0
+
+        self.pending = queue.SimpleQueue()
+        self.thread = None
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        header = json.dumps({"producer": self.producer, "channels": self.channels,
+                             "chunk_rows": self.chunk_rows, "created": time.time()}).encode()
+        if len(MAGIC) + len(header) > HEADER_BYTES:
+            raise ValueError("Too many channels for the log header")
+        self.file = open(self.path, "wb")
+        self.file.write((MAGIC + header).ljust(HEADER_BYTES, b"\0"))
+        self.thread = threading.Thread(target=self._flush_loop, name=f"log_{self.producer}", daemon=True)
+        self.thread.start()
+        return self
+
+    def log(self, row):
+        """row: one value per channel, in order. Takes self.lock, see __init__."""
+        with self.lock:
+            if self.sealed - self.flushed >= len(self.buffers):
+                self.rows_dropped += 1
+                return
+            self.block[:, self.row] = row
+            self.row += 1
+            self.rows_logged += 1
+            if self.chunk_started is None:
+                self.chunk_started = time.monotonic()
+            if self.row == self.chunk_rows:
+                self._seal()
+
+    def _seal(self):
+        i = self.sealed % len(self.buffers)
+        self.buffers["rows"][i] = self.row
+        self.sealed += 1
+        self.pending.put(i)
+        self.block = self.buffers["data"][self.sealed % len(self.buffers)]
+        self.row = 0
+        self.chunk_started = None
+
+    def _seal_due(self):
+        """s until the chunk being filled is max_chunk_seconds old, None to wait for sealed chunks only."""
+        if not math.isfinite(self.max_chunk_seconds):
+            return None
+        started = self.chunk_started
+        if started is None:
+            return self.max_chunk_seconds
+        return max(0.0, started + self.max_chunk_seconds - time.monotonic())
+
+    def _flush_loop(self):
+        while True:
+            try:
+                i = self.pending.get(timeout=self._seal_due())
+            except queue.Empty:
+                with self.lock:
+                    if self.row and time.monotonic() - self.chunk_started >= self.max_chunk_seconds:
+                        self._seal()
+                continue
+            if i is None:
+                break
+            self.file.write(self.buffers[i:i + 1].tobytes())
+            self.file.flush()
+            self.flushed += 1
+
+    def stop(self):
+        """Writes the partly filled chunk and closes the file. Call from the writer's thread, or once it's done."""
+        if self.thread is None:
+            return
+        with self.lock:
+            if self.row:
+                self._seal()
+        self.pending.put(None)
+        self.thread.join()
+        self.thread = None
+        self.file.close()
+
+    def stats(self):
+        return f"{self.producer}: {self.rows_logged} rows, {self.flushed} chunks, {self.rows_dropped} dropped"
+
+
+class DiveLog:
+    """The loggers of one base station run, in their own directory."""
+    def __init__(self, log_dir, chunk_rows=1024, max_chunk_seconds=10.0):
+        """chunk_rows: the most rows per chunk, producers logging slower get chunks of max_chunk_seconds of rows."""
+        self.directory = os.path.join(log_dir, str(int(time.time() * 1000)))
+        self.chunk_rows = chunk_rows
+        self.max_chunk_seconds = max_chunk_seconds
+        self.loggers = {}
+
+    def logger(self, producer, channels, rate=None):
+        """rate: rows per second the producer is expected to log, None for chunk_rows per chunk."""
+        chunk_rows = chunk_rows_for(rate, self.max_chunk_seconds, self.chunk_rows)
+        logger = SensorLogger(os.path.join(self.directory, producer + EXTENSION), producer, channels,
+                              chunk_rows, max_chunk_seconds=self.max_chunk_seconds).start()
+        self.loggers[producer] = logger
+        return logger
+
+    def stop(self):
+        for logger in self.loggers.values():
+            logger.stop()
+
+    def stats(self):
+        return " | ".join(logger.stats() for logger in self.loggers.values())
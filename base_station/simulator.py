@@ -0,0 +1,332 @@
+import json
+import time
+import socket
+import argparse
+import numpy as np
+from config import *
+from shared.rov_kinematics import map_force_to_pwm
+from shared.control import HoldController, pwm_commands, INVERTED, THRUSTER_KEYS
+
+'''
+6-DOF rigid-body simulator of the vehicle, for closed-loop testing without the pool.
+
+Thrusters use the geometry in shared/vehicle.py (the same positions and angles compute_thruster_forces allocates for,
+with the wiring inversions and WORKING_THRUSTERS) and the T200 curve of rov_kinematics.map_force_to_pwm, inverted.
+On top: added mass, linear + quadratic drag per axis, weight and buoyancy with the centre of buoyancy above
+the centre of gravity, and the Pi's PWM ramp (RAMP_RATE) and link watchdog.
+State is held as (n vehicles, ...) arrays and stepped at 1 kHz, so a batch of vehicles costs about the same
+per step as one.
+
+Frames: body x forward, y right, z down; world north, east, down, so depth is +z. Thrust is in kgf, like
+MAX_THRUST. The hull numbers below are estimates, check them against a real dive with replay.py.
+
+As a stand-in for the Pi over loopback, talking to the unmodified base station:
+    python simulator.py
+    ROV_PI_IP=127.0.0.1 python main.py
+Offline, as fast as the CPU allows, with the base station's HoldController in the loop:
+    python simulator.py --offline 60 --target-depth 1.0
+'''
+
+G = 9.80665
+DT = 0.001 # s, physics step
+
+MASS = 6.0            # kg in air
+DISPLACED_MASS = 6.08 # kg of water displaced, slightly positively buoyant as trimmed
+COB = np.array([0.0, 0.0, -0.03])             # Centre of buoyancy from the centre of gravity, m (above it)
+INERTIA = np.array([0.06, 0.08, 0.10])        # kg m^2 about x, y, z
+ADDED_MASS = np.array([2.5, 4.0, 5.5, 0.02, 0.03, 0.03])       # surge, sway, heave kg; roll, pitch, yaw kg m^2
+LINEAR_DRAG = np.array([4.0, 6.0, 8.0, 0.5, 0.5, 0.5])         # N per m/s, N m per rad/s
+QUADRATIC_DRAG = np.array([25.0, 40.0, 50.0, 2.0, 2.0, 2.0])   # N per (m/s)^2, N m per (rad/s)^2
+
+# The Pi side
+RAMP_RATE = 7500       # us per second, as pi/ramping.py
+COMMAND_TIMEOUT = 1.0  # s, as pi/main.py
+PWM_MIN, PWM_MAX = 1100, 1900
+SURFACE_PRESSURE = 1013.25 + PRESSURE_OFFSET # mbar the Bar30 reads at the surface, the base station removes the offset
+PRESSURE_NOISE = 0.2   # mbar
+ANGLE_NOISE = 0.05     # deg
+PRESSURE_RATE = 50     # Hz, Bar30 samples
+TELEMETRY_INTERVAL = 0.1
+COMMAND_INTERVAL = 0.05 # main.py's command_sender
+
+
+def _thrust_table():
+    """(PWM, kgf) points of map_force_to_pwm over PWM_MIN..PWM_MAX, PWM ascending, for np.interp."""
+    forces = np.linspace(-8, 8, 8001)
+    pwms = np.array([map_force_to_pwm(f) for f in forces], dtype=float)
+    keep = (pwms >= PWM_MIN) & (pwms <= PWM_MAX)
+    pwms, forces = pwms[keep], forces[keep]
+    # Rounded PWMs repeat, average the thrust of each, and the 1464-1536 deadband maps to 0
+    table_pwms = np.unique(pwms)
+    table_forces = np.array([forces[pwms == pwm].mean() for pwm in table_pwms])
+    table_forces[(table_pwms > 1464) & (table_pwms < 1536)] = 0.0
+    return table_pwms, table_forces
+
+
+THRUST_PWMS, THRUST_KGF = _thrust_table()
+
+
+def pwm_to_thrust(pwms):
+    """PWM as the ESC sees it (after the wiring) to thrust in kgf, the inverse of map_force_to_pwm."""
+    return np.interp(pwms, THRUST_PWMS, THRUST_KGF)
+
+
+def thruster_matrix():
+    """(6, 8): thrust in kgf per thruster -> body force (x, y, z) in kgf and moment (roll, pitch, yaw) in kgf m."""
+    half_length, half_width = ROV_LENGTH_MM / 2000, ROV_WIDTH_MM / 2000
+    # T1..T4 lateral, T5..T8 vertical, same layout as compute_thruster_forces
+    corners = [(half_length, -half_width), (half_length, half_width), (-half_length, -half_width), (-half_length, half_width)]
+    positions = np.array([(x, y, 0.0) for x, y in corners * 2])
+    angles = np.deg2rad(THRUSTER_ANGLES_DEG)
+    directions = np.array([(np.cos(a), np.sin(a), 0.0) for a in angles] + [(0.0, 0.0, 1.0)] * 4) # Vertical: +ve down
+    return np.vstack([directions.T, np.cross(positions, directions).T])
+
+
+def cross(a, b):
+    """Row-wise a x b of (n, 3) arrays, np.cross costs more than the rest of a step at these sizes."""
+    a1, a2, a3 = a[:, 0], a[:, 1], a[:, 2]
+    b1, b2, b3 = b[:, 0], b[:, 1], b[:, 2]
+    return np.stack([a2 * b3 - a3 * b2, a3 * b1 - a1 * b3, a1 * b2 - a2 * b1], axis=1)
+
+
+class Simulator:
+    def __init__(self, n=1, dt=DT, depth=0.0, seed=0):
+        self.n = n
+        self.dt = dt
+        self.t = 0.0
+        self.rng = np.random.default_rng(seed)
+
+        self.position = np.zeros((n, 3)) # World NED, m
+        self.position[:, 2] = depth
+        self.euler = np.zeros((n, 3))    # Roll, pitch, yaw, rad
+        self.velocity = np.zeros((n, 6)) # Body u, v, w, p, q, r
+
+        self.targets = np.full((n, 8), float(PWM_NEUTRAL)) # PWMs as commanded, before the wiring inversions
+        self.applied = self.targets.copy()                 # After the Pi's ramp
+        self.inverted = np.array(INVERTED, dtype=bool)
+        self.working = np.array(WORKING_THRUSTERS, dtype=float)
+
+        self.B = thruster_matrix() * G # kgf -> N
+        self.mass = np.concatenate([MASS + ADDED_MASS[:3], INERTIA + ADDED_MASS[3:]])
+        self.weight = MASS * G
+        self.buoyancy = DISPLACED_MASS * G
+
+    def command(self, pwms):
+        """PWMs as the base station sends them (wiring inversions applied), (8,) or (n, 8). The ramp takes them from here."""
+        self.targets[:] = np.clip(pwms, PWM_MIN, PWM_MAX)
+
+    def neutral(self):
+        """The Pi's watchdog: straight to neutral, no ramp."""
+        self.targets[:] = PWM_NEUTRAL
+        self.applied[:] = PWM_NEUTRAL
+
+    def thrust(self):
+        """(n, 8) thrust in kgf each thruster produces."""
+        physical = np.where(self.inverted, 2 * PWM_NEUTRAL - self.applied, self.applied)
+        return pwm_to_thrust(physical) * self.working
+
+    def step(self, steps=1):
+        dt = self.dt
+        max_move = RAMP_RATE * dt
+        cob = np.broadcast_to(COB, (self.n, 3))
+        wrench = None
+        for _ in range(steps):
+            error = self.targets - self.applied
+            if wrench is None or error.any():
+                self.applied += np.clip(error, -max_move, max_move)
+                wrench = self.thrust() @ self.B.T # (n, 6) N, N m, only changes while ramping
+            tau = wrench.copy()
+
+            cr, cp, cy = np.cos(self.euler).T
+            sr, sp, sy = np.sin(self.euler).T
+            down = np.stack([-sp, cp * sr, cp * cr], axis=1) # World down in body axes, the last row of R
+            tau[:, :3] += (self.weight - self.buoyancy) * down
+            tau[:, 3:] += cross(cob, -self.buoyancy * down)
+
+            velocity = self.velocity
+            tau -= (LINEAR_DRAG + QUADRATIC_DRAG * np.abs(velocity)) * velocity
+            linear, angular = velocity[:, :3], velocity[:, 3:]
+            tau[:, :3] -= cross(angular, self.mass[:3] * linear)
+            tau[:, 3:] -= cross(angular, self.mass[3:] * angular)
+            velocity += tau / self.mass * dt
+
+            # Body to world with the ZYX Euler rotation R, written out: cheaper than building (n, 3, 3)
+            u, v, w, p, q, r = velocity.T
+            self.position += np.stack([
+                cy * cp * u + (cy * sp * sr - sy * cr) * v + (cy * sp * cr + sy * sr) * w,
+                sy * cp * u + (sy * sp * sr + cy * cr) * v + (sy * sp * cr - cy * sr) * w,
+                -sp * u + cp * sr * v + cp * cr * w,
+            ], axis=1) * dt
+            turn = sr * q + cr * r
+            self.euler += np.stack([p + turn * sp / cp, cr * q - sr * r, turn / cp], axis=1) * dt
+
+            # At the surface it floats: no higher, and no further upward speed
+            surfaced = self.position[:, 2] < 0
+            if surfaced.any():
+                self.position[surfaced, 2] = 0.0
+                self.velocity[surfaced, 2] = np.maximum(self.velocity[surfaced, 2], 0.0)
+            self.t += dt
+
+    def depth(self):
+        return self.position[:, 2].copy()
+
+    def pressure(self):
+        """(n,) mbar as the Pi reports it, PRESSURE_OFFSET included, with sensor noise."""
+        pressure = SURFACE_PRESSURE + self.position[:, 2] * 1025 * 9.81 / 100 # pressure_to_depth's constants
+        return pressure + self.rng.normal(0, PRESSURE_NOISE, self.n)
+
+    def angles(self):
+        """(n, 3) roll, pitch, yaw in degrees like the IMU, yaw in -180..180, with noise."""
+        degrees = np.degrees(self.euler) + self.rng.normal(0, ANGLE_NOISE, (self.n, 3))
+        degrees[:, 2] = (degrees[:, 2] + 180) % 360 - 180
+        return degrees
+
+
+def closed_loop(duration, inputs=(0, 0, 0, 0, 0, 0), hold=None, sim=None, control_rate=CONTROL_RATE_HZ,
+                target_depth=None):
+    """
+    One vehicle under the base station's HoldController, fed like main.py is: Bar30 samples are taken at
+    PRESSURE_RATE but reach the KF a telemetry packet at a time, the IMU angles only with each packet, and a control
+    step runs at control_rate on the latest of both. Every COMMAND_INTERVAL, like command_sender, the latest PWMs
+    go through pwm_commands() to the ramp.
+    inputs: pilot inputs, fixed or a function of t. Returns {"t", "depth", "kf_depth", "angles", "pwms"} arrays.
+    """
+    hold = hold if hold is not None else HoldController()
+    sim = sim if sim is not None else Simulator()
+    if target_depth is not None:
+        hold.target_depth = target_depth
+    # Events on the physics step grid
+    sample_every = max(int(round(1 / PRESSURE_RATE / sim.dt)), 1)
+    packet_every = max(int(round(TELEMETRY_INTERVAL / sim.dt)), 1)
+    control_every = max(int(round(1 / control_rate / sim.dt)), 1)
+    command_every = max(int(round(COMMAND_INTERVAL / sim.dt)), 1)
+    control_dt = control_every * sim.dt
+
+    trace = {"t": [], "depth": [], "kf_depth": [], "angles": [], "pwms": []}
+    samples = []
+    roll, pitch, yaw = sim.angles()[0]
+    k = 0
+    end = int(round(duration / sim.dt))
+    while k < end:
+        next_k = min((k // every + 1) * every for every in (sample_every, packet_every, control_every, command_every))
+        sim.step(next_k - k)
+        k = next_k
+        if k % sample_every == 0:
+            samples.append((sim.t, sim.pressure()[0] - PRESSURE_OFFSET))
+        if k % packet_every == 0:
+            for sample in samples:
+                hold.add_pressure(*sample)
+            samples = []
+            roll, pitch, yaw = sim.angles()[0] # As main.py has them, IMU offsets already removed
+        if k % control_every == 0:
+            pilot = inputs(sim.t) if callable(inputs) else inputs
+            pwms = hold.step(pilot, roll, pitch, yaw, control_dt)
+            trace["t"].append(sim.t)
+            trace["depth"].append(sim.depth()[0])
+            trace["kf_depth"].append(hold.measured_depth)
+            trace["angles"].append(np.degrees(sim.euler[0]))
+            trace["pwms"].append(list(pwms))
+        if k % command_every == 0:
+            sim.command(list(pwm_commands(hold.pwms).values()))
+    return {name: np.array(values) for name, values in trace.items()}
+
+
+def serve(base_station="127.0.0.1", depth=0.0, duration=None):
+    """Stands in for the Pi: commands on UDP_PORT_CMD, telemetry to the base station on UDP_PORT_DATA, in real time."""
+    sim = Simulator(depth=depth)
+    commands = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    commands.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    commands.bind(("0.0.0.0", UDP_PORT_CMD))
+    commands.setblocking(False)
+    telemetry = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    print(f"[Sim] Listening for commands on {UDP_PORT_CMD}, telemetry to {base_station}:{UDP_PORT_DATA}")
+
+    sample_interval = 1 / PRESSURE_RATE
+    steps = int(round(sample_interval / sim.dt))
+    started = time.monotonic()
+    last_command = started
+    last_telemetry = started
+    warned_onboard = False
+    samples = []
+    next_sample = started
+    while duration is None or time.monotonic() - started < duration:
+        while True:
+            try:
+                data, _ = commands.recvfrom(1024)
+            except BlockingIOError:
+                break
+            message = json.loads(data.decode())
+            if message.get("mode") == "onboard":
+                if not warned_onboard:
+                    print("[Sim] Onboard mode isn't simulated, set ONBOARD_CONTROL = False")
+                    warned_onboard = True
+                continue
+            sim.command([message.get(key, PWM_NEUTRAL) for key in THRUSTER_KEYS])
+            last_command = time.monotonic()
+        if time.monotonic() - last_command > COMMAND_TIMEOUT:
+            sim.neutral()
+
+        sim.step(steps)
+        samples.append([time.time(), round(float(sim.pressure()[0]), 2)]) # Unrounded, never after the packet timestamp
+
+        if time.monotonic() - last_telemetry >= TELEMETRY_INTERVAL:
+            roll, pitch, yaw = sim.angles()[0] + (ROLL_OFFSET, PITCH_OFFSET, YAW_OFFSET) # The IMU's own zero
+            message = {
+                "pressure": samples[-1][1],
+                "pressure_samples": samples,
+                "cpu_temp": 45.0,
+                "timestamp": time.time(),
+                "depth": float(sim.depth()[0]),
+                "water_temp": 20.0,
+                "roll": float(roll),
+                "pitch": float(pitch),
+                "yaw": float(yaw),
+                "thrusters": [int(round(pwm)) for pwm in sim.applied[0]],
+                "thrusters_t": time.time(),
+                "onboard": None,
+            }
+            telemetry.sendto(json.dumps(message).encode(), (base_station, UDP_PORT_DATA))
+            samples = []
+            last_telemetry = time.monotonic()
+            print(f"[Sim] t {sim.t:7.1f}s depth {sim.depth()[0]:6.2f} m | roll {roll:6.1f} pitch {pitch:6.1f} "
+                  f"yaw {yaw:6.1f} | PWM {' '.join(f'{pwm:4.0f}' for pwm in sim.applied[0])}", end="\r", flush=True)
+
+        next_sample += sample_interval
+        delay = next_sample - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            next_sample = time.monotonic() # Fell behind, don't try to catch up
+
+
+def main():
+    parser = argparse.ArgumentParser(description="6-DOF vehicle simulator")
+    parser.add_argument("--base-station", default="127.0.0.1", help="where to send telemetry")
+    parser.add_argument("--depth", type=float, default=0.0, help="starting depth, m")
+    parser.add_argument("--duration", type=float, help="exit after this many seconds")
+    parser.add_argument("--offline", type=float, metavar="SECONDS",
+                        help="no sockets: run HoldController against the simulator this long, as fast as possible")
+    parser.add_argument("--target-depth", type=float, default=1.0, help="depth to hold in --offline")
+    args = parser.parse_args()
+
+    if args.offline is None:
+        try:
+            serve(args.base_station, args.depth, args.duration)
+        except KeyboardInterrupt:
+            print()
+        return
+
+    started = time.perf_counter()
+    trace = closed_loop(args.offline, target_depth=args.target_depth, sim=Simulator(depth=args.depth))
+    elapsed = time.perf_counter() - started
+    print(f"{args.offline:.0f} s simulated in {elapsed:.2f} s, {args.offline / elapsed:.0f}x real time")
+    for t, depth in zip(trace["t"][::30], trace["depth"][::30]):
+        print(f"  t {t:6.1f}s depth {depth:6.3f} m")
+    error = np.abs(trace["depth"] - args.target_depth)
+    settled = trace["t"][np.flatnonzero(error > 0.05)[-1] + 1] if (error > 0.05).any() and error[-1] <= 0.05 else None
+    print(f"Final depth {trace['depth'][-1]:.3f} m, target {args.target_depth} m" +
+          (f", within 5 cm from {settled:.1f} s" if settled is not None else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import time
+from collections import deque
+import numpy as np
+
+'''
+Glass-to-glass latency per video stream, split by pipeline stage so we know which one to optimize first:
+    sensor  - Pi: sensor timestamp ("t_cap") -> the camera driver handing the frame over ("t_read")
+    encode  - Pi: payload encoding ("t_enc" in the frame header)
+    network - Pi send -> base station receive, including time queued behind the previous frame
+    decode  - base station decode ("t_dec")
+    display - receive -> shown by cv2.imshow in the main loop
+    age     - capture -> shown, the total the pilot sees
+Capture times are stamped with the Pi's clock, so they're mapped onto ours with the offset from ClockOffset.
+'''
+
+
+class ClockOffset:
+    """
+    Estimates (local clock - Pi clock) from telemetry heartbeats.
+    Each heartbeat gives local_receive - pi_send = offset + one-way delay, the minimum over a window is the best
+    estimate of the offset (it still includes the smallest network delay, well under a ms over the tether).
+    """
+    def __init__(self, window=100):
+        self.samples = deque(maxlen=window)
+
+    def add(self, remote_time, local_time=None):
+        if local_time is None:
+            local_time = time.time()
+        self.samples.append(local_time - remote_time)
+
+    @property
+    def offset(self):
+        """None until a heartbeat has arrived, then capture times are assumed to already be in our clock."""
+        if not self.samples:
+            return None
+        return min(self.samples)
+
+
+class LatencyWindow:
+    """Fixed-size ring of the latest measurements, in seconds."""
+    def __init__(self, size=300):
+        self.values = np.zeros(size)
+        self.count = 0
+
+    def add(self, value):
+        self.values[self.count % len(self.values)] = value
+        self.count += 1
+
+    def percentiles(self, q=(50, 95, 99)):
+        filled = self.values[:min(self.count, len(self.values))]
+        if len(filled) == 0:
+            return np.zeros(len(q))
+        return np.percentile(filled, q)
+
+
+class VideoLatency:
+    """Per-stream stage timings, fed by the video receiver thread and the display loop."""
+    STAGES = ("sensor", "encode", "network", "decode", "display", "age")
+
+    def __init__(self, clock_offset, window=300):
+        self.clock_offset = clock_offset
+        self.window = window
+        self.streams = {}
+        self.last_displayed = {}
+
+    def _stream(self, cam_id):
+        if cam_id not in self.streams:
+            self.streams[cam_id] = {stage: LatencyWindow(self.window) for stage in self.STAGES}
+        return self.streams[cam_id]
+
+    def _local_time(self, pi_time):
+        offset = self.clock_offset.offset
+        return pi_time + (offset if offset is not None else 0.0)
+
+    def _local_capture_time(self, header):
+        return self._local_time(header["t_cap"])
+
+    def received(self, cam_id, header):
+        if "t_cap" not in header:
+            return
+        stream = self._stream(cam_id)
+        read_time = header.get("t_read", header["t_cap"]) # Older Pi code only sent t_cap
+        stream["sensor"].add(read_time - header["t_cap"])
+        stream["encode"].add(header["t_enc"])
+        stream["network"].add(header["t_recv"] - self._local_time(read_time) - header["t_enc"])
+        stream["decode"].add(header["t_dec"])
+
+    def displayed(self, cam_id, header, display_time=None):
+        """Call after imshow, counts each frame once however often it is redrawn."""
+        if "t_cap" not in header or self.last_displayed.get(cam_id) == header["seq"]:
+            return
+        self.last_displayed[cam_id] = header["seq"]
+        if display_time is None:
+            display_time = time.time()
+        stream = self._stream(cam_id)
+        stream["display"].add(display_time - header["t_recv"])
+        stream["age"].add(display_time - self._local_capture_time(header))
+
+    def summary(self, cam_id):
+        """Age percentiles and the median of each stage, in ms."""
+        stream = self._stream(cam_id)
+        p50, p95, p99 = stream["age"].percentiles() * 1000
+        medians = {stage: stream[stage].percentiles((50,))[0] * 1000 for stage in self.STAGES[:-1]}
+        return (f"age p50/95/99 {p50:>5.0f}/{p95:>5.0f}/{p99:>5.0f} ms | "
+                f"sens {medians['sensor']:>4.1f} enc {medians['encode']:>4.1f} net {medians['network']:>5.1f} "
+                f"dec {medians['decode']:>4.1f} disp {medians['display']:>5.1f} ms")
@@ -0,0 +1,110 @@
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import cv2
+from config import CAMERA_HFOV_DEG, GATE_HSV_LOW, GATE_HSV_HIGH, GATE_MIN_AREA
+
+'''
+Vision processors take a BGR frame and return a dict of detections, they run in worker processes
+so they must be plain module level functions. Register new ones in PROCESSORS and list them in
+config.VISION_PROCESSORS.
+'''
+
+
+def detect_gate(frame):
+    """Finds the largest blob in the gate colour range and returns its bearing from the camera axis (+ve right)."""
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    mask = cv2.inRange(hsv, np.array(GATE_HSV_LOW), np.array(GATE_HSV_HIGH))
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return {"gate_bearing": None}
+
+    largest = max(contours, key=cv2.contourArea)
+    area = cv2.contourArea(largest)
+    if area < GATE_MIN_AREA:
+        return {"gate_bearing": None}
+
+    x, y, w, h = cv2.boundingRect(largest)
+    width = frame.shape[1]
+    # Pinhole model: offset from the image centre -> angle
+    offset = (x + w / 2 - width / 2) / (width / 2)
+    bearing = np.degrees(np.arctan(offset * np.tan(np.radians(CAMERA_HFOV_DEG / 2))))
+    return {"gate_bearing": float(bearing), "gate_area": float(area / (width * frame.shape[0]))}
+
+
+PROCESSORS = {
+    "gate": detect_gate,
+}
+
+
+def _run_processors(names, frame):
+    detections = {}
+    for name in names:
+        detections.update(PROCESSORS[name](frame))
+    return detections
+
+
+class VisionStage:
+    """
+    Runs processors on the newest frame of each camera in a process pool.
+    Each camera has at most one frame in flight, anything that arrives meanwhile only replaces the waiting
+    frame, so a slow processor skips frames instead of queueing them. submit() never blocks the caller.
+    on_result(cam_id, detections, header) is called from the pool's result thread.
+    """
+    def __init__(self, processor_names, on_result, workers=2):
+        for name in processor_names:
+            if name not in PROCESSORS:
+                raise ValueError(f"Unknown vision processor: {name}")
+        self.processor_names = list(processor_names)
+        self.on_result = on_result
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+
+        self.lock = threading.RLock() # The done callback runs inline if the future already finished
+        self.waiting = {} # cam_id -> (frame, header) not yet handed to the pool
+        self.busy = set() # cam_ids with a frame in flight
+
+        self.closed = False
+        self.processed = 0
+        self.skipped = 0
+        self.last_duration = 0.0
+
+    def submit(self, cam_id, frame, header):
+        with self.lock:
+            if cam_id in self.waiting:
+                self.skipped += 1
+            self.waiting[cam_id] = (frame, header)
+            if cam_id in self.busy or self.closed:
+                return
+            self._dispatch(cam_id)
+
+    def _dispatch(self, cam_id):
+        # Called with the lock held
+        frame, header = self.waiting.pop(cam_id)
+        self.busy.add(cam_id)
+        started = time.perf_counter()
+        future = self.pool.submit(_run_processors, self.processor_names, frame)
+        future.add_done_callback(lambda f: self._done(cam_id, header, started, f))
+
+    def _done(self, cam_id, header, started, future):
+        try:
+            detections = future.result()
+        except Exception as e:
+            print(f"Vision Error ({cam_id}): {e}")
+            detections = None
+
+        with self.lock:
+            self.processed += 1
+            self.last_duration = time.perf_counter() - started
+            self.busy.discard(cam_id)
+            if cam_id in self.waiting and not self.closed:
+                self._dispatch(cam_id)
+
+        if detections is not None:
+            self.on_result(cam_id, detections, header)
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+        # At most one frame per camera is still in flight, waiting for it is quick
+        self.pool.shutdown(wait=True, cancel_futures=True)
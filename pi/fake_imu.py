@@ -0,0 +1,96 @@
+import os
+import pty
+import tty
+import math
+import time
+import random
+import struct
+import threading
+from imu import crc16
+
+'''
+A stand-in for the IMU's USB serial port: replays a byte stream through a pseudo-terminal, so
+IMU(port=device.port) opens and reads it exactly like /dev/ttyUSB0.
+The stream is either a capture from the real IMU or synthetic_stream().
+'''
+
+SAMPLE_BYTES = 74 # A 0x2C packet (49 bytes) and a 0x14 packet (25 bytes) per sample
+
+
+def build_packet(length, floats):
+    """Header, length, 4 bytes of padding/counter, little-endian floats, CRC over everything from the length on."""
+    body = bytes([length]) + bytes(4) + struct.pack(f"<{len(floats)}f", *floats)
+    return b'\xAA\x55' + body + struct.pack("<H", crc16(body))
+
+
+def synthetic_stream(seconds=10, rate=200, glitches=True):
+    """IMU at `rate` Hz: a 0x2C (gyro, accel, mag) and a 0x14 (Euler) packet per sample, with line noise."""
+    rng = random.Random(0)
+    out = bytearray()
+    for i in range(int(seconds * rate)):
+        t = i / rate
+        out += build_packet(0x2C, [t] + [rng.uniform(-1, 1) for _ in range(9)])
+        out += build_packet(0x14, [t, 10 * math.sin(t), 5 * math.cos(t), (t * 20) % 360 - 180])
+        if glitches and i % 97 == 0:
+            out += bytes(rng.randrange(256) for _ in range(rng.randrange(1, 8)))
+    return bytes(out)
+
+
+class FakeIMUDevice:
+    """
+    Writes `stream` into a pty `chunk` bytes at a time, paced to `bytes_per_second`
+    (SAMPLE_BYTES * sample rate for a real IMU). With loop=True the stream repeats until stop().
+    """
+    def __init__(self, stream, bytes_per_second=SAMPLE_BYTES * 200, chunk=SAMPLE_BYTES, loop=True):
+        self.stream = stream
+        self.bytes_per_second = bytes_per_second
+        self.chunk = chunk
+        self.loop = loop
+
+        self.master, self.slave = pty.openpty()
+        # No echo or newline translation, the bytes must arrive untouched
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+
+        self.running = False
+        self.bytes_written = 0
+        self.thread = None
+
+    def _write_loop(self):
+        interval = self.chunk / self.bytes_per_second
+        next_write = time.monotonic()
+        pos = 0
+        while self.running:
+            if pos >= len(self.stream):
+                if not self.loop:
+                    break
+                pos = 0
+            data = self.stream[pos:pos + self.chunk]
+            try:
+                os.write(self.master, data)
+            except OSError:
+                break
+            pos += len(data)
+            self.bytes_written += len(data)
+
+            # Sleep to an absolute schedule so pacing doesn't drift with write time
+            next_write += interval
+            delay = next_write - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._write_loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
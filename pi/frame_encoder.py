@@ -0,0 +1,106 @@
+import json
+import time
+import zlib
+from shared.frame_format import RAW, JPEG, PNG16, ZLIB16, StreamStats
+
+'''
+Every frame goes out through imagezmq's send_jpg as (header, payload):
+    header: JSON text with the stream name ("cam"), encoding ("enc"), "shape" and "dtype",
+            plus the capture wall-clock time ("t_cap", s, the sensor timestamp), when the camera driver
+            handed the frame over ("t_read", s), a per-stream sequence number ("seq")
+            and the time spent encoding ("t_enc", s) for latency measurement on the base station
+    payload: the encoded bytes, or the raw pixel buffer for RAW
+The base station decodes it back in frame_decoder.py.
+numpy, cv2 and imagezmq are imported on first use, so the control process can import the encodings without them.
+The encodings (RAW, JPEG, PNG16, ZLIB16) and StreamStats are shared with the decoder, in shared/frame_format.py.
+'''
+
+
+def encode_frame(frame, encoding, jpeg_quality=80, compression_level=1):
+    """Returns the payload for a frame in the given encoding."""
+    import numpy as np
+    if encoding == RAW:
+        return np.ascontiguousarray(frame)
+    import cv2
+    if encoding == JPEG:
+        ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+    elif encoding == PNG16:
+        ok, buffer = cv2.imencode(".png", frame, [cv2.IMWRITE_PNG_COMPRESSION, compression_level])
+    elif encoding == ZLIB16:
+        # Neighbouring depth pixels are close, so the row-wise difference is mostly small values that zlib packs well
+        # uint16 arithmetic wraps, which keeps the round trip exact
+        delta = frame.copy()
+        delta[:, 1:] -= frame[:, :-1]
+        return zlib.compress(delta.tobytes(), compression_level)
+    else:
+        raise ValueError(f"Unknown encoding: {encoding}")
+
+    if not ok:
+        raise RuntimeError(f"{encoding} encoding failed")
+    return buffer
+
+
+class FrameSender:
+    """
+    Encodes frames per stream type and sends them to the base station's ImageHub.
+    req_rep=True waits for the hub's reply after every frame, connect_to is the hub's address.
+    req_rep=False publishes without waiting (slow subscribers drop frames), connect_to is the address to bind,
+    e.g. tcp://*:5555, and the hub connects to the Pi instead.
+    """
+    def __init__(self, connect_to, color_encoding=RAW, depth_encoding=PNG16, jpeg_quality=80, compression_level=1,
+                 req_rep=True):
+        import imagezmq
+        self.sender = imagezmq.ImageSender(connect_to=connect_to, REQ_REP=req_rep)
+        self.color_encoding = color_encoding
+        self.depth_encoding = depth_encoding
+        self.jpeg_quality = jpeg_quality
+        self.compression_level = compression_level
+        self.stats = {}
+        self.seq = {}
+
+    def send(self, name, frame, encoding, capture_time=None, read_time=None):
+        """
+        capture_time: the frame's sensor timestamp as time.time(), read_time: when the driver returned it.
+        Both default to now.
+        """
+        if read_time is None:
+            read_time = time.time()
+        if capture_time is None:
+            capture_time = read_time
+        start_cpu = time.thread_time()
+        start = time.perf_counter()
+        payload = encode_frame(frame, encoding, self.jpeg_quality, self.compression_level)
+        encode_time = time.perf_counter() - start
+
+        seq = self.seq.get(name, -1) + 1
+        self.seq[name] = seq
+        header = json.dumps({
+            "cam": name,
+            "enc": encoding,
+            "shape": frame.shape,
+            "dtype": str(frame.dtype),
+            "t_cap": capture_time,
+            "t_read": read_time,
+            "seq": seq,
+            "t_enc": encode_time,
+        })
+        cpu_time = time.thread_time() - start_cpu
+
+        self.sender.send_jpg(header, payload)
+
+        if name not in self.stats:
+            self.stats[name] = StreamStats()
+        self.stats[name].add(payload.nbytes if hasattr(payload, "nbytes") else len(payload), cpu_time)
+
+    def send_color(self, name, image, capture_time=None, read_time=None):
+        self.send(name, image, self.color_encoding, capture_time, read_time)
+
+    def send_depth(self, name, depth, capture_time=None, read_time=None):
+        self.send(name, depth, self.depth_encoding, capture_time, read_time)
+
+    def report(self):
+        """One line per stream: encoding cost and bandwidth since the sender was created."""
+        return "\n".join(f"[Video] {name:<24} {stats.summary()}" for name, stats in self.stats.items())
+
+    def close(self):
+        self.sender.close()
@@ -0,0 +1,299 @@
+import time
+import subprocess
+from collections import deque
+
+'''
+Every device the Pi talks to, with a real and a simulated backend so the whole stack can run on a laptop or CI box.
+Hardware libraries are only imported by the real backends, and each device is opened on its own,
+so a missing or broken device only takes down the subsystem that uses it.
+numpy and the IMU reader are imported on first use as well, so opening PWM for the failsafe never waits on them.
+
+Simulated backends:
+    IMU      - FakeIMUDevice replays a captured (or synthetic) byte stream through a pty, read by the unmodified IMU class
+    Pressure - SimulatedPressureSensor follows a scripted depth profile, with the MS5837's conversion delay
+    PWM      - RecordingPWM records every servo write instead of driving pigpio
+    Cameras  - SyntheticCamera generates moving test frames at the camera frame rate
+'''
+
+COLOR = "color"
+DEPTH = "depth"
+
+# Camera capture times are the frame's sensor timestamp as time.time(), not when the driver handed it over,
+# so the latency measured on the base station includes the sensor -> driver delay
+
+
+def realsense_capture_time(frame):
+    """A RealSense frame's timestamp (ms) as time.time(), now if it's on the camera's own clock."""
+    import pyrealsense2 as rs
+    # global_time is the device clock mapped onto the host's, system_time the host's at arrival, both epoch ms
+    if frame.get_frame_timestamp_domain() in (rs.timestamp_domain.global_time, rs.timestamp_domain.system_time):
+        return frame.get_timestamp() / 1000
+    return time.time()
+
+
+def boottime_to_wall(ns):
+    """A CLOCK_BOOTTIME timestamp in ns (libcamera's SensorTimestamp) as time.time()."""
+    return ns / 1e9 + time.time() - time.clock_gettime(time.CLOCK_BOOTTIME)
+
+# (time s, depth m) waypoints: sit at the surface, dive to 2 m, hold, come up to 0.5 m, surface
+DEFAULT_DEPTH_PROFILE = [(0, 0.0), (10, 0.0), (30, 2.0), (60, 2.0), (75, 0.5), (100, 0.5), (120, 0.0)]
+
+
+# --- Cameras ---
+
+class RealSenseCamera:
+    """D435 color stream, plus the decimated z16 depth stream if enabled."""
+    def __init__(self, depth=False, decimation=2):
+        self.depth = depth
+        self.decimation_magnitude = decimation
+        self.pipeline = None
+
+    def start(self):
+        import pyrealsense2 as rs
+        self.pipeline = rs.pipeline()
+        rs_config = rs.config()
+        rs_config.enable_stream(rs.stream.color, 640, 480, rs.format.bgr8, 30)
+        if self.depth:
+            rs_config.enable_stream(rs.stream.depth, 640, 480, rs.format.z16, 30)
+            self.decimation = rs.decimation_filter()
+            self.decimation.set_option(rs.option.filter_magnitude, self.decimation_magnitude)
+        self.pipeline.start(rs_config)
+
+    def read(self):
+        """Returns [(stream, kind, image, capture time.time())] for every frame that arrived."""
+        import numpy as np
+        frames = self.pipeline.wait_for_frames(timeout_ms=100)
+        out = []
+        color_frame = frames.get_color_frame()
+        if color_frame:
+            out.append(("realsense", COLOR, np.asanyarray(color_frame.get_data()), realsense_capture_time(color_frame)))
+        if self.depth:
+            depth_frame = frames.get_depth_frame()
+            if depth_frame:
+                depth = np.asanyarray(self.decimation.process(depth_frame).get_data())
+                out.append(("depth", DEPTH, depth, realsense_capture_time(depth_frame)))
+        return out
+
+    def stop(self):
+        if self.pipeline:
+            self.pipeline.stop()
+
+
+class PiCamera:
+    def __init__(self):
+        self.picam2 = None
+
+    def start(self):
+        from picamera2 import Picamera2
+        # Explicitly tell it NOT to probe other UVC devices
+        # We use index 0 or find the first internal cam to avoid grabbing RealSense
+        self.picam2 = Picamera2()
+        pc_config = self.picam2.create_preview_configuration(main={"size": (640, 480)})
+        self.picam2.configure(pc_config)
+        self.picam2.start()
+
+    def read(self):
+        import cv2
+        request = self.picam2.capture_request()
+        try:
+            pc_img_rgb = request.make_array("main")
+            sensor_time = request.get_metadata().get("SensorTimestamp")
+        finally:
+            request.release()
+        capture_time = boottime_to_wall(sensor_time) if sensor_time is not None else time.time()
+        return [("picam", COLOR, cv2.cvtColor(pc_img_rgb, cv2.COLOR_RGB2BGR), capture_time)]
+
+    def stop(self):
+        if self.picam2:
+            self.picam2.stop()
+
+
+class SyntheticCamera:
+    """Moving gradient frames at `fps`, plus a tilted-floor depth image if depth is set."""
+    def __init__(self, name, fps=30, depth=False, decimation=2):
+        self.name = name
+        self.fps = fps
+        self.depth = depth
+        self.decimation = decimation
+        self.count = 0
+        self.next_frame = 0.0
+
+    def start(self):
+        import numpy as np
+        x = np.linspace(0, 255, 640, dtype=np.float32)
+        y = np.linspace(0, 255, 480, dtype=np.float32)[:, None]
+        self.base = x + y
+        h, w = 480 // self.decimation, 640 // self.decimation
+        yy, xx = np.mgrid[0:h, 0:w]
+        self.floor = (1500 + 4 * yy + 2 * xx).astype(np.uint16)
+        self.next_frame = time.monotonic()
+
+    def read(self):
+        import numpy as np
+        delay = self.next_frame - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.next_frame += 1 / self.fps
+        self.count += 1
+
+        capture_time = time.time()
+        shade = ((self.base + self.count * 8) % 256).astype(np.uint8)
+        out = [(self.name, COLOR, np.dstack([shade, shade[:, ::-1], 255 - shade]), capture_time)]
+        if self.depth:
+            out.append(("depth", DEPTH, self.floor, capture_time))
+        return out
+
+    def stop(self):
+        pass
+
+
+# --- Pressure sensor ---
+
+class SimulatedPressureSensor:
+    """
+    MS5837-30BA look-alike (same methods and units as the ms5837 library) following a scripted depth profile
+    of (seconds since init(), depth m) waypoints, linearly interpolated and held after the last one.
+    read() takes as long as the real conversion at the requested oversampling.
+    """
+    def __init__(self, profile=None, fluid_density=1029, noise=0.002, water_temp=20.0):
+        import numpy as np
+        self.profile = np.array(profile or DEFAULT_DEPTH_PROFILE, dtype=float)
+        self.fluid_density = fluid_density
+        self.noise = noise
+        self.water_temp = water_temp
+        self.started = time.monotonic()
+        self._depth = 0.0
+        self.reads = 0
+
+    def init(self):
+        self.started = time.monotonic()
+        return True
+
+    def setFluidDensity(self, density):
+        self.fluid_density = density
+
+    def read(self, oversampling=5):
+        # The MS5837 converts pressure and temperature one after the other, 2.5 us * 2^(8 + OSR) each
+        import numpy as np
+        time.sleep(2 * 2.5e-6 * 2 ** (8 + oversampling))
+        t = time.monotonic() - self.started
+        depth = np.interp(t, self.profile[:, 0], self.profile[:, 1])
+        self._depth = float(depth + np.random.normal(0, self.noise))
+        self.reads += 1
+        return True
+
+    def pressure(self, conversion=1.0):
+        """mbar by default, same conversion factors as ms5837.UNITS_*"""
+        pa = 101300 + self._depth * self.fluid_density * 9.80665
+        return pa / 100 * conversion
+
+    def temperature(self, conversion=None):
+        return self.water_temp
+
+    def depth(self):
+        return self._depth
+
+
+# --- PWM ---
+
+class RecordingPWM:
+    """pigpio.pi() look-alike that keeps every servo write as (clock(), pin, pulsewidth)."""
+    def __init__(self, max_writes=1000000, clock=time.monotonic):
+        self.clock = clock # udp_replay.py passes its simulated clock
+        self.connected = True
+        self.pulsewidths = {}
+        self.writes = deque(maxlen=max_writes)
+        self.write_count = 0
+
+    def set_servo_pulsewidth(self, pin, pulsewidth):
+        self.pulsewidths[pin] = pulsewidth
+        self.writes.append((self.clock(), pin, pulsewidth))
+        self.write_count += 1
+        return 0
+
+    def get_servo_pulsewidth(self, pin):
+        return self.pulsewidths.get(pin, 0)
+
+    def stop(self):
+        self.connected = False
+
+
+class SimulatedCPUTemperature:
+    temperature = 45.0
+
+
+class Hardware:
+    """Opens the Pi's devices, real or simulated."""
+    def __init__(self, simulated=False, imu_port="/dev/ttyUSB0", imu_capture=None, depth_profile=None,
+                 depth_stream=False, depth_decimation=2):
+        self.simulated = simulated
+        self.imu_port = imu_port
+        self.imu_capture = imu_capture
+        self.depth_profile = depth_profile
+        self.depth_stream = depth_stream
+        self.depth_decimation = depth_decimation
+        self.fake_imu = None
+        self.imu = None
+
+    def open_imu(self):
+        from imu import IMU
+        port = self.imu_port
+        if self.simulated:
+            from fake_imu import FakeIMUDevice, synthetic_stream
+            if self.imu_capture:
+                with open(self.imu_capture, "rb") as f:
+                    stream = f.read()
+            else:
+                stream = synthetic_stream(seconds=60, glitches=False)
+            self.fake_imu = FakeIMUDevice(stream).start()
+            port = self.fake_imu.port
+
+        imu = IMU(port=port) # Check your port with v4l2-ctl or dmesg
+        # start() prints the serial error and returns False, an IMU that never started would read 0 angles forever
+        if not imu.start():
+            raise OSError(f"IMU on {port} didn't start")
+        self.imu = imu
+        return self.imu
+
+    def open_pressure_sensor(self):
+        if self.simulated:
+            sensor = SimulatedPressureSensor(self.depth_profile)
+        else:
+            import ms5837
+            sensor = ms5837.MS5837_30BA()
+        if not sensor.init():
+            raise OSError("Pressure sensor didn't initialise")
+        return sensor
+
+    def open_pwm(self):
+        """Returns a connected pigpio.pi() (starting pigpiod if needed), or a RecordingPWM."""
+        if self.simulated:
+            return RecordingPWM()
+
+        try:
+            subprocess.run(['sudo', 'pigpiod'], check=True, capture_output=True, text=True)
+            print("pigpiod started successfully.")
+        except subprocess.CalledProcessError as e:
+            print(f"Error starting pigpiod: {e.stderr}")
+
+        import pigpio
+        return pigpio.pi()
+
+    def open_cpu_temperature(self):
+        if self.simulated:
+            return SimulatedCPUTemperature()
+        from gpiozero import CPUTemperature
+        return CPUTemperature()
+
+    def cameras(self):
+        """Camera objects, not started yet: start(), then read() in a loop, stop()."""
+        if self.simulated:
+            return [SyntheticCamera("realsense", depth=self.depth_stream, decimation=self.depth_decimation),
+                    SyntheticCamera("picam")]
+        return [RealSenseCamera(self.depth_stream, self.depth_decimation), PiCamera()]
+
+    def close(self):
+        if self.imu is not None:
+            self.imu.stop()
+        if self.fake_imu is not None:
+            self.fake_imu.stop()
@@ -1,100 +1,159 @@
 import serial
 import struct
-import platform
 import serial.tools.list_ports
 import threading
+import select
 import time
+from sample_ring import SampleRing
+from loop_timing import LoopTimer
+
+PACKET_HEADER = b'\xAA\x55'
+
+# Euler packet (0x14): 4 little-endian floats from byte 7, the last three are roll, pitch, yaw
+EULER_ANGLES = struct.Struct('<3f')
+EULER_OFFSET = 11
+# IMU packet (0x2C): 10 little-endian floats from byte 7, the last nine are angular velocity, acceleration, magnetometer
+IMU_DATA = struct.Struct('<9f')
+IMU_DATA_OFFSET = 11
+
+# One row per 0x2C + 0x14 pair, t is the host time.monotonic() at which the bytes were read
+SAMPLE_COLUMNS = ("t", "gx", "gy", "gz", "ax", "ay", "az", "mx", "my", "mz", "roll", "pitch", "yaw")
+
+
+def _make_crc16_table():
+    """CRC-16/MODBUS (reflected 0xA001), one entry per byte value."""
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+CRC16_TABLE = _make_crc16_table()
+
+
+def crc16(data):
+    crc = 0xFFFF
+    for byte in data:
+        crc = (crc >> 8) ^ CRC16_TABLE[(crc ^ byte) & 0xFF]
+    return crc
+
 
 class IMU:
-    def __init__(self, port="/dev/ttyUSB0", baudrate=921600):
+    def __init__(self, port="/dev/ttyUSB0", baudrate=921600, sample_capacity=4096):
         self.port = port
         self.baudrate = baudrate
-        self.python_version = platform.python_version()[0]
         
         # State variables
-        self.key = 0
-        self.buff = {}
+        self.buff = bytearray() # Unparsed bytes, at most one partial packet
+        self.read_time = 0.0 # time.monotonic() of the chunk being parsed
         self.angle_degree = [0, 0, 0] # [roll, pitch, yaw]
+        self.imu_data = (0.0,) * 9 # [gx, gy, gz, ax, ay, az, mx, my, mz]
+        # Every complete sample, see SampleRing.read() for consumers
+        self.samples = SampleRing(sample_capacity, SAMPLE_COLUMNS)
         self.pub_flag = [True, True]
         self.running = False
         self.ser = None
 
+        # Reader thread counters, see stats()
+        self.read_timeout = 0.5 # s in select() before checking self.running again
+        self.read_started = time.monotonic()
+        self.timer = LoopTimer("imu")
+        self.wakeups = 0
+        self.timeouts = 0
+        self.bytes_read = 0
+        self.cpu_time = 0.0
+
     def checkSum(self, list_data, check_data):
-        data = bytearray(list_data)
-        crc = 0xFFFF
-        for byte in data:
-            crc ^= byte
-            for _ in range(8):
-                if (crc & 1) != 0:
-                    crc >>= 1
-                    crc ^= 0xA001
-                else:
-                    crc >>= 1
-        return hex(((crc & 0xff) << 8) + (crc >> 8)) == hex(check_data[0] << 8 | check_data[1])
-
-    def hex_to_ieee(self, raw_data):
-        ieee_data = []
-        raw_data.reverse()
-        for i in range(0, len(raw_data), 4):
-            hex_str = (
-                hex(raw_data[i]     | 0xff00)[4:6] +
-                hex(raw_data[i + 1] | 0xff00)[4:6] +
-                hex(raw_data[i + 2] | 0xff00)[4:6] +
-                hex(raw_data[i + 3] | 0xff00)[4:6]
-            )
-            if self.python_version == '2':
-                ieee_data.append(struct.unpack('>f', hex_str.decode('hex'))[0])
-            else:
-                ieee_data.append(struct.unpack('>f', bytes.fromhex(hex_str))[0])
-        ieee_data.reverse()
-        return ieee_data
-
-    def handleSerialData(self, raw_data):
-        if self.python_version == '2':
-            self.buff[self.key] = ord(raw_data)
-        else:
-            self.buff[self.key] = raw_data
-
-        self.key += 1
-
-        if self.buff[0] != 0xAA:
-            self.key = 0
-            return
-        if self.key < 3: return
-        if self.buff[1] != 0x55:
-            self.key = 0
-            return
-        if self.key < self.buff[2] + 5: return
-
-        data_buff = list(self.buff.values())
+        """CRC-16 of list_data against the two CRC bytes (low byte first) that follow it in the packet."""
+        return crc16(list_data) == check_data[0] | (check_data[1] << 8)
+
+    def handleSerialData(self, data):
+        """
+        Feeds a chunk from ser.read() into the parser. Complete packets are handled in place through
+        memoryview slices, a partial packet at the end stays buffered until the next chunk.
+        """
+        self.read_time = time.monotonic()
+        buff = self.buff
+        buff += data
+        size = len(buff)
+        pos = 0
+
+        with memoryview(buff) as view:
+            while True:
+                start = buff.find(PACKET_HEADER, pos)
+                if start < 0:
+                    # Nothing left to sync on, but a trailing 0xAA may be the first half of the next header
+                    pos = size - 1 if size and buff[-1] == 0xAA else size
+                    break
+                if start + 3 > size:
+                    pos = start
+                    break
+                end = start + buff[start + 2] + 5
+                if end > size:
+                    pos = start
+                    break
+                packet = view[start:end]
+                self._handle_packet(packet)
+                packet.release()
+                pos = end
 
+        del buff[:pos]
+
+    def _handle_packet(self, packet):
+        """packet is a complete frame from the 0xAA 0x55 header through the CRC."""
         # Euler angle packet
-        if self.buff[2] == 0x14:
-            if self.checkSum(data_buff[2:23], data_buff[23:25]):
-                data = self.hex_to_ieee(data_buff[7:23])
-                self.angle_degree = data[1:4]
+        if packet[2] == 0x14:
+            if self.checkSum(packet[2:23], packet[23:25]):
+                self.angle_degree = list(EULER_ANGLES.unpack_from(packet, EULER_OFFSET))
             self.pub_flag[1] = False
         
-        # Other packets (0x2C) - we just acknowledge them to keep sync
-        elif self.buff[2] == 0x2C:
+        # Angular velocity, acceleration and magnetometer packet
+        elif packet[2] == 0x2C:
+            if self.checkSum(packet[2:47], packet[47:49]):
+                self.imu_data = IMU_DATA.unpack_from(packet, IMU_DATA_OFFSET)
             self.pub_flag[0] = False
 
-        self.buff = {}
-        self.key = 0
+        # Both halves of a sample have arrived
         if not self.pub_flag[0] and not self.pub_flag[1]:
             self.pub_flag[0] = self.pub_flag[1] = True
+            self.samples.append((self.read_time, *self.imu_data, *self.angle_degree))
 
     def _read_loop(self):
+        """Sleeps in select() until the IMU sends something, then parses everything that is waiting."""
+        self.timer.enter_thread()
+        fd = self.ser.fileno()
+        self.read_started = time.monotonic()
         while self.running:
             try:
-                if self.ser.inWaiting() > 0:
-                    data = self.ser.read(self.ser.inWaiting())
-                    for byte in data:
-                        self.handleSerialData(byte)
+                ready, _, _ = select.select([fd], [], [], self.read_timeout)
+                self.wakeups += 1
+                if not ready:
+                    self.timeouts += 1
+                    continue
+                self.timer.start()
+                data = self.ser.read(max(self.ser.in_waiting, 1))
+                self.bytes_read += len(data)
+                self.handleSerialData(data)
+                self.timer.stop()
             except Exception as e:
-                print(f"IMU Read Error: {e}")
+                if self.running: # Otherwise the port was closed under us on shutdown
+                    print(f"IMU Read Error: {e}")
                 break
-            time.sleep(0.001)
+            finally:
+                self.cpu_time = time.thread_time()
+
+    def stats(self):
+        """Reader thread counters since start(), for checking it isn't burning the CPU."""
+        elapsed = max(time.monotonic() - self.read_started, 1e-6)
+        return {
+            "wakeups_per_s": self.wakeups / elapsed,
+            "timeouts": self.timeouts,
+            "bytes_per_s": self.bytes_read / elapsed,
+            "samples": self.samples.head,
+            "cpu_percent": self.cpu_time / elapsed * 100,
+        }
 
     def start(self):
         try:
@@ -106,6 +165,9 @@ class IMU:
             print(f"Failed to open IMU: {e}")
             return False
 
+    def stop(self):
+        self.running = False
+
     def get_angles(self):
         """Returns (roll, pitch, yaw)"""
         return self.angle_degree[0], self.angle_degree[1], self.angle_degree[2]
\ No newline at end of file
@@ -0,0 +1,147 @@
+import os
+import math
+import time
+
+'''
+Period and execution-time histograms for the Pi's loops, plus optional real-time scheduling per thread.
+
+Each loop owns a LoopTimer and calls start() when it wakes up and stop() when its work is done.
+That's two monotonic reads and two list increments, so it is cheap enough for the ramp and pressure loops.
+Times go into log-spaced buckets, 4 per octave from 1 us to ~1 min, so percentiles are within ~12%.
+summary() returns and clears the counts since the last call, sensor_sender puts them in telemetry.
+
+Real-time: configure() names the threads that should run SCHED_FIFO and/or be pinned to CPUs.
+Each thread applies its own settings when it calls enter_thread(), on Linux both calls act on the calling thread.
+Without permission (not root, no CAP_SYS_NICE or RLIMIT_RTPRIO) or on another OS it carries on as a normal thread,
+and rt_status says why.
+'''
+
+SUB_BUCKETS = 4
+MAX_OCTAVE = 26 # 2^26 us, ~67 s
+N_BUCKETS = (MAX_OCTAVE + 1) * SUB_BUCKETS
+
+TIMERS = {}
+_realtime = {} # thread name -> (SCHED_FIFO priority or None, CPUs or None)
+
+
+def _bucket(seconds):
+    mantissa, exponent = math.frexp(seconds * 1e6) # us = mantissa * 2^exponent, mantissa in [0.5, 1)
+    if exponent <= 0:
+        return 0
+    if exponent > MAX_OCTAVE:
+        return N_BUCKETS - 1
+    return exponent * SUB_BUCKETS + int((mantissa - 0.5) * 2 * SUB_BUCKETS)
+
+
+def _bucket_upper(bucket):
+    """Upper edge of a bucket, in s."""
+    exponent, sub = divmod(bucket, SUB_BUCKETS)
+    return (0.5 + (sub + 1) / (2 * SUB_BUCKETS)) * 2 ** exponent / 1e6
+
+
+class Histogram:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * N_BUCKETS
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.counts[_bucket(seconds)] += 1
+        self.n += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        if self.n == 0:
+            return 0.0
+        wanted = q / 100 * self.n
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= wanted:
+                return min(_bucket_upper(bucket), self.max)
+        return self.max
+
+    def summary(self):
+        """[mean, p50, p99, max] in ms."""
+        mean = self.total / self.n if self.n else 0.0
+        return [round(v * 1000, 3) for v in (mean, self.percentile(50), self.percentile(99), self.max)]
+
+
+class LoopTimer:
+    def __init__(self, name):
+        self.name = name
+        self.period = Histogram()
+        self.execution = Histogram()
+        self.last_start = None
+        self.started = None
+        self.rt_status = "normal"
+        TIMERS[name] = self
+
+    def enter_thread(self):
+        """Call first thing in the loop's thread: applies any real-time settings configured for it."""
+        if self.name in _realtime:
+            priority, cpus = _realtime[self.name]
+            self.rt_status = set_realtime(priority, cpus)
+
+    def start(self):
+        now = time.monotonic()
+        if self.last_start is not None:
+            self.period.add(now - self.last_start)
+        self.last_start = self.started = now
+
+    def stop(self):
+        if self.started is not None:
+            self.execution.add(time.monotonic() - self.started)
+            self.started = None
+
+    def summary(self):
+        """Period and execution [mean, p50, p99, max] ms since the last call, then clears them."""
+        period, execution = self.period, self.execution
+        self.period, self.execution = Histogram(), Histogram()
+        return {"n": execution.n, "period_ms": period.summary(), "exec_ms": execution.summary(), "rt": self.rt_status}
+
+
+def set_realtime(priority=None, cpus=None):
+    """SCHED_FIFO at `priority` and/or affinity to `cpus` for the calling thread. Returns what was applied."""
+    applied = []
+    if cpus:
+        try:
+            available = os.sched_getaffinity(0)
+            cpus = set(cpus) & available or available
+            os.sched_setaffinity(0, cpus)
+            applied.append(f"cpus {sorted(cpus)}")
+        except (AttributeError, OSError) as e:
+            applied.append(f"no affinity ({e.__class__.__name__})")
+    if priority:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+            applied.append(f"fifo {priority}")
+        except (AttributeError, OSError) as e:
+            applied.append(f"no fifo ({e.__class__.__name__})")
+    return ", ".join(applied) or "normal"
+
+
+def configure(realtime):
+    """realtime: {thread name: (SCHED_FIFO priority or None, CPUs or None)}, applied as each thread starts."""
+    _realtime.clear()
+    _realtime.update(realtime)
+
+
+def summaries():
+    return {name: timer.summary() for name, timer in list(TIMERS.items())}
+
+
+def report(loop_summaries):
+    lines = []
+    for name, s in loop_summaries.items():
+        period, execution = s["period_ms"], s["exec_ms"]
+        lines.append(f"[Loop] {name:<10} {s['n']:>6} runs | period mean {period[0]:>7.2f} p99 {period[2]:>7.2f} "
+                     f"max {period[3]:>7.2f} ms | exec mean {execution[0]:>6.3f} p99 {execution[2]:>6.3f} "
+                     f"max {execution[3]:>6.3f} ms | {s['rt']}")
+    return "\n".join(lines)
@@ -1,193 +1,186 @@
+import time
+STARTED = time.monotonic() # t0 of the startup timeline
+import os
+import sys
 import socket
 import threading
-import time
 import json
-import subprocess
-from gpiozero import CPUTemperature
-import pigpio
-import cv2
-import imagezmq
-import pyrealsense2 as rs
-import numpy as np
-import ms5837
-from picamera2 import Picamera2
-from imu import IMU
-
-# Initialize IMU
-imu_sensor = IMU(port='/dev/ttyUSB0') # Check your port with v4l2-ctl or dmesg
-imu_sensor.start()
-
-sensor = ms5837.MS5837_30BA()
-sensor.init()
-
-cpu = CPUTemperature()
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+# The repo root, for shared/ (the hold controller, vehicle config and UDP capture format the base station also uses)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hardware import Hardware
+from frame_encoder import RAW, JPEG, PNG16, ZLIB16
+import loop_timing
+from loop_timing import LoopTimer
+from ramping import RampEngine, RAMP_RATE
+from startup import StartupTimeline
+# pressure_sampler, onboard_control and video_process (numpy, the KF/PID stack) are imported in bring_up(),
+# after the thrusters are neutral and the command receiver is listening
 
 # --- Configuration ---
 # PC_IP = "192.168.137.1"  # Replace with your Base Station IP
 # PC_IP = socket.gethostbyname("laptop.local")
 # PC_IP = "192.168.0.113"
-PC_IP = socket.gethostbyname('mba.local')
+BASE_STATION_HOST = 'mba.local' # Resolved at startup, override with --base-station
+RESOLVE_ATTEMPTS = 5     # mDNS can take a while after boot, the Pi shuts down if the base station never resolves
+RESOLVE_RETRY = 2.0      # s between attempts
+PC_IP = None
 PI_IP = "0.0.0.0"        
 UDP_PORT_DATA = 5005    
 UDP_PORT_CMD = 5006     
 
-# --- Ramping Constants ---
-RAMP_STEP = 15        # How many Âµs to change per loop iteration
-LOOP_FREQ = 0.002      # 20Hz update (50ms)
-
-# Global PWM States
-# target_pwms: what the base station is asking for
-# current_pwms: what is actually being sent to the ESCs right now
-target_pwms = {f"t{i}": 1500 for i in range(1, 9)}
-current_pwms = {f"t{i}": 1500 for i in range(1, 9)}
-
-telemetry = {
-    "pressure": 1013.25,
-    "depth": 0,
-    "cpu_temp": cpu.temperature,
-    "ps_temp": 0,
-    "timestamp":0,
-    "roll": 0,
-    "pitch": 0,   
-    "yaw": 0     
-}
+# --- Video ---
+VIDEO_PORT = 5555
+VIDEO_REQ_REP = True     # Must match VIDEO_REQ_REP in base_station/config.py, False publishes without waiting for replies
+COLOR_ENCODING = RAW     # RAW or JPEG
+JPEG_QUALITY = 80
+DEPTH_STREAM = False     # Also stream the RealSense z16 depth channel alongside color
+DEPTH_ENCODING = PNG16   # PNG16 or ZLIB16, both lossless
+DEPTH_DECIMATION = 2     # RealSense decimation filter magnitude, 2 -> 320x240
+COMPRESSION_LEVEL = 1    # PNG/zlib level, higher is smaller but costs more Pi CPU
+VIDEO_REPORT_INTERVAL = 10 # s between bandwidth/CPU reports
+
+# --- Ramping ---
+# RAMP_RATE (us per second) and the pigpio update interval live in ramping.py
+RAMP_REPORT_INTERVAL = 10 # s between pigpio call rate / ramp timing / loop timing reports
 
-try:
-    subprocess.run(['sudo', 'pigpiod'], check=True, capture_output=True, text=True)
-    print("pigpiod started successfully.")
-except subprocess.CalledProcessError as e:
-    print(f"Error starting pigpiod: {e.stderr}")
+# --- Loop timing ---
+LOOP_SUMMARY_INTERVAL = 1.0 # s, loop period/execution histograms are summarised and sent in telemetry this often
+# With --realtime: thread name -> (SCHED_FIFO priority, CPUs). Needs root or CAP_SYS_NICE, else they stay normal threads.
+# Keep the control threads on the last core and leave the others to video and the OS
+CONTROL_CPUS = [3]
+REALTIME = {
+    "ramp": (80, CONTROL_CPUS),
+    "onboard": (70, CONTROL_CPUS),
+    "pressure": (60, CONTROL_CPUS),
+    "commands": (60, CONTROL_CPUS),
+    "imu": (50, CONTROL_CPUS),
+}
 
 THRUSTER_PINS = {
     "t1": 18, "t2": 23, "t3": 17, "t4": 27, 
     "t5": 20, "t6": 13, "t7": 19, "t8": 6  
 }
 
-pi = pigpio.pi()
-if not pi.connected:
-    exit()
+# --- Pressure ---
+PRESSURE_RATE = 50         # Hz, Bar30 readings on their own thread, see pressure_sampler.py
+PRESSURE_OVERSAMPLING = 3  # OSR_2048, 10 ms per reading, 5 (OSR_8192) is quieter but tops out at ~24 Hz
+MAX_PRESSURE_BATCH = 50    # Samples per telemetry packet, older ones are dropped if the sender falls behind
+TELEMETRY_INTERVAL = 0.1   # s
+
+# Devices, opened in main() from the real or simulated backends in hardware.py
+hardware = None
+imu_sensor = None
+sensor = None
+pressure_sampler = None
+cpu = None
+pi = None
+ramp = None # RampEngine: the base station sets targets, it ramps the ESCs to them
+video = None # VideoProcess: cameras, encoding and sending, in a separate process
+onboard = None # OnboardController: runs the hold loop here when the base station asks for onboard mode
+timeline = None # StartupTimeline
+udp_capture = None # UdpCapture with --record-udp: every command received and telemetry packet sent
 
 last_command_time = time.time()
+COMMAND_TIMEOUT = 1.0 # s without a command before the thrusters are idled
 is_running = True
+startup_failed = False # bring_up() couldn't bring up what telemetry needs, main() exits non-zero
+loop_stats = {} # Latest loop_timing.summaries(), refreshed by sensor_sender
 
-SENDER = imagezmq.ImageSender(connect_to=f'tcp://{PC_IP}:5555')
 HOSTNAME = socket.gethostname()
 
-def video_stream_loop():
-    """Handles camera startup and automatic reconnection."""
-    global is_running
-    HOSTNAME = socket.gethostname()
-    
-    while is_running:
-        pipeline = None
-        picam2 = None
-        sender = None
-        
-        try:
-            print(f"[Video] Attempting to connect to Base Station at {PC_IP}...")
-            sender = imagezmq.ImageSender(connect_to=f'tcp://{PC_IP}:5555')
-            
-            # 1. Start RealSense
-            pipeline = rs.pipeline()
-            rs_config = rs.config()
-            rs_config.enable_stream(rs.stream.color, 640, 480, rs.format.bgr8, 30)
-            pipeline.start(rs_config)
-            
-            # 2. Start PiCam (Explicitly tell it NOT to probe other UVC devices)
-            # We use index 0 or find the first internal cam to avoid grabbing RealSense
-            picam2 = Picamera2() 
-            pc_config = picam2.create_preview_configuration(main={"size": (640, 480)})
-            picam2.configure(pc_config)
-            picam2.start()
-            
-            print("[Video] Both streams started successfully.")
-
-            while is_running:
-                # Capture RealSense
-                frames = pipeline.wait_for_frames(timeout_ms=100)
-                color_frame = frames.get_color_frame()
-                if color_frame:
-                    rs_img = np.asanyarray(color_frame.get_data())
-                    sender.send_image(f"{HOSTNAME}_realsense", rs_img)
-
-                # Capture PiCam
-                pc_img_rgb = picam2.capture_array()
-                pc_img_bgr = cv2.cvtColor(pc_img_rgb, cv2.COLOR_RGB2BGR)
-                sender.send_image(f"{HOSTNAME}_picam", pc_img_bgr)
-
-        except Exception as e:
-            print(f"[Video] Stream error: {e}. Retrying in 3s...")
-            # Cleanup before retry
-            if pipeline: 
-                try: pipeline.stop()
-                except: pass
-            if picam2: 
-                try: picam2.stop()
-                except: pass
-            if sender:
-                try: sender.close()
-                except: pass
-            time.sleep(3)
-
 # --- Ramping Functions ---
 
-def ramping_loop():
-    """Background thread that smoothly transitions current_pwms to target_pwms."""
-    global current_pwms
-    while is_running:
-        for key in target_pwms:
-            target = target_pwms[key]
-            current = current_pwms[key]
-            
-            if current < target:
-                current_pwms[key] = min(current + RAMP_STEP, target)
-            elif current > target:
-                current_pwms[key] = max(current - RAMP_STEP, target)
-            
-            # Apply the current (ramped) value to the GPIO
-            pwm_val = max(1100, min(1900, current_pwms[key]))
-            pi.set_servo_pulsewidth(THRUSTER_PINS[key], pwm_val)
-            
-        time.sleep(LOOP_FREQ)
-
-def stop_all_thrusters():
+def stop_all_thrusters(force=False):
     """Sets targets and current values back to neutral immediately."""
     print("!!! STOPPING ALL THRUSTERS (NEUTRAL) !!!")
-    for key in target_pwms:
-        target_pwms[key] = 1500
-        current_pwms[key] = 1500
-        pi.set_servo_pulsewidth(THRUSTER_PINS[key], 1500)
+    ramp.neutral(force)
 
 def sensor_sender():
+    global loop_stats
+    timer = LoopTimer("telemetry")
+    timer.enter_thread()
     sock = None
+    pressure_cursor = 0
+    last_loop_summary = time.monotonic()
     while is_running:
+        timer.start()
         try:
             if sock is None:
                 sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            sensor.read()
-            roll, pitch, yaw = imu_sensor.get_angles()
+
+            # Every Bar30 reading since the last packet, as [time.time(), mbar]
+            # Times unrounded, never after the packet timestamp, or replay.py credits them to the next packet
+            # A device that failed to come up in bring_up() reads as zeros, like one with no reading yet
+            pressure_samples = []
+            latest = None
+            if pressure_sampler is not None:
+                chunks, pressure_cursor, _ = pressure_sampler.samples.read(pressure_cursor)
+                to_wall = time.time() - time.monotonic()
+                pressure_samples = [[t + to_wall, round(p, 2)]
+                                    for chunk in chunks for t, p in chunk[:, :2]][-MAX_PRESSURE_BATCH:]
+                latest = pressure_sampler.samples.latest()
+            _, pressure, water_temp, depth = latest if latest is not None else (0, 0, 0, 0)
+
+            roll, pitch, yaw = imu_sensor.get_angles() if imu_sensor is not None else (0.0, 0.0, 0.0)
+            pwm_state = ramp.snapshot
             telemetry_data = {
-                "pressure": sensor.pressure(),
-                "cpu_temp": cpu.temperature,
+                "pressure": float(pressure),
+                "pressure_samples": pressure_samples,
+                "cpu_temp": cpu.temperature if cpu is not None else 0.0,
                 "timestamp": time.time(),
-                "depth": sensor.depth(),
-                "water_temp": sensor.temperature(),
+                "depth": float(depth),
+                "water_temp": float(water_temp),
                 "roll": roll,
                 "pitch": pitch,   
-                "yaw": yaw     
+                "yaw": yaw,
+                # What the ESCs are actually being sent, from the ramp engine's snapshot
+                "thrusters": [pwm_state.pwms[key] for key in THRUSTER_PINS],
+                "thrusters_t": pwm_state.updated,
+                "onboard": onboard.telemetry() if onboard is not None else None,
             }
+            if time.monotonic() - last_loop_summary > LOOP_SUMMARY_INTERVAL:
+                loop_stats = loop_timing.summaries()
+                telemetry_data["loops"] = loop_stats
+                last_loop_summary = time.monotonic()
             
             message = json.dumps(telemetry_data).encode()
             sock.sendto(message, (PC_IP, UDP_PORT_DATA))
+            if udp_capture is not None:
+                udp_capture.record(UDP_PORT_DATA, message)
         except Exception as e:
             print(f"Sensor Socket Error: {e}. Retrying...")
             if sock: sock.close()
             sock = None # Force recreation
-        time.sleep(0.1)
+        timer.stop()
+        time.sleep(TELEMETRY_INTERVAL)
+
+def handle_command(data, now=None):
+    """One command datagram from the base station. now: time.time() it arrived, udp_replay.py passes its own."""
+    global last_command_time
+    new_cmds = json.loads(data.decode())
+    if new_cmds.get("mode") == "onboard":
+        if onboard is None: # Still coming up, dropped without refreshing the link so the watchdog neutrals the thrusters
+            return
+        onboard.command(new_cmds)
+    else:
+        if onboard is not None and onboard.active:
+            onboard.manual()
+        for key, val in new_cmds.items():
+            if key in THRUSTER_PINS:
+                ramp.set_target(key, val)
+    last_command_time = time.time() if now is None else now
+
+def link_lost(now=None):
+    """No command for COMMAND_TIMEOUT: the main loop idles the thrusters (unless the onboard loop is holding)."""
+    return (time.time() if now is None else now) - last_command_time > COMMAND_TIMEOUT
 
 def command_receiver():
-    global last_command_time, target_pwms
+    timer = LoopTimer("commands")
+    timer.enter_thread()
     sock = None
+    first_command = True
     
     while is_running:
         try:
@@ -196,13 +189,19 @@ def command_receiver():
                 sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
                 sock.bind((PI_IP, UDP_PORT_CMD))
                 sock.settimeout(0.5)
+                if first_command:
+                    timeline.mark("command receiver listening")
             
             data, addr = sock.recvfrom(1024)
-            new_cmds = json.loads(data.decode())
-            for key, val in new_cmds.items():
-                if key in target_pwms:
-                    target_pwms[key] = val
-            last_command_time = time.time()
+            timer.start()
+            if udp_capture is not None:
+                udp_capture.record(UDP_PORT_CMD, data)
+            handle_command(data)
+            timer.stop()
+            if first_command:
+                first_command = False
+                timeline.mark("first thruster command")
+                print(f"\n[Startup] First command {timeline.since_start():.3f}s after start")
 
         except socket.timeout:
             continue
@@ -213,41 +212,206 @@ def command_receiver():
             time.sleep(1) # Wait before trying to re-bind
 
 # --- Main Logic ---
-try:
-    stop_all_thrusters()
-    
-    t_sender = threading.Thread(target=sensor_sender, daemon=True)
-    t_receiver = threading.Thread(target=command_receiver, daemon=True)
-    t_ramper = threading.Thread(target=ramping_loop, daemon=True)
-    t_video = threading.Thread(target=video_stream_loop, daemon=True)
-
-    t_sender.start()
-    t_receiver.start()
-    t_ramper.start()
-    t_video.start()
-
-    while True:
-        # Get actual hardware PWM values for display
-        p = [pi.get_servo_pulsewidth(THRUSTER_PINS[f"t{i}"]) for i in range(1, 9)]
-        p_curr = 1013.25 # Placeholder
-        depth = 0.0      # Placeholder
-
-        if time.time() - last_command_time > 1.0:
-            stop_all_thrusters()
-            print("Warning: Connection lost. Idling thrusters...", end='\r')
-        else:
-            status_msg = f"D:{depth:>5.2f}m | CPU:{cpu.temperature:>4.1f}C"
-            dashboard = (
-                f"CURR_PWM:[{p[0]:>4} {p[1]:>4} {p[2]:>4} {p[3]:>4}] | "
-                f"V_PWM:[{p[4]:>4} {p[5]:>4} {p[6]:>4} {p[7]:>4}] | {status_msg}"
-            )
-            print(f"{dashboard:<150}", end='\r', flush=True)
-        
-        time.sleep(0.1)
-
-except KeyboardInterrupt:
-    print("\nShutting down script.")
-finally:
-    is_running = False
-    stop_all_thrusters()
-    pi.stop()
+def bring_up(args):
+    """
+    Everything off the critical path, in parallel: devices, then the onboard hold loop, telemetry and video.
+    Runs on its own thread, so nothing may escape it: a device that fails is left out and the rest carry on,
+    if the base station can't be resolved there is no telemetry or video, and the Pi shuts down.
+    """
+    global is_running, startup_failed
+    try:
+        _bring_up(args)
+    except Exception as e:
+        timeline.mark("bring-up failed")
+        print(f"\n[Startup] Bring-up failed: {e}. Shutting down")
+        startup_failed = True
+        is_running = False
+        stop_all_thrusters(force=True)
+
+def _bring_up(args):
+    global PC_IP, imu_sensor, sensor, pressure_sampler, cpu, onboard, video
+
+    def resolve():
+        with timeline.step(f"resolve {args.base_station}"):
+            for attempt in range(1, RESOLVE_ATTEMPTS + 1):
+                try:
+                    return socket.gethostbyname(args.base_station)
+                except OSError as e:
+                    print(f"\n[Startup] Resolving {args.base_station} failed ({attempt}/{RESOLVE_ATTEMPTS}): {e}")
+                    if attempt == RESOLVE_ATTEMPTS:
+                        raise
+                    time.sleep(RESOLVE_RETRY)
+
+    def open_imu():
+        with timeline.step("open imu"):
+            return hardware.open_imu()
+
+    def open_pressure():
+        with timeline.step("import pressure_sampler"):
+            from pressure_sampler import PressureSampler
+        with timeline.step("open pressure sensor"):
+            pressure = hardware.open_pressure_sensor()
+            return pressure, PressureSampler(pressure, PRESSURE_RATE, PRESSURE_OVERSAMPLING).start()
+
+    def open_cpu():
+        with timeline.step("open cpu temperature"):
+            return hardware.open_cpu_temperature()
+
+    def import_onboard():
+        with timeline.step("import onboard_control"):
+            from onboard_control import OnboardController
+            return OnboardController
+
+    def import_video():
+        with timeline.step("import video_process"):
+            from video_process import VideoProcess
+            return VideoProcess
+
+    def optional(name, step):
+        """Runs step(), or reports the failure and returns None."""
+        try:
+            return step()
+        except Exception as e:
+            timeline.mark(f"{name} failed")
+            print(f"\n[Startup] {name} failed: {e}. Continuing without it")
+            return None
+
+    with ThreadPoolExecutor(max_workers=6, thread_name_prefix="bring_up") as pool:
+        futures = [pool.submit(f) for f in (resolve, open_imu, open_pressure, open_cpu, import_onboard, import_video)]
+        imu_sensor = optional("imu", futures[1].result)
+        sensor, pressure_sampler = optional("pressure sensor", futures[2].result) or (None, None)
+        cpu = optional("cpu temperature", futures[3].result)
+        OnboardController = optional("import onboard_control", futures[4].result)
+        VideoProcess = optional("import video_process", futures[5].result)
+        PC_IP = futures[0].result() # Required, raises to bring_up()
+
+    # Telemetry goes out with whatever devices came up
+    with timeline.step("telemetry start"):
+        threading.Thread(target=sensor_sender, name="telemetry", daemon=True).start()
+
+    if OnboardController is not None and pressure_sampler is not None and imu_sensor is not None:
+        with timeline.step("onboard start"):
+            onboard = optional("onboard start",
+                               lambda: OnboardController(ramp, pressure_sampler, imu_sensor, PRESSURE_RATE).start())
+    else:
+        print("\n[Startup] Onboard hold unavailable, onboard commands are ignored")
+
+    if VideoProcess is not None:
+        def start_video():
+            streams = ["realsense", "picam"] + (["depth"] if DEPTH_STREAM else [])
+            return VideoProcess(
+                streams,
+                hardware_args={"simulated": args.sim, "depth_stream": DEPTH_STREAM, "depth_decimation": DEPTH_DECIMATION},
+                sender_args={"connect_to": f'tcp://{PC_IP}:{VIDEO_PORT}' if VIDEO_REQ_REP else f'tcp://*:{VIDEO_PORT}',
+                             "color_encoding": COLOR_ENCODING, "depth_encoding": DEPTH_ENCODING,
+                             "jpeg_quality": JPEG_QUALITY, "compression_level": COMPRESSION_LEVEL,
+                             "req_rep": VIDEO_REQ_REP},
+                hostname=HOSTNAME, report_interval=VIDEO_REPORT_INTERVAL).start()
+
+        with timeline.step("video process start"):
+            video = optional("video process start", start_video)
+
+    print(f"\n{timeline.report()}")
+
+def main():
+    global hardware, pi, ramp, timeline, udp_capture, is_running
+
+    timeline = StartupTimeline(STARTED)
+    timeline.mark("imports done")
+    parser = argparse.ArgumentParser(description="ROV Pi controller")
+    parser.add_argument("--sim", action="store_true",
+                        help="use simulated devices (fake IMU on a pty, scripted pressure, recorded PWM, synthetic cameras)")
+    parser.add_argument("--base-station", default=BASE_STATION_HOST, help="base station host name or IP")
+    parser.add_argument("--imu-port", default="/dev/ttyUSB0")
+    parser.add_argument("--imu-capture", help="with --sim, replay this recorded IMU byte stream")
+    parser.add_argument("--depth-profile", help="with --sim, depth waypoints as 't:depth,t:depth,...' (s:m)")
+    parser.add_argument("--duration", type=float, help="exit after this many seconds")
+    parser.add_argument("--realtime", action="store_true",
+                        help="run the control threads SCHED_FIFO, pinned to CONTROL_CPUS (see REALTIME)")
+    parser.add_argument("--record-udp", metavar="FILE",
+                        help="capture every command received and telemetry packet sent, for udp_replay.py")
+    args = parser.parse_args()
+    if args.realtime:
+        loop_timing.configure(REALTIME)
+
+    if args.record_udp:
+        # Same format as the base station's RECORD_UDP
+        from shared.udp_capture import UdpCapture
+        udp_capture = UdpCapture(args.record_udp).start()
+
+    profile = None
+    if args.depth_profile:
+        profile = [tuple(float(v) for v in point.split(":")) for point in args.depth_profile.split(",")]
+
+    hardware = Hardware(args.sim, args.imu_port, args.imu_capture, profile, DEPTH_STREAM, DEPTH_DECIMATION)
+
+    # Control-critical path first: ESCs neutral, ramp engine, command receiver, then the watchdog below
+    with timeline.step("open pwm (pigpiod)"):
+        pi = hardware.open_pwm()
+    if not pi.connected:
+        exit()
+    with timeline.step("ramp engine, thrusters neutral"):
+        ramp = RampEngine(pi, THRUSTER_PINS, RAMP_RATE)
+        stop_all_thrusters(force=True)
+        ramp.start()
+
+    started = time.time()
+    try:
+        threading.Thread(target=command_receiver, name="commands", daemon=True).start()
+        # Sensors, the onboard hold loop, telemetry and video come up behind it
+        threading.Thread(target=bring_up, args=(args,), name="bring_up", daemon=True).start()
+        last_ramp_report = time.time()
+
+        timer = LoopTimer("main")
+        # is_running goes False if bring_up() couldn't bring up what telemetry needs
+        while is_running and (args.duration is None or time.time() - started < args.duration):
+            timer.start()
+            # PWM values as last written to the ESCs, without asking pigpio
+            p = ramp.applied_pwms()
+            p_curr = 1013.25 # Placeholder
+            depth = 0.0      # Placeholder
+            cpu_temp = cpu.temperature if cpu is not None else 0.0
+
+            if onboard is not None and onboard.active:
+                # The onboard loop handles its own link loss, it keeps holding
+                dashboard = f"ONBOARD: {onboard.state} | PWM:[{' '.join(f'{v:>4}' for v in p)}] | CPU:{cpu_temp:>4.1f}C"
+                print(f"{dashboard:<150}", end='\r', flush=True)
+            elif link_lost():
+                stop_all_thrusters()
+                print("Warning: Connection lost. Idling thrusters...", end='\r')
+            else:
+                status_msg = f"D:{depth:>5.2f}m | CPU:{cpu_temp:>4.1f}C"
+                dashboard = (
+                    f"CURR_PWM:[{p[0]:>4} {p[1]:>4} {p[2]:>4} {p[3]:>4}] | "
+                    f"V_PWM:[{p[4]:>4} {p[5]:>4} {p[6]:>4} {p[7]:>4}] | {status_msg}"
+                )
+                print(f"{dashboard:<150}", end='\r', flush=True)
+            
+            if video is not None:
+                video.supervise()
+
+            if time.time() - last_ramp_report > RAMP_REPORT_INTERVAL:
+                print(f"\n{ramp.report()}")
+                print(loop_timing.report(loop_stats))
+                last_ramp_report = time.time()
+
+            timer.stop()
+            time.sleep(0.1)
+
+    except KeyboardInterrupt:
+        print("\nShutting down script.")
+    finally:
+        is_running = False
+        for device in (video, onboard, ramp, pressure_sampler):
+            if device is not None:
+                device.stop()
+        stop_all_thrusters(force=True)
+        pi.stop()
+        hardware.close()
+        if udp_capture is not None:
+            udp_capture.stop()
+    if startup_failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import time
+import threading
+from collections import deque
+from loop_timing import LoopTimer
+# The hold loop the base station runs (KF, PIDs, allocation) and its vehicle config, from shared/ (main.py puts the
+# repo root on sys.path)
+from shared.control import HoldController, pwm_commands
+from shared.vehicle import PRESSURE_OFFSET, ROLL_OFFSET, PITCH_OFFSET, YAW_OFFSET, overlay_summary
+
+'''
+Onboard depth/attitude hold.
+In onboard mode the base station sends {"mode": "onboard", "inputs": [surge, sway, heave, roll, pitch, yaw], "hold": {...}}
+instead of PWMs, and this runs the hold loop on every Bar30 sample, straight into the ramp engine.
+A correction no longer waits for telemetry, the base station frame and the command sender, and two network hops.
+
+Link loss: after LINK_TIMEOUT the pilot inputs are zeroed but the held axes keep holding where they were,
+after HOLD_TIMEOUT with no commands it gives up and goes neutral. A plain PWM command switches back to manual.
+'''
+
+LINK_TIMEOUT = 1.0  # s without a command before the sticks are treated as centred
+HOLD_TIMEOUT = 60.0 # s without a command before going neutral
+
+MANUAL = "manual"
+HOLDING = "holding"
+LINK_LOST = "link lost, holding"
+
+NO_INPUT = (0.0,) * 6
+
+
+class OnboardController:
+    def __init__(self, ramp, pressure_sampler, imu, rate):
+        self.ramp = ramp
+        self.pressure_sampler = pressure_sampler
+        self.imu = imu
+        self.rate = rate # Expected pressure sample rate, the loop still runs at this rate if samples stop
+
+        self.hold = HoldController()
+        self.lock = threading.Lock()
+        self.state = MANUAL
+        self.requested = False # Set by command(), the loop thread does the switch-over
+        self.inputs = NO_INPUT
+        self.last_command = time.monotonic()
+        self.running = False
+        self.thread = None
+
+        # Sample to thrust: from the pressure reading's timestamp to its PWMs reaching the ramp engine
+        self.latencies = deque(maxlen=200)
+        self.steps = 0
+        self.stats_since = time.monotonic()
+        self.timer = LoopTimer("onboard")
+
+    @property
+    def active(self):
+        return self.state != MANUAL
+
+    def command(self, message):
+        """An onboard mode command from command_receiver."""
+        self.inputs = tuple(float(v) for v in message.get("inputs", NO_INPUT))
+        for axis, enabled in message.get("hold", {}).items():
+            if axis in self.hold.hold:
+                self.hold.hold[axis] = bool(enabled)
+        self.last_command = time.monotonic()
+        self.requested = True
+
+    def manual(self):
+        """A PWM command arrived, stop driving the thrusters."""
+        with self.lock:
+            self.requested = False
+            self.state = MANUAL
+
+    def _angles(self):
+        roll, pitch, yaw = self.imu.get_angles()
+        return roll - ROLL_OFFSET, pitch - PITCH_OFFSET, yaw - YAW_OFFSET
+
+    def _loop(self):
+        self.timer.enter_thread()
+        cursor = self.pressure_sampler.samples.head
+        last_step = time.monotonic()
+        while self.running:
+            self.pressure_sampler.new_sample.wait(2 / self.rate)
+            self.pressure_sampler.new_sample.clear()
+            self.timer.start()
+            try:
+                # The KF sees every sample, whether or not we're holding, so it has converged when we take over
+                chunks, cursor, _ = self.pressure_sampler.samples.read(cursor)
+                newest = None
+                for chunk in chunks:
+                    for t, pressure in chunk[:, :2]:
+                        self.hold.add_pressure(t, pressure - PRESSURE_OFFSET)
+                        newest = t
+
+                now = time.monotonic()
+                dt = now - last_step
+                last_step = now
+                with self.lock:
+                    if self.requested and self.state == MANUAL:
+                        self.hold.capture_targets(*self._angles())
+                        self.state = HOLDING
+                    if self.state == MANUAL:
+                        continue
+
+                    since_command = now - self.last_command
+                    if since_command > HOLD_TIMEOUT:
+                        print(f"\n[Onboard] No commands for {HOLD_TIMEOUT:.0f} s, going neutral")
+                        self.requested = False
+                        self.state = MANUAL
+                        self.ramp.neutral()
+                        continue
+                    if since_command > LINK_TIMEOUT:
+                        self.state = LINK_LOST
+                        inputs = NO_INPUT
+                    else:
+                        self.state = HOLDING
+                        inputs = self.inputs
+
+                    pwms = self.hold.step(inputs, *self._angles(), dt)
+                    for key, pwm in pwm_commands(pwms).items():
+                        self.ramp.set_target(key, pwm)
+                    self.steps += 1
+                    if newest is not None:
+                        self.latencies.append(time.monotonic() - newest)
+            finally:
+                self.timer.stop()
+
+    def start(self):
+        if overlay_summary():
+            print(f"\n[Onboard] {overlay_summary()}")
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+
+    def telemetry(self):
+        """Hold loop state for the telemetry frame, None in manual mode."""
+        if not self.active:
+            return None
+        now = time.monotonic()
+        rate = self.steps / max(now - self.stats_since, 1e-6)
+        self.steps = 0
+        self.stats_since = now
+        latencies = list(self.latencies)
+        return {
+            "state": self.state,
+            "rate": rate,
+            "latency_ms": sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+            "targets": [round(float(v), 3) for v in self.hold.targets()],
+            "depth": round(float(self.hold.measured_depth), 3),
+            "forces": [round(float(f), 3) for f in self.hold.forces],
+            "pwms": list(self.hold.pwms),
+        }
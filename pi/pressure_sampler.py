@@ -0,0 +1,104 @@
+import time
+import threading
+from sample_ring import SampleRing
+from loop_timing import LoopTimer
+
+'''
+Bar30 (MS5837-30BA) sampling on its own thread.
+sensor.read() blocks for two ADC conversions (pressure, then temperature) of 2.5 us * 2^(8 + oversampling) each,
+~41 ms at the library default of OSR_8192, so reading it inline capped the telemetry loop at ~10 Hz.
+Here it runs back to back at `rate` Hz and every reading goes into a SampleRing for the telemetry sender
+(or anything else) to drain with its own cursor.
+
+Oversampling vs rate (conversion time alone, I2C adds a little):
+    OSR_256  (0) 1.3 ms   OSR_512 (1) 2.6 ms   OSR_1024 (2) 5.1 ms
+    OSR_2048 (3) 10 ms    OSR_4096 (4) 20 ms   OSR_8192 (5) 41 ms
+Higher oversampling is quieter: ~0.2 mbar resolution at 256 down to ~0.016 at 8192, about 2 mm to 0.2 mm of water.
+'''
+
+OVERSAMPLING = 3 # OSR_2048, leaves room for 50 Hz
+RATE = 50 # Hz
+
+# t is time.monotonic() halfway through the conversions, pressure in mbar, temperature in C, depth in m
+SAMPLE_COLUMNS = ("t", "pressure", "temperature", "depth")
+
+
+def conversion_time(oversampling):
+    """Seconds the sensor needs for one read() at this oversampling."""
+    return 2 * 2.5e-6 * 2 ** (8 + oversampling)
+
+
+class PressureSampler:
+    def __init__(self, sensor, rate=RATE, oversampling=OVERSAMPLING, sample_capacity=1024):
+        self.sensor = sensor # ms5837.MS5837_30BA or hardware.SimulatedPressureSensor, init() already called
+        self.rate = rate
+        self.oversampling = oversampling
+        self.samples = SampleRing(sample_capacity, SAMPLE_COLUMNS)
+        self.new_sample = threading.Event() # Set after every append, for consumers that want to run at sensor rate
+        self.running = False
+        self.thread = None
+
+        # Counters, see stats()
+        self.errors = 0
+        self.overruns = 0 # Readings that finished after the next one was due
+        self.read_time = 0.0 # Total s spent inside sensor.read()
+        self.started = time.monotonic()
+        self.timer = LoopTimer("pressure")
+
+        if conversion_time(oversampling) > 1 / rate:
+            print(f"[Pressure] Oversampling {oversampling} needs {conversion_time(oversampling) * 1000:.0f} ms per "
+                  f"reading, {rate} Hz is not reachable, sampling as fast as it can")
+
+    def _loop(self):
+        self.timer.enter_thread()
+        interval = 1 / self.rate
+        next_read = time.monotonic()
+        while self.running:
+            self.timer.start()
+            before = time.monotonic()
+            try:
+                ok = self.sensor.read(self.oversampling)
+            except Exception as e:
+                ok = False
+                print(f"[Pressure] Read error: {e}")
+            after = time.monotonic()
+            self.read_time += after - before
+
+            if ok:
+                self.samples.append(((before + after) / 2, self.sensor.pressure(),
+                                     self.sensor.temperature(), self.sensor.depth()))
+                self.new_sample.set()
+            else:
+                self.errors += 1
+
+            self.timer.stop()
+
+            # Absolute schedule so the rate doesn't drift with conversion time, skip slots we already missed
+            next_read += interval
+            now = time.monotonic()
+            if next_read < now:
+                self.overruns += 1
+                next_read = now
+            else:
+                time.sleep(next_read - now)
+
+    def start(self):
+        self.running = True
+        self.started = time.monotonic()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+
+    def stats(self):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        return {
+            "samples_per_s": self.samples.head / elapsed,
+            "errors": self.errors,
+            "overruns": self.overruns,
+            "busy_percent": self.read_time / elapsed * 100,
+        }
@@ -0,0 +1,187 @@
+import time
+import threading
+from collections import namedtuple
+from loop_timing import LoopTimer
+
+'''
+Thruster PWM slew limiter.
+Each pin moves toward its target at RAMP_RATE us per second of elapsed time.monotonic(), so the ramp takes
+the same time however late the thread wakes up. pigpio is only written when a pin's integer pulse width
+changes, and the thread sleeps until the next step is due, or until a new target arrives when nothing is moving.
+
+What was last written is published as an immutable PWMSnapshot, replaced whole after every batch of writes,
+so the dashboard and telemetry read a consistent set of values without a lock or a pigpio round-trip.
+'''
+
+PWM_MIN = 1100
+PWM_MAX = 1900
+NEUTRAL = 1500
+RAMP_RATE = 7500         # us per second, the old 15 us every 2 ms
+UPDATE_INTERVAL = 0.02   # s between steps while ramping, pigpio sends servo pulses at 50 Hz so faster writes never reach the ESCs
+# us, closer than this a pin is at its target: float error in now + next_step can leave it a few ULP short,
+# with a next step too small to move the clock
+SNAP = 1e-6
+
+# pwms and changed (time.time() of each pin's last write) are keyed like the pins, updated is the newest of those
+PWMSnapshot = namedtuple("PWMSnapshot", ["pwms", "changed", "updated"])
+
+
+def clamp(pwm):
+    return max(PWM_MIN, min(PWM_MAX, pwm))
+
+
+class RampEngine:
+    def __init__(self, pwm, pins, rate=RAMP_RATE, update_interval=UPDATE_INTERVAL):
+        self.pwm = pwm # pigpio.pi() or hardware.RecordingPWM
+        self.pins = dict(pins)
+        self.rate = rate
+        self.update_interval = update_interval
+
+        self.targets = {key: NEUTRAL for key in self.pins}
+        self.current = {key: float(NEUTRAL) for key in self.pins} # Unrounded ramp position
+        self.applied = {key: None for key in self.pins}           # Last value written to pigpio
+        self.changed = {key: None for key in self.pins}
+        self.snapshot = PWMSnapshot(dict(self.applied), dict(self.changed), None)
+        self.dirty = False
+
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.running = False
+        self.thread = None
+        self.ramping = False
+        self.last_step = time.monotonic()
+        self.timer = LoopTimer("ramp")
+
+        # Counters, reset by stats()
+        self.writes = 0
+        self.wakeups = 0
+        self.late_count = 0
+        self.late_total = 0.0
+        self.late_max = 0.0
+        self.stats_since = time.monotonic()
+
+    def set_target(self, key, pwm):
+        """Thread safe, wakes the ramp thread if the target changed."""
+        pwm = clamp(pwm)
+        if self.targets[key] != pwm:
+            self.targets[key] = pwm
+            self.wake.set()
+
+    def neutral(self, force=False):
+        """Jumps every pin to neutral without ramping. force rewrites pins pigpio should already have at neutral."""
+        with self.lock:
+            for key in self.pins:
+                self.targets[key] = NEUTRAL
+                self.current[key] = float(NEUTRAL)
+                if force or self.applied[key] != NEUTRAL:
+                    self._write(key, NEUTRAL)
+            self.ramping = False
+            self._publish()
+
+    def _write(self, key, pwm):
+        self.pwm.set_servo_pulsewidth(self.pins[key], pwm)
+        self.applied[key] = pwm
+        self.changed[key] = time.time()
+        self.writes += 1
+        self.dirty = True
+
+    def _publish(self):
+        """Called with the lock held, after writing."""
+        if self.dirty:
+            self.snapshot = PWMSnapshot(dict(self.applied), dict(self.changed), time.time())
+            self.dirty = False
+
+    def applied_pwms(self):
+        """The PWMs the ESCs are being sent, in pin order, from the latest snapshot."""
+        snapshot = self.snapshot
+        return [snapshot.pwms[key] for key in self.pins]
+
+    def step(self, now):
+        """Moves every pin by the time elapsed since the last step. Returns when the next step is due, or None when idle."""
+        with self.lock:
+            # Starting from rest the ramp begins now, not when the last one ended
+            dt = now - self.last_step if self.ramping else 0.0
+            self.last_step = now
+            max_move = self.rate * dt
+
+            ramping = False
+            next_step = self.update_interval
+            for key in self.pins:
+                target = self.targets[key]
+                current = self.current[key]
+                if current < target:
+                    current = min(current + max_move, target)
+                elif current > target:
+                    current = max(current - max_move, target)
+                if abs(target - current) < SNAP:
+                    current = float(target)
+                self.current[key] = current
+
+                pwm = int(round(current))
+                if pwm != self.applied[key]:
+                    self._write(key, pwm)
+                if current != target:
+                    ramping = True
+                    # Land the last step of a ramp when it is due rather than on the next interval
+                    next_step = min(next_step, abs(target - current) / self.rate)
+
+            self._publish()
+            self.ramping = ramping
+            return now + next_step if ramping else None
+
+    def _loop(self):
+        self.timer.enter_thread()
+        due = None
+        while self.running:
+            timeout = None if due is None else max(due - time.monotonic(), 0)
+            woken = self.wake.wait(timeout)
+            self.wake.clear()
+            if not self.running:
+                break
+
+            self.timer.start()
+            now = time.monotonic()
+            self.wakeups += 1
+            if not woken and due is not None:
+                late = now - due
+                self.late_count += 1
+                self.late_total += late
+                self.late_max = max(self.late_max, late)
+            due = self.step(now)
+            self.timer.stop()
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+
+    def stats(self):
+        """pigpio call rate and ramp timing error since the last call. A late step leaves the output
+        late * rate us behind the ideal ramp until it runs."""
+        now = time.monotonic()
+        elapsed = max(now - self.stats_since, 1e-9)
+        late_mean = self.late_total / self.late_count if self.late_count else 0.0
+        stats = {
+            "writes_per_s": self.writes / elapsed,
+            "wakeups_per_s": self.wakeups / elapsed,
+            "late_ms_mean": late_mean * 1000,
+            "late_ms_max": self.late_max * 1000,
+            "ramp_error_us_max": self.late_max * self.rate,
+        }
+        self.writes = self.wakeups = self.late_count = 0
+        self.late_total = self.late_max = 0.0
+        self.stats_since = now
+        return stats
+
+    def report(self):
+        s = self.stats()
+        return (f"[Ramp] {s['writes_per_s']:.1f} pigpio writes/s, {s['wakeups_per_s']:.1f} wakeups/s, "
+                f"late {s['late_ms_mean']:.2f}/{s['late_ms_max']:.2f} ms mean/max "
+                f"(<= {s['ramp_error_us_max']:.1f} us behind)")
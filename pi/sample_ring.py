@@ -0,0 +1,54 @@
+import numpy as np
+
+'''
+Preallocated ring buffer of fixed-width float64 samples with one writer and any number of readers.
+Readers keep their own cursor (the total number of samples seen) and get views into the buffer,
+so reading never locks or copies. The writer fills a row before publishing it by bumping head,
+and a single int assignment is atomic under the GIL.
+'''
+
+
+class SampleRing:
+    def __init__(self, capacity, columns):
+        self.capacity = capacity
+        self.columns = tuple(columns)
+        self.index = {name: i for i, name in enumerate(self.columns)}
+        self.data = np.zeros((capacity, len(self.columns)))
+        self.head = 0 # Samples written since creation, the next one goes in row head % capacity
+
+    def append(self, row):
+        """Writer only."""
+        self.data[self.head % self.capacity] = row
+        self.head += 1
+
+    def read(self, cursor):
+        """
+        Returns (chunks, new_cursor, lost): chunks is a list of at most two views holding every sample since
+        cursor, oldest first. lost counts samples the writer overwrote before this reader got to them.
+        The views stay valid until the writer laps them, copy them if they need to outlive that.
+        """
+        head = self.head
+        # Leave a row of slack, the writer may already be filling head % capacity
+        oldest = max(head - self.capacity + 1, 0)
+        lost = max(oldest - cursor, 0)
+        cursor = max(cursor, oldest)
+        if cursor >= head:
+            return [], head, lost
+
+        start, end = cursor % self.capacity, head % self.capacity
+        if start < end:
+            chunks = [self.data[start:end]]
+        else:
+            chunks = [self.data[start:], self.data[:end]]
+        return chunks, head, lost
+
+    def latest(self):
+        """The newest sample as a view, or None before the first one."""
+        if self.head == 0:
+            return None
+        return self.data[(self.head - 1) % self.capacity]
+
+    def column(self, chunks, name):
+        """A column of the chunks returned by read(), as views."""
+        i = self.index[name]
+        return [chunk[:, i] for chunk in chunks]
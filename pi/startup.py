@@ -0,0 +1,48 @@
+import time
+import threading
+from contextlib import contextmanager
+
+'''
+Startup timeline: when each bring-up step ran, on which thread, relative to the process starting.
+main() brings up the control-critical path first (PWM neutral, ramp engine, command receiver, watchdog)
+and the rest (IMU, pressure, CPU temperature, onboard hold, telemetry, video) in parallel behind it,
+report() shows which step dominates the time to the first thruster command.
+'''
+
+
+class StartupTimeline:
+    def __init__(self, t0=None):
+        self.t0 = time.monotonic() if t0 is None else t0 # Pass the time taken at the top of main.py to include imports
+        self.lock = threading.Lock()
+        self.events = [] # (name, start, end, thread), end is None for marks
+
+    @contextmanager
+    def step(self, name):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._add(name, start, time.monotonic())
+
+    def mark(self, name):
+        """A point in time, e.g. the first command arriving."""
+        self._add(name, time.monotonic(), None)
+
+    def _add(self, name, start, end):
+        with self.lock:
+            self.events.append((name, start, end, threading.current_thread().name))
+
+    def since_start(self):
+        return time.monotonic() - self.t0
+
+    def report(self):
+        with self.lock:
+            events = sorted(self.events, key=lambda e: e[1])
+        lines = ["[Startup] Timeline (s since process start):"]
+        for name, start, end, thread in events:
+            if end is None:
+                lines.append(f"  {'':>8}   {start - self.t0:>8.3f}  {name} [{thread}]")
+            else:
+                lines.append(f"  {start - self.t0:>8.3f} - {end - self.t0:>8.3f}  {name} "
+                             f"({(end - start) * 1000:.1f} ms) [{thread}]")
+        return "\n".join(lines)
@@ -0,0 +1,237 @@
+import json
+import time
+import socket
+import argparse
+import threading
+import numpy as np
+import main as pi_main # Also puts the repo root on sys.path for shared/
+from hardware import Hardware, RecordingPWM
+from ramping import RampEngine, RAMP_RATE, NEUTRAL
+from startup import StartupTimeline
+from shared.udp_capture import read_capture
+
+'''
+Replays the commands of a UDP capture (shared/udp_capture.py: the Pi's main.py --record-udp, or the base
+station's RECORD_UDP) into this side's command handling and ramp engine, on the fake hardware (RecordingPWM), to
+reproduce field link glitches on a desk and see what they did to the applied PWMs and the watchdog.
+
+    live     - datagrams are sent over loopback at their recorded spacing divided by --speed, into main.py's own
+               command_receiver thread, with the ramp thread running for real. main()'s loop doesn't run, the
+               watchdog is Watchdog below: its link_lost() check and neutral every WATCHDOG_INTERVAL, on wall time.
+               Above 1x the gaps and bursts are compressed, the ramp and watchdog still run in real time.
+    virtual  - (--virtual) no sockets or threads: a simulated clock steps the ramp engine, main.handle_command()
+               and main.link_lost() in capture time order, as fast as the CPU allows, and gives the same result
+               every run.
+
+When the capture also holds the Pi's telemetry, its "thrusters" (what the Pi applied in the field) are compared
+with what the replay applied at the same moments.
+    python udp_replay.py capture.cap
+    python udp_replay.py capture.cap --speed 4
+    python udp_replay.py capture.cap --virtual --csv writes.csv
+'''
+
+WATCHDOG_INTERVAL = 0.1 # The main loop's period, it checks link_lost() once per pass
+BURST_GAP = 0.005       # s, commands closer together than this were bunched up on the way
+TAIL = 1.5              # s replayed after the last command, so a final link loss shows up
+MIN_STEP = 1e-6         # s, virtual replay never steps the ramp twice at the same instant, so the clock always advances
+
+
+def load(path):
+    """(commands, telemetry): [(t, datagram)] on UDP_PORT_CMD, [(t, thrusters)] from UDP_PORT_DATA packets."""
+    commands, telemetry = [], []
+    for t, port, data in read_capture(path):
+        if port == pi_main.UDP_PORT_CMD:
+            commands.append((t, data))
+        elif port == pi_main.UDP_PORT_DATA:
+            thrusters = json.loads(data.decode()).get("thrusters")
+            if thrusters and None not in thrusters:
+                telemetry.append((t, thrusters))
+    commands.sort(key=lambda item: item[0])
+    telemetry.sort(key=lambda item: item[0])
+    return commands, telemetry
+
+
+def traffic_summary(times):
+    intervals = np.diff(times) if len(times) > 1 else np.zeros(1)
+    p50, p99 = np.percentile(intervals, [50, 99]) * 1000
+    gaps = int(np.count_nonzero(intervals > pi_main.COMMAND_TIMEOUT))
+    bunched = int(np.count_nonzero(intervals < BURST_GAP))
+    return (f"  intervals p50 {p50:.1f} ms, p99 {p99:.1f} ms, max {intervals.max() * 1000:.0f} ms | "
+            f"{gaps} gaps > {pi_main.COMMAND_TIMEOUT:.1f} s | {bunched} commands < {BURST_GAP * 1000:.0f} ms after the last")
+
+
+class Watchdog:
+    """Stands in for main()'s loop: the same link_lost() check and neutral, counting trips and time spent idled."""
+    def __init__(self):
+        self.trips = []
+        self.idle_since = None
+        self.idle_total = 0.0
+
+    def check(self, now, virtual):
+        lost = pi_main.link_lost(now if virtual else None)
+        if lost:
+            # stop_all_thrusters() without its console spam
+            pi_main.ramp.neutral()
+            if self.idle_since is None:
+                self.idle_since = now
+                self.trips.append(now)
+        elif self.idle_since is not None:
+            self.idle_total += now - self.idle_since
+            self.idle_since = None
+
+    def finish(self, now):
+        if self.idle_since is not None:
+            self.idle_total += now - self.idle_since
+            self.idle_since = None
+
+
+def setup(clock):
+    """The Pi's command path on fake hardware: RecordingPWM, the ramp engine, thrusters neutral."""
+    pi_main.hardware = Hardware(simulated=True)
+    pi_main.pi = RecordingPWM(clock=clock)
+    pi_main.ramp = RampEngine(pi_main.pi, pi_main.THRUSTER_PINS, RAMP_RATE)
+    pi_main.ramp.neutral(force=True)
+    pi_main.timeline = StartupTimeline()
+    pi_main.onboard = None # Onboard commands are ignored like during bring-up, the watchdog still applies
+
+
+def replay_virtual(commands):
+    """Steps everything on a simulated clock in capture time. Returns (watchdog, writes in capture time)."""
+    # The clock counts from the first command: at epoch magnitudes a float can't resolve the ramp's last step
+    start = commands[0][0]
+    commands = [(t - start, data) for t, data in commands]
+    clock = [0.0]
+    setup(lambda: clock[0])
+    pi_main.last_command_time = 0.0
+    watchdog = Watchdog()
+    ramp = pi_main.ramp
+
+    end = commands[-1][0] + TAIL
+    next_tick = WATCHDOG_INTERVAL
+    due = None
+    i = 0
+    while True:
+        t_command = commands[i][0] if i < len(commands) else np.inf
+        now = min(t_command, next_tick, due if due is not None else np.inf)
+        if now > end:
+            break
+        clock[0] = now
+        if due is not None and now == due:
+            due = ramp.step(now)
+        elif now == t_command:
+            pi_main.handle_command(commands[i][1], now)
+            i += 1
+            # The ramp thread wakes on a new target, from rest a step at now only starts the ramp
+            due = ramp.step(now)
+        else:
+            watchdog.check(now, virtual=True)
+            next_tick += WATCHDOG_INTERVAL
+            due = None if not ramp.ramping else due
+        if due is not None:
+            due = max(due, now + MIN_STEP)
+    watchdog.finish(end)
+    watchdog.trips = [t + start for t in watchdog.trips]
+    return watchdog, [(t + start, pin, pulsewidth) for t, pin, pulsewidth in pi_main.pi.writes]
+
+
+def replay_live(commands, speed, port):
+    """Sends the commands over loopback into command_receiver. Returns (watchdog, writes in capture time)."""
+    setup(time.monotonic)
+    pi_main.PI_IP = "127.0.0.1"
+    pi_main.UDP_PORT_CMD = port
+    pi_main.is_running = True
+    pi_main.ramp.start()
+    receiver = threading.Thread(target=pi_main.command_receiver, name="commands", daemon=True)
+    receiver.start()
+    time.sleep(0.2) # Bound before the first datagram
+
+    start = commands[0][0]
+    started = time.monotonic()
+    pi_main.last_command_time = time.time()
+
+    def to_capture(monotonic):
+        return start + (monotonic - started) * speed
+
+    def send():
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for t, data in commands:
+            delay = started + (t - start) / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            sock.sendto(data, ("127.0.0.1", port))
+        sock.close()
+
+    sender = threading.Thread(target=send, daemon=True)
+    sender.start()
+    watchdog = Watchdog()
+    end = started + (commands[-1][0] - start) / speed + TAIL
+    while time.monotonic() < end:
+        watchdog.check(to_capture(time.monotonic()), virtual=False)
+        time.sleep(WATCHDOG_INTERVAL)
+    watchdog.finish(to_capture(end))
+
+    pi_main.is_running = False
+    pi_main.ramp.stop()
+    receiver.join(timeout=1.0)
+    return watchdog, [(to_capture(t), pin, pulsewidth) for t, pin, pulsewidth in pi_main.pi.writes]
+
+
+def applied_at(writes, times):
+    """PWM of every thruster at each of `times`, from the write log, (len(times), thrusters)."""
+    pins = list(pi_main.THRUSTER_PINS.values())
+    out = np.full((len(times), len(pins)), NEUTRAL)
+    for j, pin in enumerate(pins):
+        pin_writes = [(t, pw) for t, p, pw in writes if p == pin]
+        if not pin_writes:
+            continue
+        write_times = np.array([t for t, _ in pin_writes])
+        values = np.array([pw for _, pw in pin_writes])
+        i = np.searchsorted(write_times, times, side="right") - 1
+        out[i >= 0, j] = values[i[i >= 0]]
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured commands into the Pi's command path on fake hardware")
+    parser.add_argument("capture", help="udp_capture.py file")
+    parser.add_argument("--speed", type=float, default=1.0, help="live replay speed, 2 = twice as fast")
+    parser.add_argument("--virtual", action="store_true", help="simulated clock, deterministic and as fast as possible")
+    parser.add_argument("--port", type=int, default=15006, help="loopback command port for live replay")
+    parser.add_argument("--csv", help="write every PWM write as t (s from the first command), pin, pulse width")
+    args = parser.parse_args()
+
+    commands, telemetry = load(args.capture)
+    if not commands:
+        raise SystemExit("No commands in the capture")
+    start = commands[0][0]
+    mode = "virtual" if args.virtual else f"live {args.speed:g}x"
+    print(f"[Replay] {len(commands)} commands over {commands[-1][0] - start:.1f} s, {mode}")
+    print(traffic_summary(np.array([t for t, _ in commands])))
+
+    began = time.perf_counter()
+    if args.virtual:
+        watchdog, writes = replay_virtual(commands)
+    else:
+        watchdog, writes = replay_live(commands, args.speed, args.port)
+    elapsed = time.perf_counter() - began
+
+    trips = ", ".join(f"+{t - start:.1f}s" for t in watchdog.trips[:10]) + (" ..." if len(watchdog.trips) > 10 else "")
+    print(f"  watchdog: {len(watchdog.trips)} trips, idled {watchdog.idle_total:.1f} s" + (f" ({trips})" if trips else ""))
+    print(f"  pigpio writes: {len(writes)} in {elapsed:.2f} s")
+
+    recorded = [(t, thrusters) for t, thrusters in telemetry if start <= t <= commands[-1][0]]
+    if recorded:
+        times = np.array([t for t, _ in recorded])
+        diff = np.abs(applied_at(writes, times) - np.array([thrusters for _, thrusters in recorded]))
+        print(f"  vs field telemetry: {np.count_nonzero(diff.max(axis=1) == 0)}/{len(recorded)} packets match, "
+              f"p99 {np.percentile(diff.max(axis=1), 99):.0f} us, max {diff.max():.0f} us apart")
+
+    if args.csv:
+        with open(args.csv, "w") as f:
+            f.write("t,pin,pulsewidth\n")
+            for t, pin, pulsewidth in writes:
+                f.write(f"{t - start:.4f},{pin},{pulsewidth}\n")
+
+
+if __name__ == "__main__":
+    main()
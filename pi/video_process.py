@@ -0,0 +1,215 @@
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+
+'''
+The video pipeline (camera capture, colour conversion, encoding, sending) in its own process, so frame copies
+and encoding never hold the control process's GIL while ramping, commands and telemetry need it.
+
+The newest frame of every stream is also published into shared memory (FrameSlots). The controller uses it
+to see that video is alive, and onboard vision or a recorder gets frames from VideoProcess.latest() without pickling
+or a second camera handle. The controller starts the process, and restarts it
+if it exits (camera fault, sender error) or stops producing frames, without touching the control threads.
+'''
+
+SLOT_BYTES = 640 * 480 * 3 # Largest frame: 640x480 BGR, z16 depth is smaller
+DTYPES = [np.uint8, np.uint16]
+STALL_TIMEOUT = 5.0  # s without a new frame before the process is considered stuck
+START_TIMEOUT = 20.0 # s allowed for the cameras to come up
+RESTART_DELAY = 3.0  # s between a fault and the restart
+
+
+class FrameSlots:
+    """
+    One shared-memory slot per stream holding its newest frame. Each slot is a small int64 header
+    (seq, height, width, channels, dtype index, nbytes), the capture time and the pixels.
+    seq is odd while the writer is mid-frame (a seqlock), so readers retry instead of getting a torn frame.
+    """
+    HEADER = 6
+
+    def __init__(self, streams, name=None, slot_bytes=SLOT_BYTES):
+        self.streams = list(streams)
+        self.slot_bytes = slot_bytes
+        self.slot_size = self.HEADER * 8 + 8 + slot_bytes
+        size = self.slot_size * len(self.streams)
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.headers = {}
+        self.times = {}
+        self.pixels = {}
+        for i, stream in enumerate(self.streams):
+            offset = i * self.slot_size
+            self.headers[stream] = np.ndarray(self.HEADER, np.int64, self.shm.buf, offset)
+            self.times[stream] = np.ndarray(1, np.float64, self.shm.buf, offset + self.HEADER * 8)
+            self.pixels[stream] = np.ndarray(slot_bytes, np.uint8, self.shm.buf, offset + self.HEADER * 8 + 8)
+        if self.owner:
+            for header in self.headers.values():
+                header[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, stream, frame, capture_time):
+        """Writer (the video process) only."""
+        header = self.headers.get(stream)
+        if header is None or frame.nbytes > self.slot_bytes:
+            return
+        # Odd while being written, a writer killed mid-frame leaves it odd and the next write carries on from there
+        seq = int(header[0]) | 1
+        header[0] = seq
+        h, w = frame.shape[:2]
+        header[1:6] = (h, w, frame.shape[2] if frame.ndim == 3 else 0, DTYPES.index(frame.dtype.type), frame.nbytes)
+        self.times[stream][0] = capture_time
+        self.pixels[stream][:frame.nbytes] = np.ascontiguousarray(frame).reshape(-1).view(np.uint8)
+        header[0] = seq + 1 # Even: complete
+
+    def seq(self, stream):
+        """Frames written to the stream so far (any process)."""
+        return int(self.headers[stream][0]) // 2
+
+    def read(self, stream, retries=3):
+        """A copy of the newest frame as (frame, capture_time, seq), or None if there is none or the writer kept lapping us."""
+        header = self.headers[stream]
+        for _ in range(retries):
+            before = int(header[0])
+            if before == 0 or before % 2:
+                continue
+            h, w, c, dtype, nbytes = (int(v) for v in header[1:6])
+            capture_time = float(self.times[stream][0])
+            frame = self.pixels[stream][:nbytes].copy().view(DTYPES[dtype])
+            if int(header[0]) == before:
+                return frame.reshape((h, w, c) if c else (h, w)), capture_time, before // 2
+        return None
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def video_main(slots_name, streams, hardware_args, sender_args, hostname, report_interval, stop):
+    """Video process entry point: runs until stop is set, or exits non-zero on a fault for the parent to restart."""
+    # Imported here so the control process never loads cv2, imagezmq or the camera libraries for video
+    from hardware import Hardware, DEPTH
+    from frame_encoder import FrameSender
+
+    slots = FrameSlots(streams, name=slots_name)
+    hardware = Hardware(**hardware_args)
+    cameras = []
+    sender = None
+    try:
+        print(f"[Video] Attempting to connect to Base Station at {sender_args['connect_to']}...")
+        sender = FrameSender(**sender_args)
+
+        # RealSense, then PiCam
+        for camera in hardware.cameras():
+            cameras.append(camera)
+            camera.start()
+
+        print("[Video] Both streams started successfully.")
+        last_report = time.time()
+
+        while not stop.is_set():
+            for camera in cameras:
+                frames = camera.read()
+                read_time = time.time()
+                for stream, kind, image, capture_time in frames:
+                    if kind == DEPTH:
+                        sender.send_depth(f"{hostname}_{stream}", image, capture_time, read_time)
+                    else:
+                        sender.send_color(f"{hostname}_{stream}", image, capture_time, read_time)
+                    slots.write(stream, image, capture_time)
+
+            if time.time() - last_report > report_interval:
+                print(f"\n{sender.report()}")
+                last_report = time.time()
+
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"[Video] Stream error: {e}")
+        raise SystemExit(1)
+    finally:
+        for camera in cameras:
+            try: camera.stop()
+            except: pass
+        if sender:
+            try: sender.close()
+            except: pass
+        slots.close()
+
+
+class VideoProcess:
+    """Starts, watches and restarts video_main. supervise() is called from the controller's main loop."""
+    def __init__(self, streams, hardware_args, sender_args, hostname, report_interval=10):
+        self.streams = streams
+        self.hardware_args = hardware_args # Hardware(**hardware_args) in the video process, cameras only
+        self.sender_args = sender_args     # FrameSender(**sender_args)
+        self.hostname = hostname
+        self.report_interval = report_interval
+        # spawn, not fork: forking a process that already runs the IMU, ramp and socket threads can copy held locks
+        self.ctx = mp.get_context("spawn")
+        self.slots = FrameSlots(streams)
+        self.stop_event = self.ctx.Event()
+        self.process = None
+        self.restarts = 0
+        self.started = 0.0
+        self.last_seq = 0
+        self.frames_at_start = 0
+        self.last_progress = 0.0
+        self.restart_at = None
+
+    def start(self):
+        self.stop_event.clear()
+        self.process = self.ctx.Process(target=video_main, name="video", daemon=True,
+                                        args=(self.slots.name, self.streams, self.hardware_args,
+                                              self.sender_args, self.hostname, self.report_interval,
+                                              self.stop_event))
+        self.process.start()
+        self.started = self.last_progress = time.monotonic()
+        self.frames_at_start = self.last_seq = self.frames()
+        return self
+
+    def frames(self):
+        return sum(self.slots.seq(stream) for stream in self.streams)
+
+    def supervise(self):
+        """Restarts the process RESTART_DELAY after it dies, or if it stops producing frames."""
+        now = time.monotonic()
+        if self.restart_at is not None:
+            if now >= self.restart_at:
+                self.restart_at = None
+                self.restarts += 1
+                self.start()
+            return
+
+        frames = self.frames()
+        if frames != self.last_seq:
+            self.last_seq = frames
+            self.last_progress = now
+        # Until the first frame the cameras get START_TIMEOUT to come up
+        timeout = STALL_TIMEOUT if frames > self.frames_at_start or now - self.started > START_TIMEOUT else START_TIMEOUT
+
+        if not self.process.is_alive():
+            print(f"\n[Video] Process exited ({self.process.exitcode}), restarting in {RESTART_DELAY:.0f}s...")
+        elif now - self.last_progress > timeout:
+            print(f"\n[Video] No frames for {now - self.last_progress:.1f}s, restarting in {RESTART_DELAY:.0f}s...")
+            self.process.kill()
+        else:
+            return
+        self.process.join(timeout=1.0)
+        self.restart_at = now + RESTART_DELAY
+
+    def latest(self, stream):
+        """(frame copy, capture time.time(), seq) of the stream's newest frame, or None. The hand-off for consumers on the Pi."""
+        return self.slots.read(stream)
+
+    def stop(self):
+        self.stop_event.set()
+        if self.process is not None:
+            self.process.join(timeout=3.0)
+            if self.process.is_alive():
+                self.process.kill()
+        self.slots.close()
@@ -0,0 +1,6 @@
+'''
+Code both the base station and the Pi run: the vehicle model and gains (vehicle.py), the hold controller
+(control.py with kf.py, pid.py and rov_kinematics.py), the raw UDP capture format (udp_capture.py)
+and the video encodings and stream stats (frame_format.py).
+Copy this directory to the Pi alongside pi/.
+'''
@@ -0,0 +1,103 @@
+import numpy as np
+from .vehicle import *
+from .rov_kinematics import compute_thruster_forces, map_force_to_pwm
+from .pid import PID
+from .kf import DepthKalmanFilter
+
+'''
+Depth/attitude hold and thrust allocation: pilot inputs + measurements -> thruster forces -> PWMs.
+Used by the base station control loop, and by the Pi in onboard mode (pi/onboard_control.py), so both run exactly
+the same filter, PIDs and allocation with the same vehicle.py.
+'''
+
+THRUSTER_KEYS = [f"t{i}" for i in range(1, 9)]
+PRESSURE_DT = 0.02 # s, assumed time before the first pressure sample
+
+
+def pressure_to_depth(pressure):
+    """mbar (with PRESSURE_OFFSET already removed) to m of sea water."""
+    return max(0, (pressure - 1013.25) * 100 / (1025 * 9.81))
+
+
+def pwm_commands(pwms):
+    """Per-thruster PWMs to the command the Pi applies, with the wiring inversions."""
+    return {key: invert_pwm(pwm, inverted) for key, pwm, inverted in zip(THRUSTER_KEYS, pwms, INVERTED)}
+
+
+class HoldController:
+    def __init__(self):
+        self.kf = DepthKalmanFilter()
+        self.depth_pid = PID(DEPTH_KP, DEPTH_KI, DEPTH_KD, 1, -1)
+        self.roll_pid = PID(ROLL_KP, ROLL_KI, ROLL_KD, 1, -1, is_angle=True)
+        self.pitch_pid = PID(PITCH_KP, PITCH_KI, PITCH_KD, 1, -1, is_angle=True)
+        self.yaw_pid = PID(YAW_KP, YAW_KI, YAW_KD, 1, -1, is_angle=True)
+        # Which axes are held, the rest pass the pilot input straight through
+        self.hold = {"depth": DEPTH_PID, "roll": ROLL_PID, "pitch": PITCH_PID, "yaw": YAW_PID}
+
+        self.target_depth = 0
+        self.target_roll = 0
+        self.target_pitch = 0
+        self.target_yaw = 0
+        self.measured_depth = 0.0
+        self.raw_depth = 0.0 # Last Bar30 depth before the KF
+        self.last_pressure_time = None
+
+        self.commands = [0.0] * 4 # Heave, roll, pitch, yaw into the allocator: PID outputs on held axes
+        self.forces = np.zeros(8)
+        self.pwms = [PWM_NEUTRAL] * 8
+
+    def add_pressure(self, t, pressure):
+        """One Bar30 reading (t in s on any clock, mbar with PRESSURE_OFFSET removed) into the depth KF."""
+        dt = t - self.last_pressure_time if self.last_pressure_time is not None else PRESSURE_DT
+        self.last_pressure_time = t
+        self.raw_depth = pressure_to_depth(pressure)
+        self.measured_depth = self.kf.update(self.raw_depth, dt)
+        return self.measured_depth
+
+    def capture_targets(self, roll, pitch, yaw):
+        """Hold where the vehicle is now, instead of the surface / zero angles."""
+        self.target_depth = self.measured_depth
+        self.target_roll = roll
+        self.target_pitch = pitch
+        self.target_yaw = yaw
+
+    def step(self, inputs, roll, pitch, yaw, dt):
+        """inputs: (surge, sway, heave, roll, pitch, yaw) in -1..1. Returns the 8 thruster PWMs (before inversion)."""
+        if dt <= 0:
+            return self.pwms
+        raw_surge, raw_sway, raw_heave, raw_roll, raw_pitch, raw_yaw = inputs
+
+        if self.hold["depth"]:
+            self.target_depth += raw_heave * 0.5 * dt
+            heave_command = self.depth_pid.compute(self.measured_depth, self.target_depth, dt)
+        else:
+            heave_command = raw_heave
+
+        if self.hold["pitch"]:
+            self.target_pitch += raw_pitch * 20 * dt
+            pitch_command = self.pitch_pid.compute(pitch, self.target_pitch, dt)
+        else:
+            pitch_command = raw_pitch
+
+        if self.hold["roll"]:
+            self.target_roll += raw_roll * 20 * dt
+            roll_command = self.roll_pid.compute(roll, self.target_roll, dt)
+        else:
+            roll_command = raw_roll
+
+        if self.hold["yaw"]:
+            self.target_yaw += raw_yaw * 20 * dt
+            yaw_command = self.yaw_pid.compute(yaw, self.target_yaw, dt)
+        else:
+            yaw_command = raw_yaw
+
+        self.commands = [heave_command, roll_command, pitch_command, yaw_command]
+        # Get thruster force distribution
+        self.forces = compute_thruster_forces(raw_surge, raw_sway, heave_command, roll_command, pitch_command, yaw_command)
+
+        # Convert forces to PWM
+        self.pwms = [map_force_to_pwm(f) for f in self.forces]
+        return self.pwms
+
+    def targets(self):
+        return [self.target_depth, self.target_roll, self.target_pitch, self.target_yaw]
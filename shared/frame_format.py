@@ -0,0 +1,39 @@
+import time
+
+'''
+What pi/frame_encoder.py and base_station/frame_decoder.py agree on: the encoding names carried in each frame
+header's "enc", and the per-stream bandwidth / CPU totals both ends report.
+Standard library only, the Pi's control process imports it without numpy or cv2.
+
+Encodings:
+    RAW   - uncompressed pixels (color, default)
+    JPEG  - lossy, color only
+    PNG16 - lossless 16-bit PNG, for the z16 depth channel
+    ZLIB16 - lossless, horizontal delta then zlib, for the z16 depth channel
+'''
+
+RAW = "raw"
+JPEG = "jpeg"
+PNG16 = "png"
+ZLIB16 = "zlib"
+
+
+class StreamStats:
+    """Running totals for one stream, reported as bandwidth and CPU cost per frame (cost: "CPU" to encode, "decode")."""
+    def __init__(self, cost="CPU"):
+        self.cost = cost
+        self.frames = 0
+        self.bytes = 0
+        self.cpu_time = 0.0
+        self.started = time.monotonic()
+
+    def add(self, size, cpu_time):
+        self.frames += 1
+        self.bytes += size
+        self.cpu_time += cpu_time
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        frames = max(self.frames, 1)
+        return (f"{self.frames / elapsed:>5.1f} FPS {self.bytes / elapsed / 1024:>8.1f} kB/s "
+                f"{self.bytes / frames / 1024:>7.1f} kB/frame {self.cpu_time / frames * 1000:>6.2f} ms {self.cost}/frame")
@@ -1,5 +1,5 @@
 import numpy as np
-from config import *
+from .vehicle import *
 
 def map_force_to_pwm(thrust):
     """
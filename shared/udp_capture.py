@@ -0,0 +1,75 @@
+import os
+import time
+import queue
+import struct
+import threading
+
+'''
+Raw UDP capture: every telemetry (UDP_PORT_DATA) and command (UDP_PORT_CMD) datagram with its timestamp,
+for replaying link glitches (bursts, gaps, reordering) on a desk with pi/udp_replay.py.
+Used on both ends: the base station with RECORD_UDP, the Pi with main.py --record-udp.
+Each side stamps what it received with the arrival time and what it sent with the send time, all time.time().
+
+A capture file is a sequence of RECORD_HEADER (time, port, length) + datagram records, like recorder.py's segments.
+record() only queues the datagram, a writer thread does the file I/O.
+'''
+
+RECORD_HEADER = struct.Struct("<dHI")
+
+
+def capture_path(directory):
+    return os.path.join(directory, f"udp_{int(time.time() * 1000)}.cap")
+
+
+def read_capture(path):
+    """Yields (time, port, datagram) for every record in a capture file."""
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            t, port, length = RECORD_HEADER.unpack(header)
+            data = f.read(length)
+            if len(data) < length:
+                return # Truncated by a crash mid-write
+            yield t, port, data
+
+
+class UdpCapture:
+    def __init__(self, path):
+        self.path = path
+        self.queue = queue.SimpleQueue()
+        self.datagrams = 0
+        self.thread = None
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.file = open(self.path, "wb")
+        self.thread = threading.Thread(target=self._write_loop, name="udp_capture", daemon=True)
+        self.thread.start()
+        print(f"[Capture] Writing UDP traffic to {os.path.abspath(self.path)}")
+        return self
+
+    def record(self, port, data, t=None):
+        """Thread safe, never blocks. t defaults to now."""
+        self.queue.put((time.time() if t is None else t, port, data))
+
+    def _write_loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            t, port, data = item
+            self.file.write(RECORD_HEADER.pack(t, port, len(data)))
+            self.file.write(data)
+            self.datagrams += 1
+            if self.queue.empty():
+                self.file.flush()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        self.file.close()
@@ -0,0 +1,144 @@
+import os
+import json
+import math
+import numpy as np
+
+'''
+        ---------------------------width----------------------------
+    |    T1 (CW)                                         T2 (CW)
+    |
+    |                      
+    |           T5 (CCW)                          T6 (CW)
+    |                               x
+    |                               |  
+  length                            o ----- y 
+    |                                \
+    |                                 z (inwards)
+    |
+    |           T7 (CW)                            T8 (CCW)
+    |
+    |
+    |   T3 (CCW)                                           T4 (CCW)
+
+    Force exerted by a thruster is taken +ve in the sense of pointing to x-axis for the lateral thrusters, and downwards for the vertical thrusters
+    Irrespective of CW/CCW propeller
+    SI units are used: m, s
+
+    Vehicle model, calibration and hold gains: everything control.py and rov_kinematics.py read.
+    Shared by the base station (config.py imports it) and the Pi (onboard_control.py), copy shared/ to both.
+
+'''
+
+ROV_WIDTH_MM = 262.629
+ROV_LENGTH_MM = 195.311
+
+# "V" Configuration: T1(45), T2(-45), T3(135), T4(-135)
+THRUSTER_ANGLES_DEG = [45, -45, 135, -135] # From +ve x-axis (Force exerted to the vehicle)
+
+SIN_45 = math.sin(math.radians(45))
+
+# MAX thrust offered by an individual thruster
+# This change was made due to problems in cancelling moments: from fixing PWM ranges to thrust ranges
+MAX_THRUST = 2.35 
+
+PWM_NEUTRAL = 1500
+
+# Found mechanical team messing up the connections, as exchanging 2 would invert the direction of thrust
+# Also 4 propellers must in be in one sense and the other 4 in opp sense for cancelling counter rotor torque
+I1 = True
+I2 = False
+I3 = False
+I4 = True 
+I5 = True
+I6 = True
+I7 = True
+I8 = True
+
+def invert_pwm(PWM, invert=True):
+    if invert == True:
+        return PWM_NEUTRAL - (PWM - PWM_NEUTRAL)
+    return PWM
+
+
+# Due to unreliable electronics some thrusters tend to fail, only 6 thrusters with 3 lateral and 3 vertical are reuqired to attain 6 DOFs
+# However cacelling the counter rotor torque with one less thruster is impossible and hence unaccounted in such a failure
+W1 = True
+W2 = True
+W3 = True
+W4 = True
+W5 = True
+W6 = True
+W7 = True
+W8 = True
+
+def derive(v):
+    """The values computed from the ones above, given them as a dict (this module's globals, or with overrides)."""
+    return {
+        "WORKING_THRUSTERS": np.array([v[f"W{i}"] for i in range(1, 9)]),
+        # Need to find these again for the working thrusters otherwise they will max out before the joystick reaches extrema
+        "MAX_AXIAL_FORCE": 4 * SIN_45 * v["MAX_THRUST"],
+        "MAX_YAW_TORQUE": 2 * SIN_45 * (v["ROV_LENGTH_MM"] + v["ROV_WIDTH_MM"]) * v["MAX_THRUST"],
+        "MAX_HEAVE_FORCE": 4 * v["MAX_THRUST"],
+        "MAX_ROLL_TORQUE": 4 * (v["ROV_WIDTH_MM"] / 2) * v["MAX_THRUST"],
+        "MAX_PITCH_TORQUE": 4 * (v["ROV_LENGTH_MM"] / 2) * v["MAX_THRUST"],
+        "INVERTED": [v[f"I{i}"] for i in range(1, 9)],
+    }
+
+# WORKING_THRUSTERS, MAX_AXIAL_FORCE, MAX_YAW_TORQUE, MAX_HEAVE_FORCE, MAX_ROLL_TORQUE, MAX_PITCH_TORQUE, INVERTED
+globals().update(derive(globals()))
+
+# Things to Calibrate:
+
+PRESSURE_OFFSET = 988 - 1013.25 # mbar # Diff for location and whether
+ROLL_OFFSET = 0
+PITCH_OFFSET = 0
+YAW_OFFSET = 50 # Make this in the direction of the gate
+
+# meter to -1 to 1
+DEPTH_PID = True
+DEPTH_KP = 1.2
+DEPTH_KI = 0.1
+DEPTH_KD = 0.4
+
+# Angle in degrees to -1 to 1
+PITCH_PID = False
+PITCH_KP = 0.04
+PITCH_KI = 0.005
+PITCH_KD = 0.03
+
+# Angle in degrees to -1 to 1
+ROLL_PID = False
+ROLL_KP = 0.04
+ROLL_KI = 0.005
+ROLL_KD = 0.03
+
+# Angle in degrees to -1 to 1
+YAW_PID = False
+YAW_KP = 0.04
+YAW_KI = 0.0005
+YAW_KD = 0.03
+
+# Gains tuned on the simulator by autotune.py --write override the ones above, delete the file to go back
+# It sits next to this file, so the Pi's copy of shared/ needs it too for ONBOARD_CONTROL
+# Only the hold gains can be overlaid, any other key (a typo too) is an error rather than silently ignored
+CONFIG_OVERLAY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config_overlay.json")
+OVERLAY_KEYS = [f"{axis}_{gain}" for axis in ("DEPTH", "ROLL", "PITCH", "YAW") for gain in ("KP", "KI", "KD")]
+OVERLAY = {} # The values taken from CONFIG_OVERLAY, both ends print them at startup
+if os.path.exists(CONFIG_OVERLAY):
+    with open(CONFIG_OVERLAY) as f:
+        OVERLAY = json.load(f)
+    unknown = sorted(set(OVERLAY) - set(OVERLAY_KEYS))
+    if unknown:
+        raise ValueError(f"{CONFIG_OVERLAY}: unknown keys {', '.join(unknown)}, only *_KP/KI/KD gains can be overlaid")
+    not_numbers = sorted(k for k, v in OVERLAY.items() if isinstance(v, bool) or not isinstance(v, (int, float)))
+    if not_numbers:
+        raise ValueError(f"{CONFIG_OVERLAY}: non-numeric values for {', '.join(not_numbers)}")
+    globals().update(OVERLAY)
+
+
+def overlay_summary():
+    """A line naming the overlaid gains for the startup output, None without an overlay."""
+    if not OVERLAY:
+        return None
+    gains = ", ".join(f"{name}={OVERLAY[name]:g}" for name in OVERLAY_KEYS if name in OVERLAY)
+    return f"Simulator-tuned gains from {CONFIG_OVERLAY} override the defaults: {gains}"
@@ -0,0 +1,203 @@
+'''
+Throughput benchmark for the IMU serial parser in pi/imu.py, no IMU needed:
+    python tests/imu_parser_benchmark.py                  # synthetic stream
+    python tests/imu_parser_benchmark.py capture.bin      # bytes recorded from the IMU
+
+Record a stream on the Pi with:
+    python -c "import serial; s = serial.Serial('/dev/ttyUSB0', 921600); open('capture.bin', 'wb').write(s.read(921600 // 10 * 10))"
+
+The stream is fed to the old byte-at-a-time parser (kept below as the reference) and to IMU.handleSerialData in
+chunks the size ser.read() typically returns. Both must produce the same Euler angles, packet for packet.
+The table CRC and struct float decoding are also checked bit-exact against the reference checkSum / hex_to_ieee
+on every packet (plus corrupted copies), and timed per packet.
+At 921600 baud the IMU delivers ~92 kB/s, anything well above that leaves the Pi core free for other work.
+'''
+
+import os
+import sys
+import time
+import struct
+import random
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "pi"))
+
+from imu import IMU, crc16 as table_crc16, EULER_ANGLES, EULER_OFFSET
+from fake_imu import synthetic_stream
+
+BAUD_BYTES_PER_S = 921600 / 10
+
+
+# --- Reference: the parser as it was, one byte per call ---
+def checkSum(list_data, check_data):
+    data = bytearray(list_data)
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            if (crc & 1) != 0:
+                crc >>= 1
+                crc ^= 0xA001
+            else:
+                crc >>= 1
+    return hex(((crc & 0xff) << 8) + (crc >> 8)) == hex(check_data[0] << 8 | check_data[1])
+
+
+def hex_to_ieee(raw_data):
+    ieee_data = []
+    raw_data.reverse()
+    for i in range(0, len(raw_data), 4):
+        hex_str = (
+            hex(raw_data[i]     | 0xff00)[4:6] +
+            hex(raw_data[i + 1] | 0xff00)[4:6] +
+            hex(raw_data[i + 2] | 0xff00)[4:6] +
+            hex(raw_data[i + 3] | 0xff00)[4:6]
+        )
+        ieee_data.append(struct.unpack('>f', bytes.fromhex(hex_str))[0])
+    ieee_data.reverse()
+    return ieee_data
+
+
+class ReferenceParser:
+    def __init__(self):
+        self.key = 0
+        self.buff = {}
+        self.angles = []
+
+    def handleSerialData(self, raw_data):
+        self.buff[self.key] = raw_data
+        self.key += 1
+
+        if self.buff[0] != 0xAA:
+            self.key = 0
+            return
+        if self.key < 3: return
+        if self.buff[1] != 0x55:
+            self.key = 0
+            return
+        if self.key < self.buff[2] + 5: return
+
+        data_buff = list(self.buff.values())
+        if self.buff[2] == 0x14:
+            if checkSum(data_buff[2:23], data_buff[23:25]):
+                data = hex_to_ieee(data_buff[7:23])
+                self.angles.append(data[1:4])
+
+        self.buff = {}
+        self.key = 0
+
+
+class RecordingIMU(IMU):
+    """Keeps every Euler triple instead of only the latest."""
+    def __init__(self):
+        super().__init__()
+        self.angles = []
+
+    def _handle_packet(self, packet):
+        before = self.angle_degree
+        super()._handle_packet(packet)
+        if self.angle_degree is not before:
+            self.angles.append(self.angle_degree)
+
+
+def bench_reference(stream):
+    parser = ReferenceParser()
+    start = time.perf_counter()
+    for byte in stream:
+        parser.handleSerialData(byte)
+    return time.perf_counter() - start, parser.angles
+
+
+def bench_chunked(stream, chunk):
+    imu = RecordingIMU()
+    start = time.perf_counter()
+    for i in range(0, len(stream), chunk):
+        imu.handleSerialData(stream[i:i + chunk])
+    return time.perf_counter() - start, imu.angles
+
+
+def split_packets(stream):
+    """Every complete packet in the stream, as bytes."""
+    packets = []
+    imu = IMU()
+    imu._handle_packet = lambda packet: packets.append(bytes(packet))
+    imu.handleSerialData(stream)
+    return packets
+
+
+def validate_decoders(packets):
+    """Table CRC and struct decoding must agree with the reference on every packet, corrupted ones included.
+    The length byte is left alone so a corrupted packet still frames the same way."""
+    rng = random.Random(1)
+    corrupted = []
+    for packet in packets[::10]:
+        damaged = bytearray(packet)
+        damaged[rng.randrange(3, len(damaged))] ^= 1 << rng.randrange(8)
+        corrupted.append(bytes(damaged))
+
+    imu = IMU()
+    crc_checked = floats_checked = mismatches = 0
+    for packet in packets + corrupted:
+        n = packet[2] + 3
+        ref_ok = checkSum(packet[2:n], packet[n:n + 2])
+        crc_checked += 1
+        if imu.checkSum(packet[2:n], packet[n:n + 2]) != ref_ok:
+            mismatches += 1
+        if packet[2] == 0x14 and ref_ok:
+            ref = struct.pack("<3f", *hex_to_ieee(list(packet[7:23]))[1:4])
+            new = struct.pack("<3f", *EULER_ANGLES.unpack_from(packet, EULER_OFFSET))
+            floats_checked += 1
+            if ref != new:
+                mismatches += 1
+    status = "OK" if mismatches == 0 else f"{mismatches} MISMATCHES"
+    print(f"Decoder validation: {crc_checked} CRCs ({len(corrupted)} corrupted), {floats_checked} Euler triples: {status}")
+
+
+def bench_decoders(packets):
+    """Per-packet cost of CRC + float decoding, reference vs table/struct, on the Euler packets."""
+    euler = [p for p in packets if p[2] == 0x14]
+
+    start = time.perf_counter()
+    for packet in euler:
+        if checkSum(packet[2:23], packet[23:25]):
+            hex_to_ieee(list(packet[7:23]))[1:4]
+    ref_time = (time.perf_counter() - start) / len(euler)
+
+    start = time.perf_counter()
+    for packet in euler:
+        if table_crc16(packet[2:23]) == packet[23] | (packet[24] << 8):
+            EULER_ANGLES.unpack_from(packet, EULER_OFFSET)
+    new_time = (time.perf_counter() - start) / len(euler)
+
+    print(f"Euler packet decode: reference {ref_time * 1e6:.1f} us, table CRC + struct {new_time * 1e6:.1f} us "
+          f"({ref_time / new_time:.1f}x)")
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as f:
+            stream = f.read()
+        print(f"Loaded {len(stream)} bytes from {sys.argv[1]}")
+    else:
+        stream = synthetic_stream()
+        print(f"Synthetic stream: {len(stream)} bytes ({len(stream) / BAUD_BYTES_PER_S:.1f} s at 921600 baud)")
+
+    packets = split_packets(stream)
+    validate_decoders(packets)
+    bench_decoders(packets)
+
+    ref_time, ref_angles = bench_reference(stream)
+    print(f"{'per-byte (reference)':<22} {len(stream) / ref_time / 1e6:>7.2f} MB/s "
+          f"{ref_time / len(stream) * BAUD_BYTES_PER_S * 100:>6.1f}% of a core at full baud "
+          f"{len(ref_angles):>7} Euler packets")
+
+    for chunk in (32, 256, 4096):
+        t, angles = bench_chunked(stream, chunk)
+        status = "OK" if angles == ref_angles else "MISMATCH"
+        print(f"{f'chunked ({chunk} B reads)':<22} {len(stream) / t / 1e6:>7.2f} MB/s "
+              f"{t / len(stream) * BAUD_BYTES_PER_S * 100:>6.1f}% of a core at full baud "
+              f"{len(angles):>7} Euler packets  {ref_time / t:>5.1f}x  {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+'''
+IMU reader test against a fake IMU on a pseudo-terminal (Linux/macOS), no IMU needed:
+    python tests/imu_reader_benchmark.py               # synthetic 200 Hz stream
+    python tests/imu_reader_benchmark.py capture.bin   # replay bytes recorded from the IMU (see imu_parser_benchmark.py)
+
+Runs the blocking select() reader in IMU._read_loop, then the old 1 ms polling loop, against the same replayed
+stream and reports wakeups, CPU use of the reader thread and how many samples made it through.
+'''
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "pi"))
+
+from imu import IMU
+from fake_imu import FakeIMUDevice, synthetic_stream, SAMPLE_BYTES
+
+RATE = 200 # Hz, samples per second sent by the fake IMU
+DURATION = 5 # s per reader
+
+
+class PollingIMU(IMU):
+    """The reader as it was: check inWaiting() every millisecond."""
+    def _read_loop(self):
+        self.read_started = time.monotonic()
+        while self.running:
+            self.wakeups += 1
+            if self.ser.inWaiting() > 0:
+                data = self.ser.read(self.ser.inWaiting())
+                self.bytes_read += len(data)
+                self.handleSerialData(data)
+            self.cpu_time = time.thread_time()
+            time.sleep(0.001)
+
+
+def run(imu_class, stream):
+    device = FakeIMUDevice(stream, bytes_per_second=SAMPLE_BYTES * RATE).start()
+    imu = imu_class(port=device.port)
+    if not imu.start():
+        device.stop()
+        sys.exit(1)
+    time.sleep(DURATION)
+    stats = imu.stats()
+    imu.stop()
+    time.sleep(imu.read_timeout + 0.1)
+    device.stop()
+    return stats, device.bytes_written
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as f:
+            stream = f.read()
+    else:
+        stream = synthetic_stream(seconds=DURATION + 1, rate=RATE)
+
+    expected = DURATION * RATE
+    print(f"Fake IMU: {RATE} Hz, {SAMPLE_BYTES * RATE / 1000:.1f} kB/s for {DURATION} s (~{expected} samples)")
+    for name, imu_class in (("select() reader", IMU), ("1 ms polling (old)", PollingIMU)):
+        stats, written = run(imu_class, stream)
+        print(f"{name:<20} {stats['wakeups_per_s']:>7.0f} wakeups/s {stats['cpu_percent']:>6.2f}% CPU "
+              f"{stats['bytes_per_s'] / 1000:>6.1f} kB/s {stats['samples']:>6} samples ({written} bytes sent)")
+
+
+if __name__ == "__main__":
+    main()
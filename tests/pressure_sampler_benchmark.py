@@ -0,0 +1,76 @@
+'''
+Bar30 sampling benchmark against the simulated pressure sensor (same conversion delays as the MS5837), no Pi needed:
+    python tests/pressure_sampler_benchmark.py
+
+Compares the old inline read in sensor_sender (read(), then sleep 0.1 s) with pressure_sampler.PressureSampler at a
+few oversampling / rate settings, and reports depth samples per second reaching telemetry and how long the telemetry
+thread itself is blocked per packet.
+overruns are readings that finished after the next one was due, lost are samples the ring overwrote before
+the telemetry reader got them.
+'''
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "pi"))
+
+from hardware import SimulatedPressureSensor
+from pressure_sampler import PressureSampler, conversion_time
+
+DURATION = 3 # s per setting
+TELEMETRY_INTERVAL = 0.1
+SETTINGS = [(5, 50), (4, 50), (3, 50), (3, 100), (2, 100)] # (oversampling, Hz)
+
+
+def run_inline(oversampling):
+    """sensor_sender as it was: the read blocks the telemetry loop."""
+    sensor = SimulatedPressureSensor()
+    sensor.init()
+    samples = 0
+    blocked = []
+    started = time.monotonic()
+    while time.monotonic() - started < DURATION:
+        before = time.monotonic()
+        sensor.read(oversampling)
+        sensor.depth()
+        samples += 1
+        blocked.append(time.monotonic() - before)
+        time.sleep(TELEMETRY_INTERVAL)
+    return samples / DURATION, max(blocked), 0, 0
+
+
+def run_sampler(oversampling, rate):
+    sensor = SimulatedPressureSensor()
+    sensor.init()
+    sampler = PressureSampler(sensor, rate, oversampling).start()
+    cursor = 0
+    samples = 0
+    lost_total = 0
+    blocked = []
+    started = time.monotonic()
+    while time.monotonic() - started < DURATION:
+        before = time.monotonic()
+        chunks, cursor, lost = sampler.samples.read(cursor)
+        samples += sum(len(chunk) for chunk in chunks)
+        lost_total += lost
+        blocked.append(time.monotonic() - before)
+        time.sleep(TELEMETRY_INTERVAL)
+    sampler.stop()
+    return samples / DURATION, max(blocked), sampler.overruns, lost_total
+
+
+def main():
+    print(f"{'':<28} {'conversion':>10} {'samples/s':>10} {'telemetry blocked':>18} {'overruns':>9} {'lost':>5}")
+    rate, blocked, _, _ = run_inline(5)
+    print(f"{'inline, OSR 5 (old)':<28} {conversion_time(5) * 1000:>8.1f}ms {rate:>10.1f} {blocked * 1000:>16.2f}ms "
+          f"{'-':>9} {'-':>5}")
+    for oversampling, hz in SETTINGS:
+        rate, blocked, overruns, lost = run_sampler(oversampling, hz)
+        print(f"{f'sampler, OSR {oversampling} @ {hz} Hz':<28} {conversion_time(oversampling) * 1000:>8.1f}ms "
+              f"{rate:>10.1f} {blocked * 1000:>16.2f}ms {overruns:>9} {lost:>5}")
+
+
+if __name__ == "__main__":
+    main()
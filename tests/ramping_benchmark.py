@@ -0,0 +1,102 @@
+'''
+Thruster ramping benchmark against a recording PWM backend, no Pi needed:
+    python tests/ramping_benchmark.py
+
+Plays the same command pattern (a step every 0.5 s, idle in between, like a pilot tapping the stick) through the
+old fixed-step ramping_loop and through ramping.RampEngine, and reports pigpio calls per second and how long
+a full 1500 -> 1900 ramp actually took against the ideal 400 us / RAMP_RATE.
+'''
+
+import os
+import sys
+import time
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "pi"))
+
+from hardware import RecordingPWM
+from ramping import RampEngine, RAMP_RATE
+
+PINS = {f"t{i}": pin for i, pin in enumerate((18, 23, 17, 27, 20, 13, 19, 6), start=1)}
+PATTERN = [1900, 1900, 1500, 1500, 1700, 1300, 1500, 1500] # target for every pin, one per STEP_PERIOD
+STEP_PERIOD = 0.5
+ROUNDS = 2
+
+
+class OldRamp:
+    """ramping_loop as it was: RAMP_STEP us every LOOP_FREQ s, every pin written every pass."""
+    RAMP_STEP = 15
+    LOOP_FREQ = 0.002
+
+    def __init__(self, pwm, pins):
+        self.pwm = pwm
+        self.pins = pins
+        self.targets = {key: 1500 for key in pins}
+        self.current = {key: 1500 for key in pins}
+        self.running = False
+
+    def set_target(self, key, pwm):
+        self.targets[key] = pwm
+
+    def _loop(self):
+        while self.running:
+            for key in self.targets:
+                target, current = self.targets[key], self.current[key]
+                if current < target:
+                    self.current[key] = min(current + self.RAMP_STEP, target)
+                elif current > target:
+                    self.current[key] = max(current - self.RAMP_STEP, target)
+                self.pwm.set_servo_pulsewidth(self.pins[key], max(1100, min(1900, self.current[key])))
+            time.sleep(self.LOOP_FREQ)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+
+
+def ramp_times(writes, pin, commands):
+    """How long each 1500 -> 1900 ramp on `pin` took, from its command to the first 1900 write."""
+    times = []
+    for commanded in commands:
+        done = next((t for t, p, pwm in writes if p == pin and t >= commanded and pwm == 1900), None)
+        if done is not None:
+            times.append(done - commanded)
+    return times
+
+
+def run(engine_class):
+    pwm = RecordingPWM()
+    engine = engine_class(pwm, PINS).start()
+    started = time.monotonic()
+    commands = []
+    for i in range(ROUNDS * len(PATTERN)):
+        if PATTERN[i % len(PATTERN)] == 1900 and PATTERN[i % len(PATTERN) - 1] == 1500:
+            commands.append(time.monotonic())
+        for key in PINS:
+            engine.set_target(key, PATTERN[i % len(PATTERN)])
+        # Absolute schedule, so both engines see commands at the same times
+        time.sleep(max(started + (i + 1) * STEP_PERIOD - time.monotonic(), 0))
+    elapsed = time.monotonic() - started
+    engine.stop()
+    return pwm.write_count / elapsed, ramp_times(pwm.writes, PINS["t1"], commands)
+
+
+def main():
+    ideal = (1900 - 1500) / RAMP_RATE
+    print(f"{len(PINS)} thrusters, {ROUNDS * len(PATTERN)} commands {STEP_PERIOD} s apart, "
+          f"ideal 1500 -> 1900 ramp {ideal * 1000:.1f} ms")
+    for name, engine_class in (("fixed step (old)", OldRamp), ("RampEngine", RampEngine)):
+        rate, times = run(engine_class)
+        ramp_ms = " ".join(f"{t * 1000:.1f}" for t in times)
+        print(f"{name:<18} {rate:>8.1f} pigpio calls/s   1500 -> 1900 ramps took {ramp_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+'''
+Regression check for udp_replay.py --virtual, no Pi needed:
+    python tests/udp_replay_virtual_test.py
+
+Commands alternating between two nearby PWMs every 50 ms (a stick jittering around a position) used to leave
+RampEngine a few ULP short of its target, with a next step too small to move the simulated clock, and the
+virtual replay stepped the ramp at the same instant forever.
+The capture is written through UdpCapture and replayed from the file, in a thread so a hang fails after TIMEOUT s.
+'''
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "pi"))
+
+import udp_replay
+import main as pi_main
+from shared.udp_capture import UdpCapture
+
+COMMANDS = 200
+SPACING = 0.05 # s
+PWMS = (1600, 1650)
+TIMEOUT = 20.0 # s
+
+
+def write_capture(path):
+    capture = UdpCapture(path).start()
+    start = time.time()
+    for i in range(COMMANDS):
+        command = {key: PWMS[i % 2] for key in pi_main.THRUSTER_PINS}
+        capture.record(pi_main.UDP_PORT_CMD, json.dumps(command).encode(), start + i * SPACING)
+    capture.stop()
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), "jitter.cap")
+    write_capture(path)
+    commands, _ = udp_replay.load(path)
+
+    result = []
+    thread = threading.Thread(target=lambda: result.append(udp_replay.replay_virtual(commands)), daemon=True)
+    began = time.perf_counter()
+    thread.start()
+    thread.join(TIMEOUT)
+    if thread.is_alive():
+        print(f"FAIL: virtual replay of {COMMANDS} commands still running after {TIMEOUT:.0f} s")
+        sys.exit(1)
+
+    watchdog, writes = result[0]
+    # The last command's ramp has landed SPACING later, the only watchdog trip is the link loss after the capture ends
+    last = commands[-1][0]
+    final = [int(pwm) for pwm in udp_replay.applied_at(writes, [last + SPACING])[0]]
+    expected = PWMS[(COMMANDS - 1) % 2]
+    ok = (all(pwm == expected for pwm in final)
+          and len(watchdog.trips) == 1 and watchdog.trips[0] >= last + pi_main.COMMAND_TIMEOUT)
+    print(f"{'OK' if ok else 'FAIL'}: {COMMANDS} commands replayed in {time.perf_counter() - began:.2f} s, "
+          f"{len(writes)} pigpio writes, PWMs after the last command {final}, {len(watchdog.trips)} watchdog trips")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+'''
+Control loop jitter with video in a thread vs in its own process, using the synthetic cameras, no Pi needed:
+    python tests/video_isolation_benchmark.py
+    python tests/video_isolation_benchmark.py --encoding jpeg
+
+A 2 ms periodic loop (the old ramping_loop period) runs in the control process while the video pipeline
+captures, encodes and publishes (PUB/SUB, nothing subscribed, so sending never blocks):
+    none    - no video, the baseline
+    thread  - the pipeline as it was, a thread of the control process
+    process - video_process.VideoProcess, frames also published to shared memory
+Reports how late the loop woke up (p50 / p99 / max) and how many frames the pipeline got through.
+Run it on more than one core (the Pi 4 has four): on a single core the video process still competes for the CPU,
+and the split can't help.
+'''
+
+import os
+import sys
+import time
+import argparse
+import threading
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "pi"))
+
+from hardware import Hardware, DEPTH
+from frame_encoder import FrameSender, RAW, JPEG
+from video_process import VideoProcess
+
+PERIOD = 0.002
+DURATION = 5 # s per mode
+PORT = 5597
+
+
+def periodic_loop(duration):
+    """Lateness of every wakeup of a time.sleep(PERIOD) loop, in s."""
+    late = []
+    next_wake = time.monotonic() + PERIOD
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        delay = next_wake - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        now = time.monotonic()
+        late.append(now - next_wake)
+        next_wake = max(next_wake + PERIOD, now)
+    return np.array(late)
+
+
+def video_thread(sender_args, stop, counter):
+    sender = FrameSender(**sender_args)
+    cameras = Hardware(simulated=True).cameras()
+    for camera in cameras:
+        camera.start()
+    while not stop.is_set():
+        for camera in cameras:
+            for stream, kind, image, capture_time in camera.read():
+                if kind == DEPTH:
+                    sender.send_depth(stream, image, capture_time)
+                else:
+                    sender.send_color(stream, image, capture_time)
+                counter[0] += 1
+    sender.close()
+
+
+def run(mode, sender_args):
+    frames = 0
+    if mode == "thread":
+        stop = threading.Event()
+        counter = [0]
+        thread = threading.Thread(target=video_thread, args=(sender_args, stop, counter), daemon=True)
+        thread.start()
+        time.sleep(1) # Let the cameras come up
+        late = periodic_loop(DURATION)
+        frames = counter[0]
+        stop.set()
+        thread.join()
+    elif mode == "process":
+        video = VideoProcess(["realsense", "picam"], {"simulated": True}, sender_args, "bench").start()
+        time.sleep(3) # Spawn + imports + camera start
+        before = video.frames()
+        late = periodic_loop(DURATION)
+        frames = video.frames() - before
+        latest = video.latest("realsense")
+        video.stop()
+        if latest is None:
+            print("No frame in shared memory!")
+    else:
+        late = periodic_loop(DURATION)
+    return late, frames
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--encoding", default=RAW, choices=[RAW, JPEG])
+    args = parser.parse_args()
+    sender_args = {"connect_to": f"tcp://*:{PORT}", "color_encoding": args.encoding, "req_rep": False}
+
+    print(f"{PERIOD * 1000:.0f} ms loop for {DURATION} s, video encoding {args.encoding}, "
+          f"{len(os.sched_getaffinity(0))} cores available")
+    print(f"{'video':<10} {'p50 late':>10} {'p99 late':>10} {'max late':>10} {'frames/s':>10}")
+    for mode in ("none", "thread", "process"):
+        late, frames = run(mode, sender_args)
+        p50, p99 = np.percentile(late, [50, 99]) * 1000
+        print(f"{mode:<10} {p50:>8.3f}ms {p99:>8.3f}ms {late.max() * 1000:>8.3f}ms {frames / DURATION:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+'''
+Video pipeline benchmark over loopback, no cameras or display needed:
+    pip install numpy opencv-python-headless imagezmq
+    python tests/video_pipeline_benchmark.py --seconds 5
+
+Drives the Pi's FrameSender (pi/frame_encoder.py) and the base station's FrameReceiver (base_station/frame_decoder.py)
+with synthetic 640x480 color and 320x240 depth frames, for every transport mode and encoding.
+Reports the max sustained FPS, CPU per frame (sender + receiver) and capture -> decoded latency percentiles.
+Save a run with --json and compare against it after changing anything in the video path.
+'''
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import numpy as np
+import zmq
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "pi"))
+sys.path.insert(0, os.path.join(ROOT, "base_station"))
+
+from frame_encoder import FrameSender, RAW, JPEG, PNG16, ZLIB16
+from frame_decoder import FrameReceiver
+from video_latency import ClockOffset, VideoLatency
+
+WIDTH, HEIGHT = 640, 480
+
+# (name, stream kind, encoding)
+SETTINGS = [
+    ("color raw", "color", RAW),
+    ("color jpeg", "color", JPEG),
+    ("depth png", "depth", PNG16),
+    ("depth zlib", "depth", ZLIB16),
+]
+
+
+def synthetic_color(n):
+    """Moving gradient with sensor noise, so JPEG has realistic work to do."""
+    x = np.linspace(0, 255, WIDTH, dtype=np.float32)
+    y = np.linspace(0, 255, HEIGHT, dtype=np.float32)[:, None]
+    frames = []
+    for i in range(n):
+        base = (x + y + i * 8) % 256
+        img = np.stack([base, np.roll(base, i * 4, axis=1), 255 - base], axis=-1)
+        img += np.random.normal(0, 4, img.shape).astype(np.float32)
+        frames.append(np.clip(img, 0, 255).astype(np.uint8))
+    return frames
+
+
+def synthetic_depth(n):
+    """Decimated z16 depth: a tilted pool floor in mm with noise and some invalid (0) pixels."""
+    h, w = HEIGHT // 2, WIDTH // 2
+    yy, xx = np.mgrid[0:h, 0:w]
+    frames = []
+    for i in range(n):
+        depth = 1500 + 4 * yy + 2 * xx + 20 * np.sin((xx + i * 5) / 15)
+        depth += np.random.normal(0, 3, depth.shape)
+        depth[np.random.rand(h, w) < 0.02] = 0
+        frames.append(depth.astype(np.uint16))
+    return frames
+
+
+def run(transport, setting, seconds, port):
+    name, kind, encoding = setting
+    frames = synthetic_color(30) if kind == "color" else synthetic_depth(30)
+
+    req_rep = transport == "reqrep"
+    if req_rep:
+        receiver = FrameReceiver(f"tcp://127.0.0.1:{port}")
+        sender = FrameSender(f"tcp://127.0.0.1:{port}", RAW, RAW, req_rep=True)
+    else:
+        sender = FrameSender(f"tcp://127.0.0.1:{port}", RAW, RAW, req_rep=False)
+        receiver = FrameReceiver(f"tcp://127.0.0.1:{port}", req_rep=False)
+        time.sleep(0.5) # Let the subscription reach the publisher before the first frame
+    receiver.image_hub.zmq_socket.setsockopt(zmq.RCVTIMEO, 1000)
+    sender.color_encoding = sender.depth_encoding = encoding
+
+    latency = VideoLatency(ClockOffset(), window=100000)
+    received = [0]
+    last_received = [None] # perf_counter() of the newest frame
+
+    def receive():
+        while True:
+            try:
+                cam_id, frame, header, payload = receiver.recv()
+            except zmq.Again:
+                return
+            latency.received(cam_id, header)
+            latency.displayed(cam_id, header)
+            received[0] += 1
+            last_received[0] = time.perf_counter()
+
+    rx_thread = threading.Thread(target=receive, daemon=True)
+    rx_thread.start()
+
+    sent = 0
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        sender.send(name, frames[sent % len(frames)], encoding)
+        sent += 1
+    rx_thread.join()
+    # Up to the last frame received, the receiver only stops after waiting out its 1 s timeout after that
+    elapsed = last_received[0] - start if received[0] else seconds
+    cpu = time.process_time() - cpu_start
+
+    sender.close()
+    receiver.close()
+
+    count = max(received[0], 1)
+    age = latency.streams[name]["age"].percentiles() * 1000 if received[0] else np.zeros(3)
+    tx, rx = sender.stats[name], receiver.stats.get(name)
+    return {
+        "transport": transport,
+        "setting": name,
+        "sent": sent,
+        "received": received[0],
+        "fps": received[0] / elapsed,
+        "cpu_ms_per_frame": cpu / count * 1000,
+        "encode_ms": tx.cpu_time / max(tx.frames, 1) * 1000,
+        "decode_ms": rx.cpu_time / max(rx.frames, 1) * 1000 if rx else 0.0,
+        "kb_per_frame": tx.bytes / max(tx.frames, 1) / 1024,
+        "latency_p50_ms": age[0],
+        "latency_p95_ms": age[1],
+        "latency_p99_ms": age[2],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each run")
+    parser.add_argument("--transports", nargs="+", default=["reqrep", "pubsub"], choices=["reqrep", "pubsub"])
+    parser.add_argument("--port", type=int, default=5655)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'TRANSPORT':<8} {'SETTING':<12} {'FPS':>7} {'CPU ms/f':>9} {'enc ms':>7} {'dec ms':>7} "
+          f"{'kB/f':>7} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'lost':>6}")
+    port = args.port
+    for transport in args.transports:
+        for setting in SETTINGS:
+            r = run(transport, setting, args.seconds, port)
+            port += 1 # A fresh port per run, so late frames from the previous run can't leak in
+            results.append(r)
+            print(f"{r['transport']:<8} {r['setting']:<12} {r['fps']:>7.1f} {r['cpu_ms_per_frame']:>9.2f} "
+                  f"{r['encode_ms']:>7.2f} {r['decode_ms']:>7.2f} {r['kb_per_frame']:>7.1f} "
+                  f"{r['latency_p50_ms']:>7.1f} {r['latency_p95_ms']:>7.1f} {r['latency_p99_ms']:>7.1f} "
+                  f"{r['sent'] - r['received']:>6}", flush=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()